@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Pixel-Level Biomass Change Detection
+
+Compares biomass rasters from two or more dates on a common grid. Each
+scene's biomass.tif comes from a separate stackstac call and may not share
+a grid, so every input is warped onto the overlap grid block by block
+through a VRT. Only one block of each date plus its difference is held in
+memory at a time, which keeps full-resolution runs on large sites bounded.
+
+Where an ndvi.tif sits next to a biomass.tif, NDVI tells observed
+non-mangrove pixels (biomass 0) apart from missing data, so mangrove
+extent loss is counted as loss instead of being dropped as nodata.
+
+Dates in a per-site biomass datacube (see mangrove_cube) already share a
+grid; detect_cube_change() reads them chunk by chunk without warping.
+
+Example:
+
+    python mangrove_change.py initial/biomass.tif current/biomass.tif --output-dir outputs/change
+"""
+
+import os
+import sys
+import warnings
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+
+from mangrove_cube import cube_grid, observed_biomass, open_cube, select_scenes
+from mangrove_grid import (
+    common_grid,
+    create_like,
+    iter_windows,
+    open_on_grid,
+    pixel_area_ha,
+)
+
+warnings.filterwarnings("ignore")
+
+# Change classes written to change_class.tif
+NODATA, LOSS, STABLE, GAIN = 0, 1, 2, 3
+
+
+def _read_biomass_block(layers, window):
+    """
+    Read one block of biomass on the common grid.
+
+    Args:
+        layers: Dict with "biomass" VRT and optional "ndvi" VRT
+        window: Block window
+
+    Returns:
+        float32 array; 0 where observed but not mangrove, NaN where unobserved
+    """
+    biomass = layers["biomass"].read(1, window=window)
+    if layers.get("ndvi") is not None:
+        ndvi = layers["ndvi"].read(1, window=window)
+        biomass = np.where(np.isnan(biomass) & ~np.isnan(ndvi), 0, biomass)
+    return biomass
+
+
+def detect_change(before_path, after_path, output_dir, threshold=20.0, block_size=512):
+    """
+    Compute per-pixel biomass change between two dates, block by block.
+
+    Args:
+        before_path: Biomass GeoTIFF for the earlier date
+        after_path: Biomass GeoTIFF for the later date
+        output_dir: Directory for biomass_change.tif, change_class.tif and
+            change_summary.csv
+        threshold: Minimum absolute change (Mg/ha) counted as loss or gain
+        block_size: Block edge length in pixels
+
+    Returns:
+        Dictionary with change statistics
+    """
+    grid = common_grid([before_path, after_path])
+
+    sources, layers = [], []
+    try:
+        for path in (before_path, after_path):
+            ndvi_path = Path(path).with_name("ndvi.tif")
+            date_layers = {}
+            for name, layer_path in [("biomass", path), ("ndvi", ndvi_path)]:
+                if name == "ndvi" and not ndvi_path.exists():
+                    continue
+                src = rasterio.open(layer_path)
+                sources.append(src)
+                date_layers[name] = open_on_grid(src, grid)
+            layers.append(date_layers)
+
+        return _change_blocks(
+            lambda i, window: _read_biomass_block(layers[i], window),
+            grid,
+            (before_path, after_path),
+            output_dir,
+            threshold,
+            block_size,
+        )
+    finally:
+        for date_layers in layers:
+            for vrt in date_layers.values():
+                vrt.close()
+        for src in sources:
+            src.close()
+
+
+def detect_cube_change(
+    cube_path, before_id, after_id, output_dir, threshold=20.0, block_size=512
+):
+    """
+    Compute per-pixel biomass change between two dates of a datacube.
+
+    The cube's dates already share a grid, so each block reads only the
+    chunks under it for the two dates (see mangrove_cube).
+
+    Args:
+        cube_path: Biomass datacube path
+        before_id: Scene ID of the earlier date
+        after_id: Scene ID of the later date
+        output_dir: Directory for biomass_change.tif, change_class.tif and
+            change_summary.csv
+        threshold: Minimum absolute change (Mg/ha) counted as loss or gain
+        block_size: Block edge length in pixels
+
+    Returns:
+        Dictionary with change statistics
+    """
+    biomass = observed_biomass(
+        select_scenes(open_cube(cube_path), [before_id, after_id])
+    )
+
+    def read_block(i, window):
+        rows, cols = window.toslices()
+        return biomass.isel(time=i, y=rows, x=cols).values.astype(np.float32)
+
+    return _change_blocks(
+        read_block,
+        cube_grid(cube_path),
+        (before_id, after_id),
+        output_dir,
+        threshold,
+        block_size,
+    )
+
+
+def _change_blocks(read_block, grid, labels, output_dir, threshold, block_size):
+    """
+    Write change rasters and summary from a block reader.
+
+    Args:
+        read_block: Callable (date index 0/1, window) → biomass block, 0
+            where observed but not mangrove and NaN where unobserved
+        grid: Grid dict both dates are read on
+        labels: Before/after descriptions for the summary CSV
+        output_dir: Output directory
+        threshold: Minimum absolute change (Mg/ha) counted as loss or gain
+        block_size: Block edge length in pixels
+
+    Returns:
+        Dictionary with change statistics
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    totals = {
+        "observed_ha": 0.0,
+        "loss_ha": 0.0,
+        "gain_ha": 0.0,
+        "stable_ha": 0.0,
+        "biomass_before_mg": 0.0,
+        "biomass_after_mg": 0.0,
+    }
+
+    with (
+        create_like(
+            os.path.join(output_dir, "biomass_change.tif"),
+            grid,
+            block_size=block_size,
+        ) as diff_dst,
+        create_like(
+            os.path.join(output_dir, "change_class.tif"),
+            grid,
+            dtype="uint8",
+            nodata=NODATA,
+            block_size=block_size,
+        ) as class_dst,
+    ):
+        for window in iter_windows(grid, block_size):
+            before = read_block(0, window)
+            after = read_block(1, window)
+
+            diff = after - before
+            observed = ~np.isnan(diff)
+            loss = observed & (diff <= -threshold)
+            gain = observed & (diff >= threshold)
+
+            change_class = np.full(diff.shape, NODATA, dtype=np.uint8)
+            change_class[observed] = STABLE
+            change_class[loss] = LOSS
+            change_class[gain] = GAIN
+
+            diff_dst.write(diff.astype(np.float32), 1, window=window)
+            class_dst.write(change_class, 1, window=window)
+
+            area = np.broadcast_to(pixel_area_ha(grid, window), diff.shape)
+            totals["observed_ha"] += area[observed].sum()
+            totals["loss_ha"] += area[loss].sum()
+            totals["gain_ha"] += area[gain].sum()
+            totals["stable_ha"] += area[observed & ~loss & ~gain].sum()
+            totals["biomass_before_mg"] += (before * area)[observed].sum()
+            totals["biomass_after_mg"] += (after * area)[observed].sum()
+
+    totals["net_change_mg"] = totals["biomass_after_mg"] - totals["biomass_before_mg"]
+    totals["mean_change_mg_ha"] = (
+        totals["net_change_mg"] / totals["observed_ha"] if totals["observed_ha"] else 0
+    )
+
+    summary_df = pd.DataFrame(
+        [
+            {"Metric": "Before", "Value": str(labels[0])},
+            {"Metric": "After", "Value": str(labels[1])},
+            {"Metric": "Change Threshold (Mg/ha)", "Value": f"{threshold:.1f}"},
+            {"Metric": "Observed Area (ha)", "Value": f"{totals['observed_ha']:.1f}"},
+            {"Metric": "Loss Area (ha)", "Value": f"{totals['loss_ha']:.1f}"},
+            {"Metric": "Gain Area (ha)", "Value": f"{totals['gain_ha']:.1f}"},
+            {"Metric": "Stable Area (ha)", "Value": f"{totals['stable_ha']:.1f}"},
+            {
+                "Metric": "Net Biomass Change (Mg)",
+                "Value": f"{totals['net_change_mg']:,.0f}",
+            },
+            {
+                "Metric": "Mean Biomass Change (Mg/ha)",
+                "Value": f"{totals['mean_change_mg_ha']:+.1f}",
+            },
+        ]
+    )
+    summary_df.to_csv(os.path.join(output_dir, "change_summary.csv"), index=False)
+
+    return totals
+
+
+def detect_change_series(paths, output_dir, threshold=20.0, block_size=512):
+    """
+    Compute change between consecutive dates and between first and last.
+
+    Args:
+        paths: Biomass GeoTIFFs ordered by date
+        output_dir: Parent directory; each pair writes to "<i>_<j>/"
+        threshold: Minimum absolute change (Mg/ha) counted as loss or gain
+        block_size: Block edge length in pixels
+
+    Returns:
+        Dictionary mapping (i, j) index pairs to change statistics
+    """
+    pairs = [(i, i + 1) for i in range(len(paths) - 1)]
+    if len(paths) > 2:
+        pairs.append((0, len(paths) - 1))
+
+    return {
+        (i, j): detect_change(
+            paths[i],
+            paths[j],
+            os.path.join(output_dir, f"{i}_{j}"),
+            threshold=threshold,
+            block_size=block_size,
+        )
+        for i, j in pairs
+    }
+
+
+@click.command(
+    short_help="Pixel-level biomass change",
+    help="""
+    Computes per-pixel biomass change between dates on a common grid and
+    writes the difference raster, a loss/stable/gain class raster and a
+    CSV summary of loss and gain areas.
+
+    With more than two rasters (ordered by date), every consecutive pair
+    and the first-to-last pair are compared.
+
+    Example:
+
+        python mangrove_change.py 2017/biomass.tif 2024/biomass.tif --output-dir outputs/change
+    """,
+)
+@click.argument("biomass_paths", nargs=-1, required=True)
+@click.option(
+    "--threshold",
+    type=float,
+    default=20.0,
+    help="Minimum change counted as loss or gain (Mg/ha) [default: 20]",
+)
+@click.option(
+    "--block-size",
+    type=int,
+    default=512,
+    help="Processing block size in pixels [default: 512]",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="outputs/change",
+    help="Output directory for results [default: outputs/change]",
+)
+def main(biomass_paths, threshold, block_size, output_dir):
+    """Run change detection."""
+    if len(biomass_paths) < 2:
+        click.echo("❌ Error: need at least two biomass rasters", err=True)
+        sys.exit(1)
+
+    click.echo("🔀 Detecting biomass change...")
+    results = detect_change_series(
+        list(biomass_paths), output_dir, threshold, block_size
+    )
+
+    for (i, j), totals in results.items():
+        click.echo(f"   [{i} → {j}]")
+        click.echo(
+            f"   Loss: {totals['loss_ha']:.1f} ha | Gain: {totals['gain_ha']:.1f} ha"
+        )
+        click.echo(f"   Net change: {totals['net_change_mg']:,.0f} Mg")
+
+    click.echo(f"\n✅ Outputs: {output_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+AOI-Local Cloud Scoring from the Scene Classification Layer
+
+A scene's eo:cloud_cover describes the whole 110 km tile, so it says little
+about a small AOI: a 15% scene can be overcast over the AOI while a 40%
+scene is clear there. Each candidate is scored instead on the Sentinel-2
+L2A scene classification (SCL) over the AOI itself:
+
+    nodata_pct   no data or defective pixels (SCL 0, 1), or outside the tile
+    cloud_pct    cloud shadow, medium/high probability cloud, thin cirrus
+                 (SCL 3, 8, 9, 10)
+    score        nodata_pct + cloud_pct, the share of the AOI that is unusable
+
+SCL is read from its COG overviews at a few dozen pixels across (nearest
+neighbour, since classes cannot be averaged), one or two range requests
+per candidate, so every search result can be scored before any scene is
+downloaded. Candidates are ranked on the score, with eo:cloud_cover
+breaking ties; a candidate without an SCL asset, or whose SCL fails to
+read, falls back to its eo:cloud_cover.
+
+Example:
+
+    python mangrove_cloud.py --west 88.85 --south 21.85 --east 89.0 --north 22.0 --cloud-cover 60
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.enums import Resampling
+
+from mangrove_remote import (
+    DEFAULT_READ_PROFILE,
+    READ_PROFILES,
+    gdal_options,
+    load_read_settings,
+    read_overview,
+    resolve_read_settings,
+)
+
+SCL_ASSET = "scl"
+
+SCL_NODATA = [0, 1]
+
+SCL_CLOUD = [3, 8, 9, 10]
+
+DEFAULT_SCORE_SIZE = 64
+
+# Tile-wide cloud cover cap for the search when candidates are scored
+# over the AOI (only near-overcast tiles are left out)
+SEARCH_CLOUD_COVER = 90
+
+
+def scl_fractions(scl):
+    """
+    Cloud and no-data shares of an SCL array.
+
+    Args:
+        scl: SCL classes, NaN where no data or outside the tile
+
+    Returns:
+        Dictionary with cloud_pct, nodata_pct and score (their sum)
+    """
+    if scl.size == 0:
+        return {"cloud_pct": 0.0, "nodata_pct": 100.0, "score": 100.0}
+    nodata = np.isnan(scl) | np.isin(scl, SCL_NODATA)
+    cloud = np.isin(scl, SCL_CLOUD)
+    fractions = {
+        "cloud_pct": float(cloud.mean() * 100),
+        "nodata_pct": float(nodata.mean() * 100),
+    }
+    return {**fractions, "score": fractions["cloud_pct"] + fractions["nodata_pct"]}
+
+
+def cloud_score(item, bbox, size=DEFAULT_SCORE_SIZE, read_settings=None):
+    """
+    AOI-local cloud and no-data score of one scene from its SCL overview.
+
+    Args:
+        item: STAC item with an scl asset
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Read size (longest side, pixels)
+        read_settings: Remote read settings (see mangrove_remote)
+
+    Returns:
+        Dictionary with cloud_pct, nodata_pct and score
+    """
+    settings = resolve_read_settings() if read_settings is None else read_settings
+    # No directory listing for sidecar files, as in stackstac's env
+    with rasterio.Env(
+        GDAL_DISABLE_READDIR_ON_OPEN="EMPTY_DIR", **gdal_options(settings)
+    ):
+        scl = read_overview(
+            item.assets[SCL_ASSET].href, bbox, size, resampling=Resampling.nearest
+        )
+    return scl_fractions(scl)
+
+
+def score_items(
+    items,
+    bbox,
+    size=DEFAULT_SCORE_SIZE,
+    read_settings=None,
+    workers=16,
+    log=print,
+):
+    """
+    Score all candidates over an AOI, reading concurrently.
+
+    Args:
+        items: STAC items
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Read size (longest side, pixels)
+        read_settings: Remote read settings (see mangrove_remote)
+        workers: Concurrent reads
+        log: Callable for progress messages (print or click.echo)
+
+    Returns:
+        List of dicts (one per item, in order) with item_id, datetime,
+        cloud_cover (tile-wide), cloud_pct, nodata_pct and score; items
+        that could not be scored carry an "error" and score on cloud_cover
+    """
+    log(f"☁️  Scoring cloud over the AOI for {len(items)} scenes...")
+
+    def score(item):
+        entry = {
+            "item_id": item.id,
+            "datetime": item.datetime.isoformat() if item.datetime else None,
+            "cloud_cover": item.properties.get("eo:cloud_cover"),
+        }
+        if SCL_ASSET not in item.assets:
+            error = f"no {SCL_ASSET} asset"
+        else:
+            try:
+                return {**entry, **cloud_score(item, bbox, size, read_settings)}
+            except Exception as e:
+                error = str(e)
+
+        log(f"   ⚠️  {item.id}: {error}; using eo:cloud_cover")
+        fallback = entry["cloud_cover"]
+        fallback = 100.0 if fallback is None else float(fallback)
+        return {
+            **entry,
+            "cloud_pct": fallback,
+            "nodata_pct": None,
+            "score": fallback,
+            "error": error,
+        }
+
+    with ThreadPoolExecutor(workers) as pool:
+        scores = list(pool.map(score, items))
+
+    scored = sum("error" not in s for s in scores)
+    log(f"   Scored {scored}/{len(items)} scenes from SCL")
+    return scores
+
+
+def rank_items(items, scores, max_score=100):
+    """
+    Candidates ranked on their AOI score, best first.
+
+    Args:
+        items: STAC items
+        scores: score_items() output for the same items
+        max_score: Keep scenes scoring below this (unusable % of the AOI)
+
+    Returns:
+        List of items (eo:cloud_cover breaks ties)
+    """
+    ranked = sorted(
+        zip(items, scores, strict=True),
+        key=lambda pair: (
+            pair[1]["score"],
+            pair[0].properties.get("eo:cloud_cover", 100),
+        ),
+    )
+    return [item for item, score in ranked if score["score"] < max_score]
+
+
+def score_table(scores):
+    """
+    Candidate table ranked on the AOI score.
+
+    Args:
+        scores: Output of score_items()
+
+    Returns:
+        pandas.DataFrame with one row per scene
+    """
+    table = pd.DataFrame(
+        [
+            {
+                "Scene": s["item_id"],
+                "Date": (s["datetime"] or "")[:10],
+                "Tile Cloud (%)": s["cloud_cover"],
+                "AOI Cloud (%)": s["cloud_pct"],
+                "AOI No Data (%)": s["nodata_pct"],
+                "Score": s["score"],
+            }
+            for s in scores
+        ]
+    )
+    return table.sort_values(["Score", "Tile Cloud (%)"], ignore_index=True)
+
+
+@click.command(
+    short_help="AOI-local cloud scores of candidate scenes",
+    help="""
+    Searches Sentinel-2 L2A scenes for a bounding box and scores each one on
+    the cloud and no-data share of the AOI, from a low-resolution read of
+    its scene classification (SCL) band. Scenes scoring below --cloud-cover
+    are listed; the search itself keeps tiles below 90% cloud. Writes
+    cloud_scores.csv ranked best first.
+
+    Example:
+
+        python mangrove_cloud.py --west 88.85 --south 21.85 --east 89.0 --north 22.0 --cloud-cover 60
+    """,
+)
+@click.option("--west", type=float, required=True, help="Western longitude bound")
+@click.option("--south", type=float, required=True, help="Southern latitude bound")
+@click.option("--east", type=float, required=True, help="Eastern longitude bound")
+@click.option("--north", type=float, required=True, help="Northern latitude bound")
+@click.option(
+    "--cloud-cover",
+    type=int,
+    default=20,
+    help="Maximum cloud and no-data percentage over the AOI (0-100) [default: 20]",
+)
+@click.option(
+    "--days-back",
+    type=int,
+    default=90,
+    help="Days to search backwards from today [default: 90]",
+)
+@click.option(
+    "--size",
+    type=int,
+    default=DEFAULT_SCORE_SIZE,
+    help=f"SCL read size, longest side in pixels [default: {DEFAULT_SCORE_SIZE}]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="outputs",
+    help="Output directory for cloud_scores.csv [default: outputs]",
+)
+def main(
+    west, south, east, north, cloud_cover, days_back, size, read_profile, output_dir
+):
+    """Score candidate scenes over the AOI."""
+    # Imported here: the workflow CLI imports this module
+    from mangrove_workflow_cli import search_sentinel2
+
+    try:
+        bbox = [west, south, east, north]
+        items = search_sentinel2(bbox, SEARCH_CLOUD_COVER, days_back)
+        scores = score_items(
+            items,
+            bbox,
+            size,
+            read_settings=load_read_settings(profile=read_profile),
+            log=click.echo,
+        )
+        table = score_table(scores)
+        table = table[table["Score"] < cloud_cover]
+
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "cloud_scores.csv")
+        table.to_csv(path, index=False)
+        click.echo(table.head(10).to_string(index=False))
+        click.echo(f"\n✅ {len(table)} of {len(items)} scenes usable: {path}")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
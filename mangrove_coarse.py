@@ -0,0 +1,209 @@
+"""
+Coarse-to-Fine Loading of Candidate Mangrove Blocks
+
+Mangroves cover a thin coastal fringe of most study areas, yet a
+full-resolution load fetches every 10 m block of the bbox. Coarse-to-fine
+loading runs in two passes:
+
+1. Screen: the bbox is loaded at factor × the fine resolution (80 m by
+   default; GDAL reads the COG overviews) on a grid aligned with the fine
+   one. A coarse pixel is a candidate if it could hold mangrove: vegetated
+   (NDVI above a threshold relaxed from detection's 0.3, since a coarse
+   pixel averages mixed cover) and within water_distance of open water
+   (NDWI above water_ndwi). Candidates are grown by one coarse pixel so
+   patches straddling a pixel edge are kept.
+2. Refine: only the 512 × 512 fine blocks holding a candidate are fetched
+   at full resolution. The other blocks are filled with NaN and never read.
+
+Detection, cleanup and biomass then run on the fine grid as usual, so
+within candidate blocks the results are those of a full-resolution load,
+while I/O falls with the share of candidate blocks. Skipped blocks count
+as unobserved (NaN) in coverage statistics.
+"""
+
+import math
+
+import dask.array as da
+import numpy as np
+import rasterio
+import stackstac
+from rasterio.enums import Resampling
+from scipy import ndimage
+
+from mangrove_checkpoint import checkpoint_key
+from mangrove_cleanup import disk
+from mangrove_grid import data_grid, open_on_grid
+from mangrove_remote import gdal_options, rescale_asset, resolve_read_settings
+
+# Fine blocks: the chunk size of full-resolution loads
+BLOCK_SIZE = 512
+
+DEFAULT_SCREEN = {
+    # Coarse pixel edge in fine pixels (must divide BLOCK_SIZE)
+    "factor": 8,
+    # Detection keeps NDVI > 0.3; coarse pixels mix mangrove with water
+    "ndvi_min": 0.2,
+    "water_ndwi": 0.0,
+    # Metres from open water within which vegetation may be mangrove
+    "water_distance": 2000,
+}
+
+
+def read_coarse(href, grid, factor):
+    """
+    Read an asset on a fine grid, averaged over factor × factor pixels.
+
+    The fine grid is padded to whole coarse pixels and read through a VRT
+    with a reduced output shape, so GDAL reads the overview closest to the
+    coarse resolution rather than the full-resolution data. Must run inside
+    a rasterio.Env carrying the read settings.
+
+    Args:
+        href: Asset URL or path
+        grid: Fine grid dict (see mangrove_grid)
+        factor: Coarse pixel edge in fine pixels
+
+    Returns:
+        float32 array (ceil(height / factor), ceil(width / factor)); coarse
+        pixel (i, j) covers fine rows i × factor to (i + 1) × factor, and
+        likewise columns. NaN outside the raster. Values are raw digital
+        numbers (see mangrove_remote.rescale_asset)
+    """
+    height = math.ceil(grid["height"] / factor)
+    width = math.ceil(grid["width"] / factor)
+    padded = {**grid, "height": height * factor, "width": width * factor}
+    with rasterio.open(href) as src, open_on_grid(src, padded) as vrt:
+        return vrt.read(
+            1, out_shape=(height, width), resampling=Resampling.average
+        ).astype(np.float32)
+
+
+def screen_pixels(red, green, nir, params=None, pixel_size=80):
+    """
+    Coarse pixels that could hold mangrove.
+
+    Args:
+        red, green, nir: Coarse band arrays (NaN where no data)
+        params: Screen parameters (see DEFAULT_SCREEN)
+        pixel_size: Coarse pixel edge in metres
+
+    Returns:
+        Boolean array of candidate pixels
+    """
+    params = {**DEFAULT_SCREEN, **(params or {})}
+    ndvi = (nir - red) / (nir + red + 1e-8)
+    ndwi = (green - nir) / (green + nir + 1e-8)
+
+    vegetated = ndvi > params["ndvi_min"]
+    water = ndwi > params["water_ndwi"]
+    radius = math.ceil(params["water_distance"] / pixel_size)
+    near_water = ndimage.binary_dilation(water, disk(radius)) if radius else water
+
+    candidates = vegetated & near_water
+    return ndimage.binary_dilation(candidates, np.ones((3, 3), dtype=bool))
+
+
+def block_flags(candidates, factor, shape):
+    """
+    Fine blocks holding at least one candidate coarse pixel.
+
+    Args:
+        candidates: Boolean coarse array
+        factor: Coarse pixel edge in fine pixels
+        shape: Fine grid (height, width)
+
+    Returns:
+        Boolean array of (block rows, block columns)
+    """
+    per_block = BLOCK_SIZE // factor
+    rows = math.ceil(shape[0] / BLOCK_SIZE)
+    cols = math.ceil(shape[1] / BLOCK_SIZE)
+    padded = np.zeros((rows * per_block, cols * per_block), dtype=bool)
+    padded[: candidates.shape[0], : candidates.shape[1]] = candidates
+    return padded.reshape(rows, per_block, cols, per_block).any(axis=(1, 3))
+
+
+def candidate_blocks(item, grid_kwargs, params=None, read_settings=None, log=print):
+    """
+    Screen an item's bbox at coarse resolution for candidate mangrove blocks.
+
+    Args:
+        item: STAC item
+        grid_kwargs: stackstac grid arguments of the fine load
+        params: Screen parameters (see DEFAULT_SCREEN)
+        read_settings: Remote read settings (see mangrove_remote)
+        log: Callable for progress messages (print or click.echo)
+
+    Returns:
+        Boolean array of fine blocks (BLOCK_SIZE pixels) worth fetching
+
+    Raises:
+        ValueError: If factor does not divide BLOCK_SIZE
+    """
+    params = {**DEFAULT_SCREEN, **(params or {})}
+    factor = params["factor"]
+    if BLOCK_SIZE % factor:
+        raise ValueError(f"Coarse factor {factor} must divide {BLOCK_SIZE}")
+
+    # Lazy: only the grid is computed, no pixels are read
+    grid = data_grid(stackstac.stack([item], assets=["red"], **grid_kwargs))
+    pixel_size = grid["transform"].a * factor
+    log(f"🔎 Coarse screen at {pixel_size:g} (×{factor})")
+
+    settings = resolve_read_settings() if read_settings is None else read_settings
+    # No directory listing for sidecar files, as in stackstac's env
+    with rasterio.Env(
+        GDAL_DISABLE_READDIR_ON_OPEN="EMPTY_DIR", **gdal_options(settings)
+    ):
+        # Screen thresholds hold for reflectance, as in the fine load
+        red, green, nir = (
+            rescale_asset(item, band, read_coarse(item.assets[band].href, grid, factor))
+            for band in ["red", "green", "nir"]
+        )
+
+    # Water distance in metres; degrees at ~100 km, as in stack_grid_kwargs
+    if grid["crs"].is_geographic:
+        pixel_size *= 100000
+    candidates = screen_pixels(red, green, nir, params, pixel_size)
+    blocks = block_flags(candidates, factor, (grid["height"], grid["width"]))
+    log(
+        f"   Candidate blocks: {blocks.sum()}/{blocks.size} "
+        f"({blocks.mean():.0%} of the bbox fetched at full resolution)"
+    )
+    return blocks
+
+
+def screened_key(key, blocks):
+    """Scene key of a load restricted to candidate blocks."""
+    return f"{key}_c{checkpoint_key(blocks.shape, np.flatnonzero(blocks).tolist())[:8]}"
+
+
+def prune_blocks(lazy, blocks):
+    """
+    Restrict a lazy load to candidate blocks; the others become NaN.
+
+    Skipped blocks are constant arrays in the graph, so their reads are
+    never scheduled.
+
+    Args:
+        lazy: stackstac DataArray chunked BLOCK_SIZE pixels along y and x
+        blocks: Boolean array of (block rows, block columns)
+
+    Returns:
+        Lazy DataArray with lazy's shape, coordinates and attributes
+    """
+    data = lazy.data
+    if data.numblocks[-2:] != blocks.shape:
+        raise ValueError(
+            f"{data.numblocks[-2:]} chunks along y/x, {blocks.shape} blocks screened"
+        )
+
+    def piece(index):
+        if len(index) < data.ndim:
+            return [piece((*index, i)) for i in range(data.numblocks[len(index)])]
+        if blocks[index[-2], index[-1]]:
+            return data.blocks[index]
+        shape = tuple(data.chunks[axis][i] for axis, i in enumerate(index))
+        return da.full(shape, np.nan, dtype=data.dtype)
+
+    return lazy.copy(data=da.block(piece(())))
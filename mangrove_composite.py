@@ -0,0 +1,266 @@
+"""
+Chunked Multi-Date Median Compositing
+
+Instead of trusting the single least-cloudy scene, a composite stacks every
+item found in the search window and takes a per-pixel NaN-aware median (or
+another percentile) over time, so one residual cloud, haze event or
+no-data strip in one date no longer decides the estimate.
+
+The stack is chunked spatially with the whole time axis in each chunk, and
+the chunk size shrinks as the number of dates grows, so memory per chunk
+stays bounded however many items go into the composite. Chunks are reduced
+independently and in parallel by dask; nothing holds the full time stack.
+
+Two targets:
+
+- bands:   composite red/green/nir, then compute indices from the
+           composite (feeds calculate_indices() unchanged)
+- indices: compute NDVI/NDWI/SAVI per date, then composite each index
+"""
+
+import math
+from datetime import datetime
+
+import numpy as np
+import pystac
+import stackstac
+import xarray as xr
+
+from mangrove_checkpoint import checkpoint_key
+from mangrove_remote import stack_gdal_env
+
+BANDS = ["red", "green", "nir"]
+
+INDICES = ["ndvi", "ndwi", "savi"]
+
+COMPOSITE_TARGETS = ["bands", "indices"]
+
+# Upper bound on one chunk's time stack (all dates × bands), in MB
+DEFAULT_MEMORY_MB = 256
+
+DEFAULT_MAX_ITEMS = 20
+
+
+def composite_id(items, percentile=50, target="bands"):
+    """
+    Identifier for a composite, usable as a scene ID in the scene store.
+
+    Args:
+        items: STAC items in the composite
+        percentile: Percentile over time (50 = median)
+        target: "bands" or "indices"
+
+    Returns:
+        String such as "composite-p50-bands-<hash of item IDs>"
+    """
+    digest = checkpoint_key(sorted(item.id for item in items))[:12]
+    return f"composite-p{percentile:g}-{target}-{digest}"
+
+
+def composite_metadata(items):
+    """
+    Date range, median date and mean cloud cover of composited items.
+
+    Args:
+        items: STAC items in the composite
+
+    Returns:
+        Dictionary with n_items, start, end, datetime and cloud_cover
+    """
+    dates = sorted(item.datetime for item in items)
+    cloud = [item.properties.get("eo:cloud_cover", np.nan) for item in items]
+    return {
+        "n_items": len(items),
+        "start": dates[0],
+        "end": dates[-1],
+        "datetime": dates[len(dates) // 2],
+        "cloud_cover": float(np.nanmean(cloud)) if items else np.nan,
+    }
+
+
+def composite_item(items, percentile=50, target="bands"):
+    """
+    STAC item standing in for a composite in the rest of the workflow.
+
+    Its ID is composite_id(), its datetime the median date and its cloud
+    cover the mean of the items, so scene store keys, stage keys and
+    reports treat the composite like a scene.
+
+    Args:
+        items: STAC items in the composite
+        percentile: Percentile over time (50 = median)
+        target: "bands" or "indices"
+
+    Returns:
+        pystac.Item with composite:* properties
+    """
+    metadata = composite_metadata(items)
+    return pystac.Item(
+        id=composite_id(items, percentile, target),
+        geometry=None,
+        bbox=None,
+        datetime=metadata["datetime"],
+        properties={
+            "eo:cloud_cover": metadata["cloud_cover"],
+            "composite:items": [item.id for item in items],
+            "composite:start": metadata["start"].isoformat(),
+            "composite:end": metadata["end"].isoformat(),
+            "composite:percentile": percentile,
+            "composite:target": target,
+        },
+    )
+
+
+def composite_chunksize(n_items, n_bands=1, memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Spatial chunk edge keeping one chunk's time stack within a memory budget.
+
+    Args:
+        n_items: Dates in the stack
+        n_bands: Bands per chunk
+        memory_mb: Budget per chunk (float64 values, as stackstac loads
+            rescaled reflectances)
+
+    Returns:
+        Chunk edge length in pixels (multiple of 128, 128-1024)
+    """
+    pixels = memory_mb * 2**20 / (8 * max(1, n_items) * n_bands)
+    edge = int(math.sqrt(pixels)) // 128 * 128
+    return min(1024, max(128, edge))
+
+
+def stack_items(
+    items, grid_kwargs, n_bands=1, read_settings=None, memory_mb=DEFAULT_MEMORY_MB
+):
+    """
+    Lazy (time, band, y, x) stack chunked for compositing.
+
+    Args:
+        items: STAC items
+        grid_kwargs: stackstac grid arguments (see stack_grid_kwargs); items
+            in other UTM zones are warped onto this grid
+        n_bands: Bands per chunk (1 for band composites, 3 when indices
+            need all bands together)
+        read_settings: Remote read settings (see mangrove_remote)
+        memory_mb: Memory budget per chunk
+
+    Returns:
+        dask-backed xarray.DataArray
+    """
+    edge = composite_chunksize(len(items), n_bands, memory_mb)
+    return stackstac.stack(
+        items,
+        assets=BANDS,
+        chunksize=(-1, n_bands, edge, edge),
+        gdal_env=stack_gdal_env(read_settings),
+        **grid_kwargs,
+    )
+
+
+def _reduce(values, percentile):
+    """
+    NaN-aware percentile over the last axis (all-NaN pixels → NaN).
+
+    Sorts once and interpolates linearly between the valid values, like
+    np.nanpercentile, which falls back to a per-pixel Python loop as soon as
+    any NaN is present.
+    """
+    ordered = np.sort(values, axis=-1)  # NaNs sort last
+    valid = np.count_nonzero(~np.isnan(values), axis=-1)
+    rank = (np.maximum(valid, 1) - 1) * (percentile / 100)
+    lower = np.floor(rank).astype(np.intp)
+    upper = np.minimum(lower + 1, np.maximum(valid - 1, 0))
+    low = np.take_along_axis(ordered, lower[..., None], axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, upper[..., None], axis=-1)[..., 0]
+    result = low + (high - low) * (rank - lower)
+    return np.where(valid > 0, result, np.nan).astype(values.dtype)
+
+
+def temporal_composite(stack, percentile=50):
+    """
+    Per-pixel percentile over the time axis, chunk by chunk.
+
+    Args:
+        stack: Lazy (time, ..., y, x) DataArray with time in one chunk
+        percentile: Percentile over time (50 = median)
+
+    Returns:
+        Lazy DataArray without the time dimension, carrying the stack's
+        crs/transform attributes
+    """
+    composite = xr.apply_ufunc(
+        _reduce,
+        stack,
+        kwargs={"percentile": percentile},
+        input_core_dims=[["time"]],
+        dask="parallelized",
+        output_dtypes=[stack.dtype],
+    )
+    composite = composite.drop_vars(
+        [name for name in composite.coords if name not in composite.dims]
+    )
+    composite.attrs = {
+        "crs": stack.attrs.get("crs"),
+        "transform": stack.attrs.get("transform"),
+    }
+    return composite
+
+
+def band_composite(items, grid_kwargs, percentile=50, **kwargs):
+    """
+    Composite red/green/nir over a set of items.
+
+    Args:
+        items: STAC items
+        grid_kwargs: stackstac grid arguments
+        percentile: Percentile over time (50 = median)
+        **kwargs: Passed to stack_items() (read_settings, memory_mb)
+
+    Returns:
+        Lazy (band, y, x) DataArray shaped like a single-scene load
+    """
+    stack = stack_items(items, grid_kwargs, n_bands=1, **kwargs)
+    return temporal_composite(stack, percentile)
+
+
+def index_composite(items, grid_kwargs, percentile=50, **kwargs):
+    """
+    Composite NDVI/NDWI/SAVI computed per date.
+
+    Args:
+        items: STAC items
+        grid_kwargs: stackstac grid arguments
+        percentile: Percentile over time (50 = median)
+        **kwargs: Passed to stack_items() (read_settings, memory_mb)
+
+    Returns:
+        Lazy (index, y, x) DataArray with ndvi, ndwi and savi
+    """
+    stack = stack_items(items, grid_kwargs, n_bands=len(BANDS), **kwargs)
+    red, green, nir = (stack.sel(band=band, drop=True) for band in BANDS)
+
+    indices = xr.concat(
+        [
+            (nir - red) / (nir + red + 1e-8),
+            (green - nir) / (green + nir + 1e-8),
+            ((nir - red) / (nir + red + 0.5)) * 1.5,
+        ],
+        dim="index",
+    ).assign_coords(index=INDICES)
+    indices.attrs = stack.attrs
+    return temporal_composite(indices, percentile)
+
+
+def select_items(items, max_items=DEFAULT_MAX_ITEMS):
+    """
+    Least-cloudy items for a composite, in date order.
+
+    Args:
+        items: Candidate STAC items
+        max_items: Maximum items to keep
+
+    Returns:
+        List of items
+    """
+    ranked = sorted(items, key=lambda x: x.properties.get("eo:cloud_cover", 100))
+    return sorted(ranked[:max_items], key=lambda x: x.datetime or datetime.min)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Appendable Per-Site Biomass Datacube
+
+Per-scene biomass and NDVI for one site, stacked as (time, y, x) arrays in
+one Zarr store on a fixed grid. The grid is set by the first scene; later
+scenes are loaded straight onto it (see cube_grid_kwargs) and appended
+along time, so no query has to reconcile grids or open one GeoTIFF per
+date.
+
+Chunks are 8 dates × 256 × 256 pixels, a compromise between the two read
+patterns of the notebook:
+
+- map reads (timelapse, change) of one date decode at most 8 dates per
+  chunk, and only the chunks under the requested window
+- time-series reads (trend) at one location touch ceil(dates / 8) chunks
+  instead of one file per date
+
+Scene IDs are kept in the group attributes and updated after the arrays
+are written, so they double as the commit record: dates written by an
+interrupted append are not listed and are dropped by the next append.
+
+Layout:
+
+    data_cache/temporal/<site>/biomass_cube.zarr/
+        biomass       float32 (time, y, x)   NaN outside the mangrove mask
+        ndvi          float32 (time, y, x)   NaN where unobserved
+        time, y, x    coordinates (pixel centres in the grid CRS)
+
+Example:
+
+    python mangrove_cube.py append data_cache/temporal/sundarbans/biomass_cube.zarr \\
+        2017-03-01=a/biomass.tif 2020-05-10=b/biomass.tif
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+import xarray as xr
+import zarr
+from affine import Affine
+from rasterio.crs import CRS
+
+from mangrove_grid import open_on_grid, raster_grid
+from mangrove_lock import entry_lock
+from mangrove_store import COMPRESSOR
+
+DEFAULT_CUBE = "biomass_cube.zarr"
+
+LAYERS = ["biomass", "ndvi"]
+
+TIME_CHUNK = 8
+
+SPACE_CHUNK = 256
+
+
+def has_cube(path):
+    """Check whether a cube exists at path."""
+    try:
+        zarr.open_group(str(path), mode="r")
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def cube_scene_ids(path):
+    """
+    Scene IDs in a cube, in the order they were appended.
+
+    Args:
+        path: Cube path
+
+    Returns:
+        List of scene IDs (empty if the cube does not exist)
+    """
+    if not has_cube(path):
+        return []
+    return list(zarr.open_group(str(path), mode="r").attrs.get("scene_ids", []))
+
+
+def cube_grid(path):
+    """
+    Fixed grid of a cube.
+
+    Args:
+        path: Cube path
+
+    Returns:
+        Grid dict (see mangrove_grid)
+    """
+    group = zarr.open_group(str(path), mode="r")
+    return {
+        "crs": CRS.from_user_input(group.attrs["crs"]),
+        "transform": Affine(*group.attrs["transform"][:6]),
+        "width": group["x"].shape[0],
+        "height": group["y"].shape[0],
+    }
+
+
+def cube_grid_kwargs(path):
+    """
+    stackstac grid arguments that load a scene onto a cube's grid.
+
+    Bounds are used as given (no snapping), so the loaded pixels coincide
+    with the cube's; scenes in another UTM zone are warped onto it.
+
+    Args:
+        path: Cube path
+
+    Returns:
+        Dictionary of stackstac grid arguments
+    """
+    grid = cube_grid(path)
+    transform = grid["transform"]
+    west, north = transform.c, transform.f
+    east = west + transform.a * grid["width"]
+    south = north + transform.e * grid["height"]
+    return {
+        "epsg": grid["crs"].to_epsg(),
+        "resolution": abs(transform.a),
+        "bounds": [west, south, east, north],
+        "snap_bounds": False,
+    }
+
+
+def _same_grid(a, b):
+    return (
+        CRS.from_user_input(a["crs"]) == CRS.from_user_input(b["crs"])
+        and Affine(*tuple(a["transform"])[:6]).almost_equals(
+            Affine(*tuple(b["transform"])[:6])
+        )
+        and (a["width"], a["height"]) == (b["width"], b["height"])
+    )
+
+
+def _truncate(path, n_dates):
+    """Drop dates written by an interrupted append (beyond the listed IDs)."""
+    group = zarr.open_group(str(path), mode="r+")
+    for name in [*LAYERS, "time"]:
+        array = group[name]
+        if array.shape[0] > n_dates:
+            array.resize((n_dates, *array.shape[1:]))
+
+
+def append_scene(path, scene_id, date, layers, grid):
+    """
+    Append one scene's layers to a cube, creating the cube if needed.
+
+    Appending a scene that is already in the cube does nothing. Appends
+    run under the cube's lock (see mangrove_lock), one writer at a time.
+
+    Args:
+        path: Cube path
+        scene_id: Scene (STAC item) ID
+        date: Acquisition datetime
+        layers: Dictionary with 2D biomass and ndvi arrays on grid
+        grid: Grid dict of the layers (see mangrove_grid)
+
+    Raises:
+        ValueError: If the grid differs from the cube's fixed grid
+    """
+    # Concurrent appenders would truncate each other's dates
+    with entry_lock(path):
+        scene_ids = cube_scene_ids(path)
+        if scene_id in scene_ids:
+            return
+
+        exists = has_cube(path)
+        if exists and not _same_grid(grid, cube_grid(path)):
+            raise ValueError(
+                "Scene grid does not match the cube grid; "
+                "load scenes with cube_grid_kwargs() or use append_rasters()"
+            )
+
+        transform = grid["transform"]
+        timestamp = pd.Timestamp(date)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+
+        dataset = xr.Dataset(
+            {
+                name: (
+                    ("time", "y", "x"),
+                    np.asarray(layers[name], dtype=np.float32)[np.newaxis],
+                )
+                for name in LAYERS
+            },
+            coords={
+                "time": [timestamp],
+                "y": transform.f + transform.e * (np.arange(grid["height"]) + 0.5),
+                "x": transform.c + transform.a * (np.arange(grid["width"]) + 0.5),
+            },
+        )
+
+        # Group attributes are rewritten by every write, appends included
+        dataset.attrs = {
+            "crs": CRS.from_user_input(grid["crs"]).to_string(),
+            "transform": list(transform)[:6],
+            "scene_ids": scene_ids,
+        }
+
+        if exists:
+            _truncate(path, len(scene_ids))
+            dataset.to_zarr(str(path), append_dim="time", consolidated=False)
+        else:
+            encoding = {
+                name: {
+                    "compressors": [COMPRESSOR],
+                    "chunks": (TIME_CHUNK, SPACE_CHUNK, SPACE_CHUNK),
+                }
+                for name in LAYERS
+            }
+            dataset.to_zarr(str(path), mode="w", encoding=encoding, consolidated=False)
+
+        group = zarr.open_group(str(path), mode="r+")
+        group.attrs["scene_ids"] = [*scene_ids, scene_id]
+
+
+def append_rasters(path, scene_id, date, biomass_path):
+    """
+    Append a scene from its biomass.tif (and a sibling ndvi.tif, if any).
+
+    The rasters are warped onto the cube's grid, or set it if the cube does
+    not exist yet. Used to import per-scene GeoTIFF caches.
+
+    Args:
+        path: Cube path
+        scene_id: Scene (STAC item) ID
+        date: Acquisition datetime
+        biomass_path: Biomass GeoTIFF
+    """
+    if scene_id in cube_scene_ids(path):
+        return
+
+    grid = cube_grid(path) if has_cube(path) else raster_grid(biomass_path)
+    layers = {}
+    for name in LAYERS:
+        layer_path = Path(biomass_path).with_name(f"{name}.tif")
+        if name == "biomass":
+            layer_path = Path(biomass_path)
+        if not layer_path.exists():
+            layers[name] = np.full((grid["height"], grid["width"]), np.nan)
+            continue
+        with rasterio.open(layer_path) as src, open_on_grid(src, grid) as vrt:
+            layers[name] = vrt.read(1).astype(np.float32)
+
+    append_scene(path, scene_id, date, layers, grid)
+
+
+def open_cube(path):
+    """
+    Open a cube lazily, sorted by date.
+
+    Args:
+        path: Cube path
+
+    Returns:
+        dask-backed xarray.Dataset (time, y, x) with a scene_id coordinate
+        and the grid's crs/transform attributes; nothing is read until
+        values are used
+    """
+    scene_ids = cube_scene_ids(path)
+    cube = xr.open_zarr(str(path), consolidated=False)
+    cube = cube.isel(time=slice(0, len(scene_ids)))
+    cube = cube.assign_coords(scene_id=("time", scene_ids))
+    return cube.sortby("time")
+
+
+def select_scenes(cube, scene_ids):
+    """
+    Dates of a cube for given scenes, in the given order.
+
+    Args:
+        cube: Dataset from open_cube()
+        scene_ids: Scene IDs
+
+    Returns:
+        Dataset with one time step per scene
+
+    Raises:
+        KeyError: If a scene is not in the cube
+    """
+    index = {scene_id: i for i, scene_id in enumerate(cube["scene_id"].values)}
+    missing = [scene_id for scene_id in scene_ids if scene_id not in index]
+    if missing:
+        raise KeyError(f"Scenes not in cube: {', '.join(missing)}")
+    return cube.isel(time=[index[scene_id] for scene_id in scene_ids])
+
+
+def observed_biomass(cube):
+    """
+    Biomass with observed non-mangrove pixels set to 0.
+
+    NDVI tells observed non-mangrove pixels apart from missing data, so
+    extent loss shows as a decline rather than a gap.
+
+    Args:
+        cube: Dataset from open_cube()
+
+    Returns:
+        Lazy (time, y, x) DataArray
+    """
+    biomass = cube["biomass"]
+    return xr.where(biomass.isnull() & cube["ndvi"].notnull(), 0, biomass)
+
+
+@click.group(
+    short_help="Per-site biomass datacube",
+    help="""
+    Maintains a per-site (time, y, x) biomass/NDVI datacube on a fixed grid.
+
+    Example:
+
+        python mangrove_cube.py append cube.zarr 2017-03-01=a/biomass.tif 2024-02-01=b/biomass.tif
+    """,
+)
+def main():
+    """Biomass datacube commands."""
+
+
+@main.command(
+    short_help="Append biomass rasters",
+    help="""
+    Appends biomass rasters to a cube, warping them onto its grid. Each
+    RASTER is DATE=PATH with DATE as YYYY-MM-DD; the scene ID is the name of
+    the raster's directory, as in data_cache/temporal/<site>/<scene_id>/.
+    An ndvi.tif next to a biomass.tif is appended with it.
+    """,
+)
+@click.argument("cube")
+@click.argument("rasters", nargs=-1, required=True)
+def append(cube, rasters):
+    """Append dated biomass rasters."""
+    try:
+        for spec in rasters:
+            date, path = spec.split("=", 1)
+            scene_id = Path(path).parent.name
+            append_rasters(cube, scene_id, pd.Timestamp(date), path)
+            click.echo(f"   Appended {scene_id} ({date})")
+        click.echo(f"\n✅ {len(cube_scene_ids(cube))} dates in {cube}")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@main.command(short_help="Describe a cube")
+@click.argument("cube")
+def info(cube):
+    """Print a cube's dates and grid."""
+    if not has_cube(cube):
+        click.echo(f"❌ Error: no cube at {cube}", err=True)
+        sys.exit(1)
+
+    dataset = open_cube(cube)
+    grid = cube_grid(cube)
+    click.echo(f"📦 {os.path.abspath(cube)}")
+    click.echo(
+        f"   Grid: {grid['crs']} @ {abs(grid['transform'].a):g}, "
+        f"{grid['width']} × {grid['height']} px"
+    )
+    for date, scene_id in zip(
+        dataset["time"].values, dataset["scene_id"].values, strict=True
+    ):
+        click.echo(f"   {pd.Timestamp(date):%Y-%m-%d}  {scene_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Chunk Pruning Outside the Valid Data Footprint
+
+A Sentinel-2 tile that clips the bbox leaves much of the load as no data,
+yet stackstac schedules every chunk: chunks past the raster edge are
+filled with NaN by a task of their own, and chunks over the tile's
+no-data wedge (a swath edge inside the raster) are fetched and decoded
+only to come back empty. Before computing a load, each chunk's bounds are
+compared with where data can be:
+
+- the item footprint (its STAC geometry, EPSG:4326), and
+- each asset's valid extent (proj:bbox, or proj:transform and
+  proj:shape, on the asset or the item)
+
+A chunk is kept if it intersects the footprint within a margin of a few
+pixels (STAC footprints are simplified outlines). The others are replaced
+by NaN constants (see mangrove_coarse.prune_blocks): they are never read
+or computed, skipped by checkpoints, and count as unobserved (NaN) in
+every statistic, exactly as if they had been fetched. An item without a
+geometry or projection metadata keeps every chunk.
+"""
+
+import numpy as np
+import shapely
+from rasterio.crs import CRS
+from rasterio.warp import transform_geom
+
+from mangrove_grid import data_grid, item_epsg
+
+# STAC footprints are simplified; keep chunks this many pixels beyond them
+DEFAULT_MARGIN = 10
+
+
+def _to_crs(geometry, src_crs, dst_crs):
+    """Reproject a shapely geometry, densified so edges follow the warp."""
+    if CRS.from_user_input(src_crs) == CRS.from_user_input(dst_crs):
+        return geometry
+    xmin, ymin, xmax, ymax = geometry.bounds
+    dense = shapely.segmentize(geometry, max(xmax - xmin, ymax - ymin) / 32 or 1)
+    return shapely.geometry.shape(
+        transform_geom(src_crs, dst_crs, shapely.geometry.mapping(dense))
+    )
+
+
+def asset_extent(item, asset):
+    """
+    Valid extent of an asset from the projection extension.
+
+    Args:
+        item: STAC item
+        asset: Asset key
+
+    Returns:
+        shapely box in the item's native CRS, or None if not declared
+    """
+    fields = {**item.properties, **item.assets[asset].extra_fields}
+    if fields.get("proj:bbox"):
+        return shapely.box(*fields["proj:bbox"][:4])
+    if fields.get("proj:transform") and fields.get("proj:shape"):
+        a, _, c, _, e, f = fields["proj:transform"][:6]
+        height, width = fields["proj:shape"]
+        xs, ys = (c, c + width * a), (f, f + height * e)
+        return shapely.box(min(xs), min(ys), max(xs), max(ys))
+    return None
+
+
+def item_footprint(item, crs, assets=("red", "green", "nir")):
+    """
+    Area where an item can hold data, in a target CRS.
+
+    Args:
+        item: STAC item
+        crs: Target CRS (e.g. the load grid's)
+        assets: Asset keys loaded; their extents are united
+
+    Returns:
+        shapely geometry, or None if the item declares neither a geometry
+        nor asset extents
+    """
+    footprint = None
+    if item.geometry:
+        footprint = _to_crs(shapely.geometry.shape(item.geometry), "EPSG:4326", crs)
+
+    epsg = item_epsg(item)
+    extents = [asset_extent(item, asset) for asset in assets]
+    extents = [extent for extent in extents if extent is not None]
+    if epsg is not None and extents:
+        valid = _to_crs(shapely.union_all(extents), f"EPSG:{epsg}", crs)
+        footprint = valid if footprint is None else footprint.intersection(valid)
+    return footprint
+
+
+def chunk_boxes(grid, chunks):
+    """
+    Bounds of the chunks of a raster, as shapely boxes.
+
+    Args:
+        grid: Grid dict (see mangrove_grid)
+        chunks: Chunk sizes along y and x (dask .chunks[-2:])
+
+    Returns:
+        Array of boxes shaped (chunk rows, chunk columns)
+    """
+    transform = grid["transform"]
+    rows = np.cumsum((0, *chunks[0]))
+    cols = np.cumsum((0, *chunks[1]))
+    x = transform.c + cols * transform.a
+    y = transform.f + rows * transform.e
+    x0, y0 = np.meshgrid(x[:-1], y[:-1])
+    x1, y1 = np.meshgrid(x[1:], y[1:])
+    return shapely.box(
+        np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(x0, x1), np.maximum(y0, y1)
+    )
+
+
+def data_blocks(items, lazy, margin=DEFAULT_MARGIN, log=print):
+    """
+    Chunks of a lazy load that can hold data from any of the items.
+
+    Args:
+        items: STAC items in the load
+        lazy: dask-backed DataArray (..., y, x) on the load grid
+        margin: Footprint margin in pixels
+        log: Callable for progress messages (print or click.echo)
+
+    Returns:
+        Boolean array of (chunk rows, chunk columns); all True if no item
+        declares where its data is
+    """
+    grid = data_grid(lazy)
+    boxes = chunk_boxes(grid, lazy.data.chunks[-2:])
+    footprints = [item_footprint(item, grid["crs"]) for item in items]
+    if any(footprint is None for footprint in footprints):
+        return np.ones(boxes.shape, dtype=bool)
+
+    footprint = shapely.union_all(footprints).buffer(margin * abs(grid["transform"].a))
+    shapely.prepare(footprint)
+    blocks = shapely.intersects(footprint, boxes)
+
+    if not blocks.all():
+        log(
+            f"   Footprint: {blocks.sum()}/{blocks.size} chunks can hold data "
+            f"({blocks.size - blocks.sum()} skipped)"
+        )
+    if not blocks.any():
+        log("   ⚠️  No data over the bbox: nothing to fetch")
+    return blocks
@@ -0,0 +1,273 @@
+"""
+Raster Grid Helpers
+
+Shared helpers for choosing the grid stackstac loads onto, putting rasters
+from separate stackstac calls onto one common grid, iterating over it block
+by block, and computing true pixel areas (which vary with latitude on a
+geographic grid).
+
+By default scenes load in their native UTM zone at the band's own 10 m
+resolution, which avoids warping every pixel and makes pixel areas exact.
+EPSG:4326 is only used by the lat/lon fallback grid; map display reprojects
+per tile (see mangrove_tiles).
+
+A grid is a plain dict with "crs", "transform", "width" and "height".
+"""
+
+import math
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
+
+# WGS84 authalic radius (metres), for pixel areas on geographic grids
+EARTH_RADIUS_M = 6371007.2
+
+
+def item_epsg(item):
+    """
+    Native EPSG code of a STAC item (Sentinel-2: its UTM zone).
+
+    Args:
+        item: STAC item with the projection extension
+
+    Returns:
+        EPSG code as int, or None if the item does not declare one
+    """
+    epsg = item.properties.get("proj:epsg")
+    if epsg is None:
+        code = item.properties.get("proj:code") or ""
+        if code.upper().startswith("EPSG:"):
+            epsg = code.split(":", 1)[1]
+    return int(epsg) if epsg is not None else None
+
+
+def stack_grid_kwargs(item, bbox, native_crs=True, resolution=10):
+    """
+    stackstac.stack() grid arguments for loading an item over a bbox.
+
+    Args:
+        item: STAC item
+        bbox: Bounding box [west, south, east, north] in degrees
+        native_crs: Load in the item's own UTM zone (no resampling); when
+            False, or if the item has no EPSG, warp to EPSG:4326
+        resolution: Pixel size in metres (native) - converted to degrees
+            at ~111 km per degree for EPSG:4326
+
+    Returns:
+        Dictionary with epsg, resolution, bounds_latlon and xy_coords
+    """
+    epsg = item_epsg(item) if native_crs else None
+    if epsg is None:
+        epsg, resolution = 4326, resolution / 100000
+
+    return {
+        "epsg": epsg,
+        "resolution": resolution,
+        "bounds_latlon": bbox,
+        # Pixel-centre coordinates, as rioxarray assumes when writing GeoTIFFs
+        "xy_coords": "center",
+    }
+
+
+def data_grid(data):
+    """
+    Grid of a loaded xarray raster (stackstac output or rioxarray file).
+
+    Args:
+        data: xarray.DataArray with x/y dims
+
+    Returns:
+        Grid dict
+    """
+    crs = data.attrs.get("crs") or data.rio.crs
+    transform = data.attrs.get("transform") or data.rio.transform()
+    return {
+        "crs": CRS.from_user_input(crs),
+        "transform": Affine(*tuple(transform)[:6]),
+        "width": data.sizes["x"],
+        "height": data.sizes["y"],
+    }
+
+
+def raster_grid(path):
+    """
+    Read the grid of an existing raster.
+
+    Args:
+        path: Path to a georeferenced raster
+
+    Returns:
+        Grid dict
+    """
+    with rasterio.open(path) as src:
+        return {
+            "crs": src.crs,
+            "transform": src.transform,
+            "width": src.width,
+            "height": src.height,
+        }
+
+
+def common_grid(paths, resolution=None, crs=None):
+    """
+    Build the grid covering the overlap of several rasters.
+
+    The CRS and resolution default to those of the first raster, and the
+    origin snaps to a multiple of the resolution so repeated runs produce
+    identical grids.
+
+    Args:
+        paths: Raster paths
+        resolution: Output pixel size in CRS units (default: first raster's)
+        crs: Output CRS (default: first raster's)
+
+    Returns:
+        Grid dict
+
+    Raises:
+        ValueError: If the rasters do not overlap
+    """
+    first = raster_grid(paths[0])
+    crs = CRS.from_user_input(crs) if crs else first["crs"]
+    resolution = resolution or abs(first["transform"].a)
+
+    west, south, east, north = -math.inf, -math.inf, math.inf, math.inf
+    for path in paths:
+        with rasterio.open(path) as src:
+            bounds = transform_bounds(src.crs, crs, *src.bounds)
+        west, south = max(west, bounds[0]), max(south, bounds[1])
+        east, north = min(east, bounds[2]), min(north, bounds[3])
+
+    if west >= east or south >= north:
+        raise ValueError("Rasters do not overlap")
+
+    # Tolerance keeps float noise from adding a spurious row/column
+    west = math.floor(west / resolution + 1e-6) * resolution
+    north = math.ceil(north / resolution - 1e-6) * resolution
+    width = max(1, math.ceil((east - west) / resolution - 1e-6))
+    height = max(1, math.ceil((north - south) / resolution - 1e-6))
+
+    return {
+        "crs": crs,
+        "transform": from_origin(west, north, resolution, resolution),
+        "width": width,
+        "height": height,
+    }
+
+
+def open_on_grid(src, grid, resampling=Resampling.nearest):
+    """
+    Wrap an open dataset in a VRT that reads it on the given grid.
+
+    Reads through the VRT are windowed, so only the source pixels under the
+    requested block are fetched and warped.
+
+    Args:
+        src: Open rasterio dataset
+        grid: Grid dict
+        resampling: Resampling method for warping
+
+    Returns:
+        rasterio WarpedVRT
+    """
+    return WarpedVRT(
+        src,
+        crs=grid["crs"],
+        transform=grid["transform"],
+        width=grid["width"],
+        height=grid["height"],
+        resampling=resampling,
+        src_nodata=src.nodata if src.nodata is not None else np.nan,
+        nodata=np.nan,
+        dtype="float32",
+    )
+
+
+def iter_windows(grid, block_size=512):
+    """
+    Yield block windows covering a grid in row-major order.
+
+    Args:
+        grid: Grid dict
+        block_size: Block edge length in pixels
+
+    Yields:
+        rasterio Window objects
+    """
+    for row in range(0, grid["height"], block_size):
+        for col in range(0, grid["width"], block_size):
+            yield Window(
+                col,
+                row,
+                min(block_size, grid["width"] - col),
+                min(block_size, grid["height"] - row),
+            )
+
+
+def pixel_area_ha(grid, window=None):
+    """
+    Calculate the area of each pixel row in hectares.
+
+    On a projected grid every pixel has the same area. On a geographic grid
+    (e.g. EPSG:4326) the area shrinks with the cosine of latitude, so a
+    0.0001° pixel is only ~100 m² near the equator.
+
+    Args:
+        grid: Grid dict
+        window: Optional window; areas are returned for its rows only
+
+    Returns:
+        Array of shape (rows, 1) that broadcasts against a block
+    """
+    transform = grid["transform"]
+    row_off = int(window.row_off) if window is not None else 0
+    n_rows = int(window.height) if window is not None else grid["height"]
+
+    if not CRS.from_user_input(grid["crs"]).is_geographic:
+        area = abs(transform.a * transform.e) / 10000
+        return np.full((n_rows, 1), area)
+
+    rows = np.arange(row_off, row_off + n_rows + 1)
+    lat_edges = np.radians(transform.f + rows * transform.e)
+    dlon = np.radians(abs(transform.a))
+    area_m2 = EARTH_RADIUS_M**2 * dlon * np.abs(np.diff(np.sin(lat_edges)))
+    return (area_m2 / 10000)[:, np.newaxis]
+
+
+def create_like(path, grid, dtype="float32", nodata=np.nan, block_size=512):
+    """
+    Create a tiled, compressed GeoTIFF on a grid for block-wise writing.
+
+    Args:
+        path: Output path
+        grid: Grid dict
+        dtype: Output data type
+        nodata: Nodata value
+        block_size: Internal tile size (multiple of 16)
+
+    Returns:
+        rasterio dataset open for writing
+    """
+    return rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=grid["width"],
+        height=grid["height"],
+        count=1,
+        dtype=dtype,
+        crs=grid["crs"],
+        transform=grid["transform"],
+        nodata=nodata,
+        tiled=True,
+        blockxsize=block_size,
+        blockysize=block_size,
+        compress="lzw",
+    )
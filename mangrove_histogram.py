@@ -0,0 +1,225 @@
+"""
+Joint Index Histogram with Cumulative Threshold Queries
+
+Accumulates pixel area and area-weighted NDVI into a joint NDVI/NDWI/SAVI
+histogram in one chunked pass over the pixels. Because the biomass model is
+linear in NDVI (Biomass = a × NDVI + b), the total biomass of any threshold
+set is a × Σ(NDVI·area) + b × Σarea over the selected bins. With cumulative
+sums over the histogram, each threshold set is answered by a constant-time
+lookup, so thousands of parameter sets cost little more than the one pass.
+
+Threshold precision equals the bin width at the threshold, so bin edges are
+chosen fine where thresholds may fall and coarse elsewhere.
+"""
+
+import numpy as np
+
+# Rows per block when binning pixels (bounds temporary memory)
+BLOCK_ROWS = 512
+
+
+def threshold_edges(center, spread, n_bins=64, width=4.0):
+    """
+    Bin edges that resolve a threshold finely around its nominal value.
+
+    Args:
+        center: Nominal threshold value
+        spread: Half-width scale (e.g. one standard deviation)
+        n_bins: Number of fine bins across center ± width × spread
+        width: Window half-width in units of spread
+
+    Returns:
+        Sorted edges including -inf and +inf catch-all bins
+    """
+    fine = np.linspace(center - width * spread, center + width * spread, n_bins + 1)
+    return np.concatenate([[-np.inf], fine, [np.inf]])
+
+
+def uniform_edges(low, high, step):
+    """
+    Evenly spaced bin edges with -inf/+inf catch-all bins.
+
+    Args:
+        low: Lowest finite edge
+        high: Highest finite edge
+        step: Bin width
+
+    Returns:
+        Sorted edges
+    """
+    n_bins = int(round((high - low) / step))
+    return np.concatenate([[-np.inf], np.linspace(low, high, n_bins + 1), [np.inf]])
+
+
+def merge_edges(*edge_sets):
+    """Combine edge arrays into one sorted, de-duplicated edge array."""
+    return np.unique(np.concatenate(edge_sets))
+
+
+class IndexHistogram:
+    """
+    Joint NDVI/NDWI/SAVI histogram of pixel area and NDVI·area.
+
+    NDWI and SAVI axes collapse to a single bin when those indices are not
+    used (e.g. the NDVI-only marimo workflow).
+    """
+
+    def __init__(self, ndvi_edges, ndwi_edges=None, savi_edges=None):
+        infinite = np.array([-np.inf, np.inf])
+        self.edges = [
+            np.asarray(ndwi_edges if ndwi_edges is not None else infinite, float),
+            np.asarray(savi_edges if savi_edges is not None else infinite, float),
+            np.asarray(ndvi_edges, float),
+        ]
+        shape = tuple(len(e) - 1 for e in self.edges)
+        self.area = np.zeros(shape)
+        self.ndvi_area = np.zeros(shape)
+        self._cumulative = None
+
+    def add(self, ndvi, ndwi=None, savi=None, area_ha=0.01, keep=None):
+        """
+        Accumulate pixels into the histogram, block by block.
+
+        NaN pixels (no data) are skipped.
+
+        Args:
+            ndvi: NDVI array (y, x)
+            ndwi: Optional NDWI array (y, x)
+            savi: Optional SAVI array (y, x)
+            area_ha: Pixel area in hectares; scalar or array broadcasting
+                against (y, x), e.g. per-row areas on a geographic grid
+            keep: Optional (y, x) mask; pixels where it is 0 are skipped
+                (e.g. pixels removed by mask cleanup)
+        """
+        ndvi = np.asarray(ndvi)
+        area_ha = np.broadcast_to(np.asarray(area_ha, float), ndvi.shape)
+        layers = [ndwi, savi, ndvi]
+
+        for row in range(0, ndvi.shape[0], BLOCK_ROWS):
+            rows = slice(row, row + BLOCK_ROWS)
+            values = [
+                None if v is None else np.asarray(v)[rows].ravel() for v in layers
+            ]
+
+            valid = np.ones(values[2].shape, dtype=bool)
+            if keep is not None:
+                valid &= np.asarray(keep)[rows].ravel() > 0
+            for v in values:
+                if v is not None:
+                    valid &= ~np.isnan(v)
+
+            bins = np.ravel_multi_index(
+                [
+                    (
+                        np.zeros(valid.sum(), dtype=np.intp)
+                        if v is None
+                        else np.clip(
+                            np.searchsorted(e, v[valid], side="right") - 1,
+                            0,
+                            len(e) - 2,
+                        )
+                    )
+                    for v, e in zip(values, self.edges, strict=True)
+                ],
+                self.area.shape,
+            )
+            weights = area_ha[rows].ravel()[valid]
+
+            size = self.area.size
+            self.area += np.bincount(bins, weights, size).reshape(self.area.shape)
+            self.ndvi_area += np.bincount(
+                bins, weights * values[2][valid], size
+            ).reshape(self.area.shape)
+
+        self._cumulative = None
+
+    def merge(self, other):
+        """
+        Add another histogram with identical edges (e.g. from another tile).
+
+        Raises:
+            ValueError: If the histograms were built with different edges
+        """
+        if not all(
+            np.array_equal(mine, theirs)
+            for mine, theirs in zip(self.edges, other.edges, strict=True)
+        ):
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.area += other.area
+        self.ndvi_area += other.ndvi_area
+        self._cumulative = None
+        return self
+
+    def to_arrays(self, prefix=""):
+        """
+        Edges and sums as named arrays, e.g. for numpy.savez.
+
+        Args:
+            prefix: Prefix for the array names
+
+        Returns:
+            Dictionary of name → array; restore with from_arrays()
+        """
+        return {
+            f"{prefix}ndwi_edges": self.edges[0],
+            f"{prefix}savi_edges": self.edges[1],
+            f"{prefix}ndvi_edges": self.edges[2],
+            f"{prefix}area": self.area,
+            f"{prefix}ndvi_area": self.ndvi_area,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix=""):
+        """Rebuild a histogram from to_arrays() output (or a loaded .npz)."""
+        histogram = cls(
+            arrays[f"{prefix}ndvi_edges"],
+            arrays[f"{prefix}ndwi_edges"],
+            arrays[f"{prefix}savi_edges"],
+        )
+        histogram.area = np.array(arrays[f"{prefix}area"], float)
+        histogram.ndvi_area = np.array(arrays[f"{prefix}ndvi_area"], float)
+        return histogram
+
+    def _cumulative_sums(self):
+        """
+        Suffix sums over NDWI/SAVI and prefix sums over NDVI.
+
+        Entry [i, j, k] holds the total over NDWI bins ≥ i, SAVI bins ≥ j and
+        NDVI bins < k, padded so every edge index is a valid lookup.
+        """
+        if self._cumulative is None:
+            sums = []
+            for values in (self.area, self.ndvi_area):
+                padded = np.pad(values, ((0, 1), (0, 1), (1, 0)))
+                suffix = padded[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+                sums.append(suffix.cumsum(axis=2))
+            self._cumulative = sums
+        return self._cumulative
+
+    def totals(self, ndvi_min, ndvi_max, ndwi_min=-np.inf, savi_min=-np.inf):
+        """
+        Area and NDVI·area of pixels passing threshold sets.
+
+        All arguments broadcast, so a whole batch of threshold sets is
+        answered with one vectorized lookup. Thresholds snap to the nearest
+        bin edge at or above them.
+
+        Args:
+            ndvi_min: Lower NDVI threshold(s) (exclusive)
+            ndvi_max: Upper NDVI threshold(s) (exclusive)
+            ndwi_min: Lower NDWI threshold(s)
+            savi_min: Lower SAVI threshold(s)
+
+        Returns:
+            Tuple (area_ha, ndvi_area) arrays
+        """
+        area_cum, ndvi_cum = self._cumulative_sums()
+        i = np.searchsorted(self.edges[0], ndwi_min)
+        j = np.searchsorted(self.edges[1], savi_min)
+        lo = np.searchsorted(self.edges[2], ndvi_min)
+        hi = np.searchsorted(self.edges[2], ndvi_max)
+        hi = np.maximum(hi, lo)
+
+        area = area_cum[i, j, hi] - area_cum[i, j, lo]
+        ndvi_area = ndvi_cum[i, j, hi] - ndvi_cum[i, j, lo]
+        return area, ndvi_area
@@ -0,0 +1,112 @@
+"""
+Cache Entry Locks and Atomic Commits
+
+The caches under data_cache/ (scene store, raw cache, stage products,
+chunk checkpoints, the notebook's per-scene files and cube) can be shared
+by several processes: service workers, parallel CLI runs, the notebook.
+Two rules keep them consistent:
+
+- Atomic commits: an entry is written under a temporary name in its own
+  directory and renamed into place once complete (atomic_path), so a crash
+  mid-write never leaves a truncated entry that a later run takes for a
+  cache hit
+- Entry locks: work that fills an entry runs under an exclusive lock on a
+  sibling "<entry>.lock" file (entry_lock). A second worker asking for the
+  same entry waits for the first one, then finds the entry there, instead
+  of downloading it a second time
+
+Locks are advisory fcntl locks held on an open file, so the kernel drops
+them when their process dies: a crashed worker never leaves a stale lock.
+Lock files are left in place, since removing one would race with a worker
+waiting on it. Locks of the same entry do not nest, even within a process.
+"""
+
+import fcntl
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+LOCK_SUFFIX = ".lock"
+
+# A full-scene download on a slow link
+DEFAULT_LOCK_TIMEOUT = 3600
+
+POLL_INTERVAL = 0.5
+
+
+def lock_path(path):
+    """Lock file of a cache entry (a sibling of the entry)."""
+    return os.fspath(path).rstrip(os.sep) + LOCK_SUFFIX
+
+
+@contextmanager
+def entry_lock(path, timeout=DEFAULT_LOCK_TIMEOUT, log=print):
+    """
+    Hold the exclusive lock of a cache entry.
+
+    Args:
+        path: Entry path (file or directory, need not exist yet)
+        timeout: Seconds to wait for another holder (None waits forever)
+        log: Callable for progress messages (print or click.echo)
+
+    Raises:
+        TimeoutError: If the entry is still locked after timeout seconds
+    """
+    lock_file = lock_path(path)
+    os.makedirs(os.path.dirname(lock_file) or ".", exist_ok=True)
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log(f"   ⏳ Waiting for another worker on {os.path.basename(lock_file)}")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                time.sleep(POLL_INTERVAL)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise TimeoutError(
+                            f"Cache entry {path} still locked after {timeout}s"
+                        ) from None
+        yield
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Temporary sibling of a path, renamed to the path when the block succeeds.
+
+    The block creates a file or directory at the yielded path; it keeps
+    path's extension, for writers that pick a format from it. An existing
+    directory at path is replaced. On error the temporary is removed and
+    path is left as it was.
+
+    Args:
+        path: Final file or directory path
+
+    Yields:
+        Temporary path (does not exist yet)
+    """
+    path = os.fspath(path)
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    os.makedirs(directory or ".", exist_ok=True)
+    tmp_path = os.path.join(directory, f".{stem}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+    try:
+        yield tmp_path
+        if os.path.isdir(tmp_path) and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        elif os.path.exists(tmp_path):
+            os.unlink(tmp_path)
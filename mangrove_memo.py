@@ -0,0 +1,163 @@
+"""
+Stage-Level Memoization of Intermediate Products
+
+Each workflow stage (search, indices, mask, biomass) stores its output
+under a key hashed from its parameters and the key of the stage it reads
+from, so a key changes exactly when something upstream of it changes.
+Rerunning with only downstream parameters changed (carbon fraction,
+allometric coefficients, report options) reloads the upstream products
+instead of recomputing them:
+
+    search ──► scene (mangrove_store) ──► indices ──► mask ──► biomass
+    bbox,         item, grid                           model, a, b
+    dates
+
+Products are reloaded lazily: arrays are memory-mapped .npy files, so a
+stage that is reused but never read costs nothing. Each product is written
+to a temporary directory and renamed when complete, so an interrupted run
+never leaves a partial product behind and concurrent runs (e.g. service
+workers) never see one. A stage computes under its product's lock (see
+mangrove_lock), so concurrent runs needing the same product wait for the
+first one instead of computing it again, and a product that fails to
+reload is discarded and recomputed.
+
+Layout:
+
+    data_cache/stages/
+        <stage>/<key>/
+            <name>.npy       one file per array output
+            values.json      all other (JSON-serializable) outputs
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from mangrove_checkpoint import checkpoint_key
+from mangrove_lock import entry_lock
+
+DEFAULT_STAGE_DIR = "data_cache/stages"
+
+VALUES_FILE = "values.json"
+
+
+class StageCache:
+    """
+    Memoizes stage outputs on disk under hashed keys.
+
+    A cache with no directory computes every stage and stores nothing.
+    """
+
+    def __init__(self, directory=DEFAULT_STAGE_DIR, log=print):
+        self.directory = directory
+        self.log = log
+        self.reused = []
+
+    def key(self, stage, *inputs):
+        """
+        Key for a stage's output.
+
+        Args:
+            stage: Stage name
+            *inputs: JSON-serializable parameters, including the keys of
+                upstream stages
+
+        Returns:
+            Hex digest
+        """
+        return checkpoint_key(stage, *inputs)
+
+    def _path(self, stage, key):
+        return os.path.join(self.directory, stage, key)
+
+    def cached(self, stage, key, compute):
+        """
+        Reload a stage's output, or compute and store it.
+
+        Args:
+            stage: Stage name
+            key: Key from key()
+            compute: Callable returning a dict of outputs; numpy arrays are
+                stored as .npy files, other values as JSON
+
+        Returns:
+            Dict of outputs; reloaded arrays are read-only memory maps
+        """
+        if not self.directory:
+            return compute()
+
+        path = self._path(stage, key)
+        with entry_lock(path, log=self.log):
+            if os.path.isdir(path):
+                try:
+                    outputs = load_stage(path)
+                except (OSError, ValueError, EOFError) as e:
+                    self.log(f"   ⚠️  Discarding unreadable {stage} ({key}): {e}")
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    self.log(f"   ♻️  Reusing {stage} ({key})")
+                    self.reused.append(stage)
+                    return outputs
+
+            outputs = compute()
+            save_stage(path, outputs)
+        return outputs
+
+    def clear(self, stage=None):
+        """Remove all stored products, or those of one stage."""
+        if self.directory:
+            shutil.rmtree(
+                self._path(stage, "") if stage else self.directory,
+                ignore_errors=True,
+            )
+
+
+def save_stage(path, outputs):
+    """
+    Write a stage's outputs atomically (temporary directory + rename).
+
+    Args:
+        path: Product directory
+        outputs: Dict of name → array or JSON-serializable value
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path), suffix=".tmp")
+
+    values = {}
+    for name, value in outputs.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), value)
+        else:
+            values[name] = value
+    with open(os.path.join(tmp_path, VALUES_FILE), "w") as f:
+        json.dump(values, f, default=float)
+
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another run stored the same product first; keys match, so keep it
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_stage(path):
+    """
+    Reload a stage's outputs written by save_stage().
+
+    Args:
+        path: Product directory
+
+    Returns:
+        Dict of outputs with arrays memory-mapped (not read until used)
+
+    Raises:
+        ValueError: If a file is truncated or malformed
+    """
+    with open(os.path.join(path, VALUES_FILE)) as f:
+        outputs = json.load(f)
+    for name in os.listdir(path):
+        if name.endswith(".npy"):
+            outputs[name[:-4]] = np.load(os.path.join(path, name), mmap_mode="r")
+    return outputs
@@ -0,0 +1,563 @@
+"""
+Multi-AOI Runs that Fetch Shared Scenes Once
+
+Runs the workflow for every feature of a GeoJSON FeatureCollection. Small
+adjacent or overlapping AOIs usually fall on the same Sentinel-2 tile and
+date, and separate CLI runs would download (and store) the shared pixels
+once per AOI. Here:
+
+1. One STAC search covers the union of all AOIs; each AOI takes the
+   intersecting item with the least cloud and no data over it (or the
+   least tile-wide cloud cover), as a single run would
+2. AOIs on the same item whose bboxes touch or overlap are grouped, and
+   each group's union extent is fetched once
+3. Each AOI's window is sliced from the group's load and run through the
+   rest of the workflow (indices, mask, biomass, carbon, exports)
+
+The per-AOI grid is the one a single run computes, snapped outward to the
+resolution in the item's CRS, so it nests exactly in the union grid and
+every result matches a separate run. Stage cache entries are keyed the
+same way and are shared with single runs.
+
+Features are processed by their bounding box, like the CLI's bbox.
+
+Example:
+
+    python mangrove_multi.py aois.geojson --output-dir multi_results
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import date
+
+import click
+import numpy as np
+import pandas as pd
+import pystac
+import shapely
+import stackstac
+
+from mangrove_cloud import SEARCH_CLOUD_COVER, rank_items, score_items
+from mangrove_grid import data_grid, stack_grid_kwargs
+from mangrove_memo import DEFAULT_STAGE_DIR, StageCache
+from mangrove_models import MODEL_TYPES, parse_features
+from mangrove_remote import DEFAULT_READ_PROFILE, READ_PROFILES, load_read_settings
+from mangrove_store import DEFAULT_STORE
+from mangrove_workflow_cli import (
+    STAC_URL,
+    download_imagery,
+    run_workflow,
+    search_sentinel2,
+)
+
+
+def load_aois(path):
+    """
+    Read AOIs from a GeoJSON FeatureCollection (EPSG:4326).
+
+    Each AOI's ID is the feature's id, else its "name" property, else
+    aoi_<index>, made safe for use as a directory name.
+
+    Args:
+        path: GeoJSON file
+
+    Returns:
+        List of dicts with id, bbox [west, south, east, north] and geometry
+
+    Raises:
+        ValueError: If there are no features or two features share an ID
+    """
+    with open(path) as f:
+        collection = json.load(f)
+    features = (
+        collection["features"]
+        if collection.get("type") == "FeatureCollection"
+        else [collection]
+    )
+    if not features:
+        raise ValueError(f"No features in {path}")
+
+    aois = []
+    for i, feature in enumerate(features):
+        name = feature.get("id") or feature.get("properties", {}).get("name")
+        aoi_id = re.sub(r"[^\w.-]+", "_", str(name)) if name else f"aoi_{i}"
+        geometry = shapely.geometry.shape(feature["geometry"])
+        aois.append({"id": aoi_id, "bbox": list(geometry.bounds), "geometry": geometry})
+
+    ids = [aoi["id"] for aoi in aois]
+    duplicates = sorted({aoi_id for aoi_id in ids if ids.count(aoi_id) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate AOI IDs: {', '.join(duplicates)}")
+    return aois
+
+
+def union_bbox(bboxes):
+    """Bounding box of several [west, south, east, north] boxes."""
+    bboxes = np.asarray(bboxes, dtype=float)
+    return [*bboxes[:, :2].min(axis=0), *bboxes[:, 2:].max(axis=0)]
+
+
+def aoi_items(aoi, items):
+    """
+    Items whose footprint intersects an AOI.
+
+    Items without a footprint are assumed to cover it.
+
+    Args:
+        aoi: AOI from load_aois()
+        items: STAC items from a search over all AOIs
+
+    Returns:
+        List of items
+    """
+    box = shapely.box(*aoi["bbox"])
+    return [
+        item
+        for item in items
+        if item.geometry is None
+        or shapely.geometry.shape(item.geometry).intersects(box)
+    ]
+
+
+def best_item(aoi, items):
+    """
+    Least-cloudy (tile-wide eo:cloud_cover) item intersecting an AOI.
+
+    Args:
+        aoi: AOI from load_aois()
+        items: STAC items from a search over all AOIs
+
+    Returns:
+        pystac.Item, or None if no item intersects the AOI
+    """
+    candidates = aoi_items(aoi, items)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda x: x.properties.get("eo:cloud_cover", 100))
+
+
+def group_aois(aois, items, choose=best_item):
+    """
+    Group AOIs into fetches: same item and touching or overlapping bboxes.
+
+    AOIs on one item that are far apart are fetched separately, so the gap
+    between them is never read.
+
+    Args:
+        aois: AOIs from load_aois()
+        items: STAC items from a search over all AOIs
+        choose: Callable (aoi, items) → item or None picking each AOI's scene
+
+    Returns:
+        List of dicts with the item, the union bbox and the group's AOIs;
+        AOIs without an item are left out
+    """
+    by_item = {}
+    for aoi in aois:
+        item = choose(aoi, items)
+        if item is not None:
+            by_item.setdefault(item.id, (item, []))[1].append(aoi)
+
+    groups = []
+    for item, members in by_item.values():
+        clusters = []
+        for aoi in members:
+            box = shapely.box(*aoi["bbox"])
+            touching = [c for c in clusters if c["extent"].intersects(box)]
+            clusters = [c for c in clusters if c not in touching]
+            clusters.append(
+                {
+                    "extent": shapely.union_all(
+                        [box, *(c["extent"] for c in touching)]
+                    ),
+                    "aois": [a for c in touching for a in c["aois"]] + [aoi],
+                }
+            )
+        for cluster in clusters:
+            groups.append(
+                {
+                    "item": item,
+                    "bbox": union_bbox([aoi["bbox"] for aoi in cluster["aois"]]),
+                    "aois": cluster["aois"],
+                }
+            )
+    return groups
+
+
+def aoi_window(aoi_grid, union_grid):
+    """
+    Pixel window of an AOI's grid inside a union grid.
+
+    Args:
+        aoi_grid: Grid dict of the AOI's own load (see mangrove_grid)
+        union_grid: Grid dict of the union load
+
+    Returns:
+        (row_off, col_off, height, width)
+
+    Raises:
+        ValueError: If the grids are not aligned or the AOI is not inside
+    """
+    aoi, union = aoi_grid["transform"], union_grid["transform"]
+    if aoi_grid["crs"] != union_grid["crs"] or not np.allclose(
+        [aoi.a, aoi.e], [union.a, union.e]
+    ):
+        raise ValueError("AOI grid does not match the union grid")
+
+    col_off = (aoi.c - union.c) / union.a
+    row_off = (aoi.f - union.f) / union.e
+    if not np.allclose([col_off, row_off], np.round([col_off, row_off]), atol=1e-6):
+        raise ValueError("AOI grid is not aligned with the union grid")
+
+    row_off, col_off = int(round(row_off)), int(round(col_off))
+    height, width = aoi_grid["height"], aoi_grid["width"]
+    if (
+        row_off < 0
+        or col_off < 0
+        or row_off + height > union_grid["height"]
+        or col_off + width > union_grid["width"]
+    ):
+        raise ValueError("AOI grid extends beyond the union grid")
+    return row_off, col_off, height, width
+
+
+def slice_aoi(data, grid, window):
+    """
+    Cut an AOI's window out of a union load.
+
+    Args:
+        data: Union load (stackstac or scene store DataArray)
+        grid: Grid dict of the AOI's own load
+        window: (row_off, col_off, height, width) from aoi_window()
+
+    Returns:
+        DataArray on the AOI's grid (lazy if data is lazy)
+    """
+    row_off, col_off, height, width = window
+    sliced = data.isel(
+        y=slice(row_off, row_off + height), x=slice(col_off, col_off + width)
+    )
+    return sliced.assign_attrs(transform=grid["transform"])
+
+
+def run_multi(
+    aois,
+    cloud_cover,
+    days_back,
+    output_dir,
+    native_crs=True,
+    read_settings=None,
+    checkpoint_dir=None,
+    scene_store=None,
+    stage_cache=None,
+    catalog=None,
+    aoi_cloud=True,
+    progress_json=None,
+    **workflow_kwargs,
+):
+    """
+    Run the workflow for several AOIs, fetching each shared extent once.
+
+    Args:
+        aois: AOIs from load_aois()
+        cloud_cover: Maximum cloud cover percentage (over each AOI, cloud and
+            no data, when aoi_cloud is set)
+        days_back: Days to search backwards from today
+        output_dir: Output directory; each AOI's results go to
+            output_dir/<aoi id>/
+        native_crs: Load on the scene's UTM grid (False warps to EPSG:4326)
+        read_settings: Remote read settings (see mangrove_remote)
+        checkpoint_dir: Directory for resumable chunk stores (None disables)
+        scene_store: Zarr scene store; union extents are stored there and
+            sliced lazily (None disables)
+        stage_cache: Stage cache directory (None disables)
+        catalog: Opened STAC catalog (None opens one per search)
+        aoi_cloud: Pick each AOI's scene on cloud and no data over that AOI
+            (see mangrove_cloud) instead of tile-wide eo:cloud_cover
+        progress_json: File to append JSON download progress lines to, "-"
+            for stderr (see mangrove_progress; None disables)
+        **workflow_kwargs: Passed to run_workflow() (model, slope, polygons, ...)
+
+    Returns:
+        DataFrame with one row per AOI (scene, area, biomass and carbon)
+    """
+    # 1. One search over all AOIs (reused for the rest of the day)
+    bbox = union_bbox([aoi["bbox"] for aoi in aois])
+    search_cloud = SEARCH_CLOUD_COVER if aoi_cloud else cloud_cover
+    cache = StageCache(stage_cache, log=click.echo)
+    search_key = cache.key(
+        "search", STAC_URL, bbox, search_cloud, days_back, date.today().isoformat()
+    )
+    found = cache.cached(
+        "search",
+        search_key,
+        lambda: {
+            "items": [
+                item.to_dict()
+                for item in search_sentinel2(bbox, search_cloud, days_back, catalog)
+            ]
+        },
+    )
+    items = [pystac.Item.from_dict(item) for item in found["items"]]
+
+    def best_scored(aoi, items):
+        candidates = aoi_items(aoi, items)
+        if not candidates:
+            return None
+        scores = score_items(
+            candidates, aoi["bbox"], read_settings=read_settings, log=click.echo
+        )
+        ranked = rank_items(candidates, scores, cloud_cover)
+        return ranked[0] if ranked else None
+
+    # 2. Group AOIs by shared item and extent
+    groups = group_aois(aois, items, best_scored if aoi_cloud else best_item)
+    grouped = {aoi["id"] for group in groups for aoi in group["aois"]}
+    for aoi in aois:
+        if aoi["id"] not in grouped:
+            click.echo(f"⚠️  No usable scene for AOI {aoi['id']}; skipped")
+    click.echo(f"🗂️  {len(grouped)} AOIs in {len(groups)} fetches")
+
+    rows = []
+    fetched = requested = unique = 0
+    for group in groups:
+        item = group["item"]
+        click.echo(f"\n📦 {item.id}: {', '.join(a['id'] for a in group['aois'])}")
+
+        # 3. Fetch the union extent once (lazy when stored: slices read
+        # only their own chunks)
+        data = download_imagery(
+            item,
+            group["bbox"],
+            native_crs,
+            read_settings,
+            checkpoint_dir,
+            scene_store,
+            lazy=bool(scene_store),
+            progress_json=progress_json,
+        )
+        union_grid = data_grid(data)
+        covered = np.zeros((union_grid["height"], union_grid["width"]), dtype=bool)
+
+        # 4. Slice each AOI on the grid a single run would use
+        for aoi in group["aois"]:
+            grid_kwargs = stack_grid_kwargs(item, aoi["bbox"], native_crs)
+            # Lazy: only the grid is computed, no pixels are read
+            grid = data_grid(stackstac.stack([item], assets=["red"], **grid_kwargs))
+            window = aoi_window(grid, union_grid)
+            row_off, col_off, height, width = window
+            covered[row_off : row_off + height, col_off : col_off + width] = True
+            requested += height * width
+
+            click.echo(f"\n🔲 AOI {aoi['id']}: {width}×{height} px")
+            result = run_workflow(
+                aoi["bbox"],
+                cloud_cover,
+                days_back,
+                os.path.join(output_dir, aoi["id"]),
+                native_crs=native_crs,
+                read_settings=read_settings,
+                checkpoint_dir=checkpoint_dir,
+                scene_store=scene_store,
+                stage_cache=stage_cache,
+                scene=(item, slice_aoi(data, grid, window)),
+                **workflow_kwargs,
+            )
+            rows.append(
+                {
+                    "AOI": aoi["id"],
+                    "Scene": result["scene_id"],
+                    "Date": result["scene_date"][:10],
+                    "Cloud Cover (%)": result["cloud_cover"],
+                    "Mangrove Area (ha)": result["mangrove_area_ha"],
+                    "Mean Biomass (Mg/ha)": result["biomass"]["mean"],
+                    "Total Biomass (Mg)": result["carbon"]["total_biomass"],
+                    "Carbon Stock (Mg C)": result["carbon"]["carbon_stock"],
+                    "CO2 Equivalent (Mg)": result["carbon"]["co2_equivalent"],
+                }
+            )
+        fetched += covered.size
+        unique += int(covered.sum())
+
+    click.echo(
+        f"\n📐 Fetched {fetched:,} px for {requested:,} px of AOIs "
+        f"({unique:,} px unique)"
+    )
+    summary = pd.DataFrame(rows)
+    os.makedirs(output_dir, exist_ok=True)
+    summary.to_csv(os.path.join(output_dir, "aoi_summary.csv"), index=False)
+    return summary
+
+
+@click.command(
+    short_help="Mangrove biomass for many AOIs",
+    help="""
+    Runs the mangrove workflow for every feature of a GeoJSON
+    FeatureCollection. AOIs sharing a Sentinel-2 scene and touching or
+    overlapping each other are fetched as one extent, and each AOI's
+    results are sliced from it. Results go to OUTPUT_DIR/<aoi id>/, with a
+    per-AOI table in OUTPUT_DIR/aoi_summary.csv.
+
+    Example:
+
+        python mangrove_multi.py aois.geojson --output-dir multi_results
+    """,
+)
+@click.argument("aois", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--cloud-cover",
+    type=int,
+    default=20,
+    help="Maximum cloud cover percentage (0-100), over each AOI with --aoi-cloud "
+    "[default: 20]",
+)
+@click.option(
+    "--days-back",
+    type=int,
+    default=90,
+    help="Days to search backwards from today [default: 90]",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="multi_results",
+    help="Output directory for results [default: multi_results]",
+)
+@click.option(
+    "--native-crs/--latlon-grid",
+    default=True,
+    help="Load on the scene's UTM grid or warp to EPSG:4326 [default: native-crs]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--read-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config with a sentinel2.read_settings section",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=str,
+    default=None,
+    help="Chunk store for resuming interrupted downloads [default: OUTPUT_DIR/.chunks]",
+)
+@click.option(
+    "--scene-store",
+    type=str,
+    default=DEFAULT_STORE,
+    help=f"Zarr scene store, '' to disable [default: {DEFAULT_STORE}]",
+)
+@click.option(
+    "--stage-cache",
+    type=str,
+    default=DEFAULT_STAGE_DIR,
+    help=f"Stage cache directory, '' to disable [default: {DEFAULT_STAGE_DIR}]",
+)
+@click.option(
+    "--aoi-cloud/--tile-cloud",
+    default=True,
+    help="Pick each AOI's scene on cloud and no data over it (SCL band) or on "
+    "tile-wide eo:cloud_cover [default: aoi-cloud]",
+)
+@click.option(
+    "--model",
+    type=click.Choice(list(MODEL_TYPES)),
+    default="ndvi_linear",
+    help="Biomass model [default: ndvi_linear]",
+)
+@click.option(
+    "--model-path",
+    type=str,
+    default=None,
+    help="Saved model file for random_forest (joblib) or neural_network (ONNX)",
+)
+@click.option(
+    "--features",
+    type=str,
+    default=None,
+    help="Comma-separated features of random_forest/neural_network in training "
+    "order, from red, green, nir, ndvi, ndwi, savi [default: all]",
+)
+@click.option(
+    "--carbon-fraction",
+    type=float,
+    default=0.47,
+    help="Carbon fraction of dry biomass [default: 0.47, IPCC]",
+)
+@click.option(
+    "--polygons",
+    is_flag=True,
+    default=False,
+    help="Write mangrove patches with zonal stats as GeoParquet",
+)
+@click.option(
+    "--uncertainty-draws",
+    type=int,
+    default=1000,
+    help="Monte Carlo draws for confidence intervals, 0 to skip [default: 1000]",
+)
+@click.option(
+    "--progress-json",
+    type=str,
+    default=None,
+    help="Append machine-readable download progress lines (JSON) to this file, "
+    "or '-' for stderr",
+)
+def main(
+    aois,
+    cloud_cover,
+    days_back,
+    output_dir,
+    native_crs,
+    read_profile,
+    read_config,
+    checkpoint_dir,
+    scene_store,
+    stage_cache,
+    aoi_cloud,
+    model,
+    model_path,
+    features,
+    carbon_fraction,
+    polygons,
+    uncertainty_draws,
+    progress_json,
+):
+    """Run the workflow for each AOI of a FeatureCollection."""
+    try:
+        aoi_features = load_aois(aois)
+        click.echo(f"🌿 {len(aoi_features)} AOIs from {aois}")
+        summary = run_multi(
+            aoi_features,
+            cloud_cover,
+            days_back,
+            output_dir,
+            native_crs=native_crs,
+            read_settings=load_read_settings(read_config, read_profile),
+            checkpoint_dir=checkpoint_dir or os.path.join(output_dir, ".chunks"),
+            scene_store=scene_store,
+            stage_cache=stage_cache,
+            aoi_cloud=aoi_cloud,
+            model=model,
+            model_path=model_path,
+            features=parse_features(features),
+            carbon_fraction=carbon_fraction,
+            polygons=polygons,
+            uncertainty_draws=uncertainty_draws,
+            progress_json=progress_json,
+        )
+        click.echo(f"\n✅ {len(summary)} AOIs: {output_dir}/aoi_summary.csv")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
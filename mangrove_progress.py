@@ -0,0 +1,234 @@
+"""
+Live Progress for Chunked Downloads and Compute
+
+Computing a lazy stackstac array gives no feedback until it returns, so a
+slow network cannot be told apart from a hung job. Progress tracks the
+output chunks of one computation and reports, every few seconds:
+
+    chunks       output chunks done / total
+    MB/s         chunk data delivered (for a single-scene download, the
+                 decoded pixels fetched)
+    px/s         output pixels (y × x, all bands) per second
+    ETA          remaining chunks at the average rate so far
+    idle         seconds since the last chunk completed
+
+Lines are printed to the console and, optionally, appended as JSON lines
+to a file (or stderr with "-") for an orchestrator. Reports keep coming
+while no chunk completes, with idle_s growing, so a watchdog can kill a
+stalled job as soon as idle_s passes its limit:
+
+    {"event": "progress", "stage": "download", "chunks_done": 12,
+     "chunks_total": 48, "mb": 37.5, "mb_per_s": 18.2, "px_per_s": 1590000,
+     "eta_s": 6.1, "idle_s": 0.4, "elapsed_s": 2.1, "time": "..."}
+
+Each computation emits one "start" line, "progress" lines, and a "done"
+(or "failed") line. compute_with_progress() hooks a Progress into dask's
+local schedulers through a callback; mangrove_checkpoint reports its
+chunk-by-chunk fetches directly.
+"""
+
+import itertools
+import json
+import math
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+
+from dask.callbacks import Callback
+from dask.core import flatten
+
+DEFAULT_INTERVAL = 2.0
+
+
+class Progress:
+    """Chunk progress of one computation, reported on a timer."""
+
+    def __init__(self, stage, log=print, json_path=None, interval=DEFAULT_INTERVAL):
+        """
+        Args:
+            stage: Name of the computation (e.g. "download", "composite")
+            log: Callable for console lines (print or click.echo)
+            json_path: File to append JSON progress lines to, "-" for
+                stderr (None disables)
+            interval: Seconds between reports
+        """
+        self.stage = stage
+        self.log = log
+        self.json_path = json_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._ticker = None
+
+    def start(self, total, done=0, layers=1):
+        """
+        Start timing and reporting.
+
+        Args:
+            total: Number of chunks
+            done: Chunks already available (e.g. resumed from a checkpoint);
+                they count towards the total but not the rates
+            layers: Values per pixel in the whole array (time × band), so a
+                chunk holding one band counts for its share of the pixels
+        """
+        self.total = total
+        self.done = self.resumed = done
+        self.layers = layers
+        self.nbytes = 0
+        self.pixels = 0
+        self.started = self.last_chunk = time.monotonic()
+        self._emit("start")
+        self._stopped.clear()
+        self._ticker = threading.Thread(target=self._tick, daemon=True)
+        self._ticker.start()
+
+    def advance(self, values):
+        """Record one completed chunk (a numpy array)."""
+        with self._lock:
+            self.done += 1
+            self.nbytes += values.nbytes
+            self.pixels += values.size / self.layers
+            self.last_chunk = time.monotonic()
+
+    def finish(self, failed=False):
+        """Stop reporting and emit the final line."""
+        self._stopped.set()
+        if self._ticker is not None:
+            self._ticker.join()
+            self._ticker = None
+        self._emit("failed" if failed else "done")
+
+    def snapshot(self):
+        """Current counters and rates as a dictionary."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self.started
+            fetched = self.done - self.resumed
+            rate = fetched / elapsed if elapsed > 0 else 0.0
+            return {
+                "stage": self.stage,
+                "chunks_done": self.done,
+                "chunks_total": self.total,
+                "mb": round(self.nbytes / 2**20, 1),
+                "mb_per_s": round(self.nbytes / 2**20 / elapsed, 2) if elapsed else 0,
+                "px_per_s": round(self.pixels / elapsed) if elapsed else 0,
+                "eta_s": round((self.total - self.done) / rate, 1) if rate else None,
+                "idle_s": round(now - self.last_chunk, 1),
+                "elapsed_s": round(elapsed, 1),
+            }
+
+    def _tick(self):
+        while not self._stopped.wait(self.interval):
+            self._emit("progress")
+
+    def _emit(self, event):
+        state = self.snapshot()
+        if event == "progress" or event == "done":
+            self.log(_console_line(state, event, self.interval))
+        elif event == "failed":
+            self.log(
+                f"   {self.stage.capitalize()}: failed after {state['elapsed_s']}s"
+            )
+
+        if self.json_path:
+            line = json.dumps(
+                {
+                    "event": event,
+                    **state,
+                    "time": datetime.now(UTC).isoformat(timespec="seconds"),
+                }
+            )
+            if self.json_path == "-":
+                print(line, file=sys.stderr, flush=True)
+            else:
+                with open(self.json_path, "a") as f:
+                    f.write(line + "\n")
+
+
+def _console_line(state, event, interval):
+    """Human-readable progress line."""
+    done, total = state["chunks_done"], state["chunks_total"]
+    parts = [
+        f"{done}/{total} chunks ({done / max(total, 1):.0%})",
+        f"{state['mb_per_s']:.1f} MB/s",
+        f"{state['px_per_s'] / 1e6:.2f} Mpx/s",
+    ]
+    if event == "done":
+        parts.append(f"{state['elapsed_s']}s")
+    elif state["eta_s"] is not None:
+        parts.append(f"ETA {state['eta_s']:.0f}s")
+    if event == "progress" and state["idle_s"] >= interval:
+        parts.append(f"no chunk for {state['idle_s']:.0f}s")
+    return f"   {state['stage'].capitalize()}: " + " · ".join(parts)
+
+
+def pixel_layers(shape):
+    """Values per pixel of an array shaped (..., y, x)."""
+    return max(math.prod(shape[:-2]), 1)
+
+
+class DaskProgress(Callback):
+    """dask callback feeding a Progress with the output chunks of a graph."""
+
+    def __init__(self, progress, keys, layers=1):
+        """
+        Args:
+            progress: Progress to report to
+            keys: Output chunk keys of the collection being computed
+            layers: Values per pixel of the collection (see Progress.start)
+        """
+        super().__init__()
+        self.progress = progress
+        self.keys = set(keys)
+        self.layers = layers
+
+    def _start_state(self, dsk, state):
+        # Callbacks are global: other graphs computed meanwhile are ignored
+        if not self.keys.isdisjoint(dsk):
+            self.progress.start(len(self.keys), layers=self.layers)
+
+    def _posttask(self, key, result, dsk, state, id):
+        if key in self.keys:
+            self.progress.advance(result)
+
+    def _finish(self, dsk, state, errored):
+        if not self.keys.isdisjoint(dsk):
+            self.progress.finish(failed=errored)
+
+
+def compute_with_progress(
+    lazy,
+    stage="download",
+    log=print,
+    json_path=None,
+    interval=DEFAULT_INTERVAL,
+    blocks=None,
+):
+    """
+    Compute a lazy DataArray, reporting chunk progress while it runs.
+
+    Args:
+        lazy: dask-backed xarray.DataArray (e.g. stackstac.stack output)
+        stage: Name of the computation in progress lines
+        log: Callable for console lines (print or click.echo)
+        json_path: File to append JSON progress lines to, "-" for stderr
+        interval: Seconds between reports
+        blocks: Boolean array of (chunk rows, chunk columns) actually read;
+            the other chunks are constants and are not counted (None counts
+            all)
+
+    Returns:
+        Computed xarray.DataArray
+    """
+    progress = Progress(stage, log, json_path, interval)
+    keys = flatten(lazy.data.__dask_keys__())
+    if blocks is not None:
+        indices = itertools.product(*(range(n) for n in lazy.data.numblocks))
+        keys = [
+            key
+            for index, key in zip(indices, keys, strict=True)
+            if blocks[index[-2], index[-1]]
+        ]
+    with DaskProgress(progress, keys, pixel_layers(lazy.shape)):
+        return lazy.compute()
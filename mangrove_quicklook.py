@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Quicklooks of Search Results from COG Overviews
+
+Before committing to a full download, every candidate scene of a search is
+previewed over the AOI: a true-colour RGB and an NDVI image a few hundred
+pixels across, plus the AOI's valid-data coverage and mean NDVI.
+
+A preview reads the AOI window at preview size, so GDAL serves it from the
+coarsest COG overview that still covers that size: a handful of range
+requests per band instead of the full-resolution tiles. Bands and scenes
+are read concurrently, so dozens of candidates preview in seconds.
+
+Previews are cached as PNGs keyed by scene, AOI and size:
+
+    data_cache/quicklooks/
+        <item_id>_<aoi hash>/
+            rgb.png          uint8 RGB, black where no data
+            ndvi.png         uint8, NDVI -1..1 as 1..255, 0 where no data
+            stats.json       valid_pct, ndvi_mean, mangrove_pct
+
+Example:
+
+    python mangrove_quicklook.py --west 88.85 --south 21.85 --east 89.0 --north 22.0
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+
+from mangrove_checkpoint import checkpoint_key
+from mangrove_remote import (
+    DEFAULT_READ_PROFILE,
+    READ_PROFILES,
+    gdal_options,
+    load_read_settings,
+    read_overview,
+    rescale_asset,
+    resolve_read_settings,
+)
+from mangrove_workflow_cli import search_sentinel2
+
+DEFAULT_QUICKLOOK_DIR = "data_cache/quicklooks"
+
+DEFAULT_SIZE = 256
+
+QUICKLOOK_ASSETS = ["red", "green", "blue", "nir"]
+
+# Reflectance mapped to full brightness in the RGB preview (fixed, so
+# previews of different dates compare directly)
+RGB_MAX_REFLECTANCE = 0.3
+
+
+def quicklook_key(item_id, bbox, size=DEFAULT_SIZE):
+    """
+    Cache key for a scene's quicklook over an AOI.
+
+    Args:
+        item_id: STAC item ID
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Preview size (longest side, pixels)
+
+    Returns:
+        Directory name within the quicklook cache
+    """
+    return f"{item_id}_{checkpoint_key(list(bbox), size)[:8]}"
+
+
+def _to_rgb(red, green, blue):
+    rgb = np.stack([red, green, blue], axis=-1) / RGB_MAX_REFLECTANCE
+    rgb = np.clip(np.nan_to_num(rgb, nan=0.0), 0, 1)
+    return (rgb * 255).round().astype(np.uint8)
+
+
+def _encode_ndvi(ndvi):
+    encoded = np.round((np.clip(ndvi, -1, 1) + 1) * 127).astype(np.int16) + 1
+    return np.where(np.isnan(ndvi), 0, encoded).astype(np.uint8)
+
+
+def _decode_ndvi(encoded):
+    return np.where(encoded == 0, np.nan, (encoded.astype(np.float32) - 1) / 127 - 1)
+
+
+def _write_png(path, image):
+    """Write an (rows, cols) or (rows, cols, bands) uint8 image as PNG."""
+    bands = image.reshape(*image.shape[:2], -1).transpose(2, 0, 1)
+    profile = {
+        "driver": "PNG",
+        "width": bands.shape[2],
+        "height": bands.shape[1],
+        "count": bands.shape[0],
+        "dtype": "uint8",
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(bands)
+
+
+def _read_png(path):
+    with rasterio.open(path) as src:
+        image = src.read()
+    return image[0] if image.shape[0] == 1 else image.transpose(1, 2, 0)
+
+
+def _load_quicklook(path):
+    with open(os.path.join(path, "stats.json")) as f:
+        stats = json.load(f)
+    return {
+        **stats,
+        "rgb": _read_png(os.path.join(path, "rgb.png")),
+        "ndvi": _decode_ndvi(_read_png(os.path.join(path, "ndvi.png"))),
+        "path": path,
+    }
+
+
+def _save_quicklook(path, rgb, ndvi, stats):
+    """Write a quicklook atomically (temporary directory + rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path), suffix=".tmp")
+    _write_png(os.path.join(tmp_path, "rgb.png"), rgb)
+    _write_png(os.path.join(tmp_path, "ndvi.png"), _encode_ndvi(ndvi))
+    with open(os.path.join(tmp_path, "stats.json"), "w") as f:
+        json.dump(stats, f)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Built concurrently by another run; keep theirs
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def quicklook(
+    item,
+    bbox,
+    size=DEFAULT_SIZE,
+    cache_dir=DEFAULT_QUICKLOOK_DIR,
+    read_settings=None,
+    pool=None,
+):
+    """
+    RGB and NDVI preview of one scene over an AOI, from COG overviews.
+
+    Args:
+        item: STAC item with red, green, blue and nir assets
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Preview size (longest side, pixels)
+        cache_dir: Quicklook cache directory (None disables caching)
+        read_settings: Remote read settings (see mangrove_remote)
+        pool: Executor to read the bands concurrently (default: in turn)
+
+    Returns:
+        Dictionary with rgb (uint8 rows × cols × 3), ndvi (float32, NaN
+        where no data), valid_pct, ndvi_mean and mangrove_pct (share of
+        valid pixels with 0.4 < NDVI < 0.95)
+    """
+    path = cache_dir and os.path.join(cache_dir, quicklook_key(item.id, bbox, size))
+    if path and os.path.isdir(path):
+        return _load_quicklook(path)
+
+    settings = resolve_read_settings() if read_settings is None else read_settings
+
+    def read(asset):
+        # No directory listing for sidecar files, as in stackstac's env
+        with rasterio.Env(
+            GDAL_DISABLE_READDIR_ON_OPEN="EMPTY_DIR", **gdal_options(settings)
+        ):
+            values = read_overview(item.assets[asset].href, bbox, size)
+        return rescale_asset(item, asset, values)
+
+    bands = dict(
+        zip(
+            QUICKLOOK_ASSETS,
+            (pool.map if pool else map)(read, QUICKLOOK_ASSETS),
+            strict=True,
+        )
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndvi = (bands["nir"] - bands["red"]) / (bands["nir"] + bands["red"])
+    valid = ~np.isnan(ndvi)
+    stats = {
+        "valid_pct": float(valid.mean() * 100),
+        "ndvi_mean": float(ndvi[valid].mean()) if valid.any() else None,
+        "mangrove_pct": float(((ndvi > 0.4) & (ndvi < 0.95)).sum() / valid.sum() * 100)
+        if valid.any()
+        else 0.0,
+    }
+    rgb = _to_rgb(bands["red"], bands["green"], bands["blue"])
+
+    if path:
+        _save_quicklook(path, rgb, ndvi, stats)
+    return {**stats, "rgb": rgb, "ndvi": ndvi, "path": path}
+
+
+def build_quicklooks(
+    items,
+    bbox,
+    size=DEFAULT_SIZE,
+    cache_dir=DEFAULT_QUICKLOOK_DIR,
+    read_settings=None,
+    workers=16,
+    log=print,
+):
+    """
+    Quicklooks for all search results, read concurrently.
+
+    A scene that fails to read is reported and gets an "error" entry
+    instead of a preview, so one bad asset does not stop the rest.
+
+    Args:
+        items: STAC items
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Preview size (longest side, pixels)
+        cache_dir: Quicklook cache directory (None disables caching)
+        read_settings: Remote read settings (see mangrove_remote)
+        workers: Concurrent band reads
+        log: Callable for progress messages (print or click.echo)
+
+    Returns:
+        List of dicts (one per item, in order) with item_id, datetime,
+        cloud_cover and the quicklook() outputs
+    """
+    log(f"🖼️  Building quicklooks for {len(items)} scenes ({size} px)...")
+
+    with ThreadPoolExecutor(workers) as bands_pool, ThreadPoolExecutor(
+        max(1, workers // len(QUICKLOOK_ASSETS))
+    ) as scenes_pool:
+
+        def build(item):
+            entry = {
+                "item_id": item.id,
+                "datetime": item.datetime,
+                "cloud_cover": item.properties.get("eo:cloud_cover"),
+            }
+            try:
+                preview = quicklook(
+                    item, bbox, size, cache_dir, read_settings, bands_pool
+                )
+                return {**entry, **preview}
+            except Exception as e:
+                log(f"   ⚠️  {item.id}: {e}")
+                return {**entry, "error": str(e)}
+
+        quicklooks = list(scenes_pool.map(build, items))
+
+    built = sum("error" not in q for q in quicklooks)
+    log(f"   Previewed {built}/{len(items)} scenes")
+    return quicklooks
+
+
+def quicklook_table(quicklooks):
+    """
+    Candidate table for choosing a scene.
+
+    Args:
+        quicklooks: Output of build_quicklooks()
+
+    Returns:
+        pandas.DataFrame with one row per scene
+    """
+    return pd.DataFrame(
+        [
+            {
+                "Scene": q["item_id"],
+                "Date": q["datetime"].strftime("%Y-%m-%d") if q["datetime"] else "",
+                "Cloud Cover (%)": q["cloud_cover"],
+                "AOI Valid (%)": q.get("valid_pct"),
+                "Mean NDVI": q.get("ndvi_mean"),
+                "Mangrove NDVI (%)": q.get("mangrove_pct"),
+                "Preview": q.get("path") or q.get("error", ""),
+            }
+            for q in quicklooks
+        ]
+    )
+
+
+@click.command(
+    short_help="Quicklooks of candidate scenes",
+    help="""
+    Searches Sentinel-2 L2A scenes for a bounding box and builds small RGB
+    and NDVI previews of the AOI for every result from the COG overviews,
+    without downloading the scenes. Writes quicklooks.csv with the AOI's
+    valid coverage and mean NDVI per scene; previews are cached under
+    --cache-dir.
+
+    Example:
+
+        python mangrove_quicklook.py --west 88.85 --south 21.85 --east 89.0 --north 22.0
+    """,
+)
+@click.option("--west", type=float, required=True, help="Western longitude bound")
+@click.option("--south", type=float, required=True, help="Southern latitude bound")
+@click.option("--east", type=float, required=True, help="Eastern longitude bound")
+@click.option("--north", type=float, required=True, help="Northern latitude bound")
+@click.option(
+    "--cloud-cover",
+    type=int,
+    default=20,
+    help="Maximum cloud cover percentage (0-100) [default: 20]",
+)
+@click.option(
+    "--days-back",
+    type=int,
+    default=90,
+    help="Days to search backwards from today [default: 90]",
+)
+@click.option(
+    "--size",
+    type=int,
+    default=DEFAULT_SIZE,
+    help=f"Preview size, longest side in pixels [default: {DEFAULT_SIZE}]",
+)
+@click.option(
+    "--cache-dir",
+    type=str,
+    default=DEFAULT_QUICKLOOK_DIR,
+    help=f"Quicklook cache [default: {DEFAULT_QUICKLOOK_DIR}]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="outputs",
+    help="Output directory for quicklooks.csv [default: outputs]",
+)
+def main(
+    west,
+    south,
+    east,
+    north,
+    cloud_cover,
+    days_back,
+    size,
+    cache_dir,
+    read_profile,
+    output_dir,
+):
+    """Preview the scenes found for a bounding box."""
+    try:
+        bbox = [west, south, east, north]
+        items = search_sentinel2(bbox, cloud_cover, days_back)
+        quicklooks = build_quicklooks(
+            items,
+            bbox,
+            size,
+            cache_dir,
+            load_read_settings(profile=read_profile),
+            log=click.echo,
+        )
+
+        os.makedirs(output_dir, exist_ok=True)
+        table = quicklook_table(quicklooks)
+        table.to_csv(os.path.join(output_dir, "quicklooks.csv"), index=False)
+        click.echo(f"\n✅ Outputs: {output_dir}/quicklooks.csv")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
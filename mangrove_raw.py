@@ -0,0 +1,146 @@
+"""
+Memory-Mapped Raw Band Cache
+
+The scene store keeps bands compressed, so every reload decompresses all
+three bands and copies them into a new array before the first stage runs.
+The raw cache trades disk space for reload time: bands are stored
+uncompressed, band-sequential (band, y, x) float32, with a JSON sidecar
+holding the band names, coordinates and georeferencing. Reloading opens
+the file with np.memmap and wraps it in an xarray.DataArray without a
+copy, so a reload costs page faults rather than decompression, and a stage
+that reads one band or one window only touches those pages.
+
+Layout:
+
+    data_cache/raw/
+        <scene key>/
+            bands.bin     float32 (band, y, x), C order, native byte order
+            bands.json    dtype, shape, bands, x, y, crs, transform, attrs
+
+Entries are written to a temporary directory and renamed when complete,
+so an interrupted write never leaves a partial entry behind. has_raw()
+also checks that the band file has the size its header promises, so a
+damaged entry reads as missing rather than as a cache hit.
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+
+import numpy as np
+import xarray as xr
+
+from mangrove_lock import atomic_path
+
+DEFAULT_RAW_DIR = "data_cache/raw"
+
+BANDS_FILE = "bands.bin"
+
+HEADER_FILE = "bands.json"
+
+
+def _raw_path(directory, key):
+    return os.path.join(directory, key)
+
+
+def has_raw(directory, key):
+    """Check whether a scene is in the raw cache, with a complete band file."""
+    path = _raw_path(directory, key)
+    try:
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        size = os.path.getsize(os.path.join(path, BANDS_FILE))
+    except (OSError, ValueError):
+        return False
+    itemsize = np.dtype(header["dtype"]).itemsize
+    return size == math.prod(header["shape"]) * itemsize
+
+
+def write_raw(directory, key, data, attrs=None):
+    """
+    Write a scene's bands to the raw cache.
+
+    Bands are written one at a time, so a lazy (dask or zarr) input is
+    never held in memory as a whole.
+
+    Args:
+        directory: Raw cache directory
+        key: Scene key (see mangrove_store.scene_key)
+        data: xarray.DataArray with band/y/x dims (stackstac output or
+            scene_bands())
+        attrs: Extra scene attributes (e.g. datetime, cloud cover)
+    """
+    if "time" in data.dims:
+        data = data.isel(time=0)
+    data = data.transpose("band", "y", "x")
+    shape = tuple(data.shape)
+
+    with atomic_path(_raw_path(directory, key)) as tmp_path:
+        os.makedirs(tmp_path)
+        bands = np.memmap(
+            os.path.join(tmp_path, BANDS_FILE),
+            dtype=np.float32,
+            mode="w+",
+            shape=shape,
+        )
+        for i in range(shape[0]):
+            bands[i] = data.isel(band=i).values
+        bands.flush()
+        del bands
+
+        header = {
+            "dtype": "float32",
+            "byteorder": sys.byteorder,
+            "shape": list(shape),
+            "bands": [str(band) for band in data["band"].values],
+            "y": data["y"].values.tolist(),
+            "x": data["x"].values.tolist(),
+            "crs": str(data.attrs.get("crs") or data.rio.crs),
+            "transform": list(data.attrs.get("transform") or data.rio.transform())[:6],
+            "attrs": attrs or {},
+        }
+        with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+            json.dump(header, f)
+
+
+def open_raw(directory, key):
+    """
+    Open a cached scene as a memory-mapped (band, y, x) DataArray.
+
+    Args:
+        directory: Raw cache directory
+        key: Scene key
+
+    Returns:
+        xarray.DataArray over a read-only np.memmap (no copy), carrying
+        the scene's crs/transform attributes like stackstac output
+
+    Raises:
+        ValueError: If the entry was written on a machine of the other
+            byte order
+    """
+    path = _raw_path(directory, key)
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"Raw cache entry {key} has {header['byteorder']}-endian data")
+
+    bands = np.memmap(
+        os.path.join(path, BANDS_FILE),
+        dtype=header["dtype"],
+        mode="r",
+        shape=tuple(header["shape"]),
+    )
+    return xr.DataArray(
+        bands,
+        dims=("band", "y", "x"),
+        coords={"band": header["bands"], "y": header["y"], "x": header["x"]},
+        attrs={"crs": header["crs"], "transform": header["transform"]},
+    )
+
+
+def clear_raw(directory, key=None):
+    """Remove one cached scene, or the whole raw cache."""
+    shutil.rmtree(_raw_path(directory, key) if key else directory, ignore_errors=True)
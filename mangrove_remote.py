@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Remote COG Read Settings
+
+Sentinel-2 bands are cloud-optimized GeoTIFFs read over HTTP range
+requests, so loading three bands over a small bbox is dominated by request
+latency rather than bandwidth. A read profile bundles the GDAL options that
+decide how many requests are issued and how large they are:
+
+    vsi_cache_mb              Per-file block cache (VSI_CACHE_SIZE)
+    multirange                GDAL_HTTP_MULTIRANGE: YES (parallel ranges),
+                              SERIAL or SINGLE_GET
+    merge_consecutive_ranges  Fetch adjacent tiles in one request
+    http2                     Negotiate HTTP/2 and multiplex over one connection
+    max_retry / retry_delay   Retries on 429/5xx responses
+    block_size_kb             Minimum range request size (CPL_VSIL_CURL_CHUNK_SIZE)
+    header_kb                 Bytes read at open, covering the COG header
+
+Profiles are passed to every stackstac.stack() call as gdal_env. The
+sentinel2.read_settings section of config/demo_config.yaml selects a profile
+and overrides individual settings.
+
+Running this module benchmarks the profiles against a local HTTP COG server
+and reports the requests issued and bytes transferred per profile.
+
+Example:
+
+    python mangrove_remote.py --bbox-pixels 1024 --latency-ms 40 --error-rate 0.2
+"""
+
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+import stackstac
+import yaml
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+
+from mangrove_grid import stack_grid_kwargs
+
+# Settings left out (or None) keep the GDAL/stackstac defaults
+READ_PROFILES = {
+    "stackstac-default": {},
+    "cog": {
+        "vsi_cache_mb": 64,
+        "multirange": "YES",
+        "merge_consecutive_ranges": True,
+        "http2": True,
+        "max_retry": 3,
+        "retry_delay": 0.5,
+        "block_size_kb": 64,
+        "header_kb": 64,
+    },
+}
+
+DEFAULT_READ_PROFILE = "cog"
+
+READ_SETTINGS = [
+    "vsi_cache_mb",
+    "multirange",
+    "merge_consecutive_ranges",
+    "http2",
+    "max_retry",
+    "retry_delay",
+    "block_size_kb",
+    "header_kb",
+]
+
+
+def resolve_read_settings(profile=None, overrides=None):
+    """
+    Merge a named profile with individual setting overrides.
+
+    Args:
+        profile: READ_PROFILES key (default DEFAULT_READ_PROFILE)
+        overrides: Dict of setting name → value
+
+    Returns:
+        Settings dict
+
+    Raises:
+        ValueError: If the profile or a setting name is unknown
+    """
+    profile = profile or DEFAULT_READ_PROFILE
+    if profile not in READ_PROFILES:
+        raise ValueError(f"Unknown read profile: {profile}")
+
+    overrides = dict(overrides or {})
+    unknown = sorted(set(overrides) - set(READ_SETTINGS))
+    if unknown:
+        raise ValueError(f"Unknown read settings: {', '.join(unknown)}")
+
+    return {**READ_PROFILES[profile], **overrides}
+
+
+def load_read_settings(config_path=None, profile=None):
+    """
+    Read settings from the sentinel2.read_settings section of a config file.
+
+    Args:
+        config_path: YAML config (e.g. config/demo_config.yaml); None uses
+            the profile alone
+        profile: Profile name, taking precedence over the config's profile
+
+    Returns:
+        Settings dict
+    """
+    section = {}
+    if config_path:
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+        section = dict((config.get("sentinel2") or {}).get("read_settings") or {})
+
+    config_profile = section.pop("profile", None)
+    return resolve_read_settings(profile or config_profile, section)
+
+
+def gdal_options(settings):
+    """
+    Translate read settings into GDAL configuration options.
+
+    Args:
+        settings: Settings dict from resolve_read_settings()
+
+    Returns:
+        Dict of GDAL option → value
+    """
+    options = {}
+    if settings.get("vsi_cache_mb") is not None:
+        options["VSI_CACHE"] = True
+        options["VSI_CACHE_SIZE"] = int(settings["vsi_cache_mb"] * 2**20)
+    if settings.get("multirange") is not None:
+        options["GDAL_HTTP_MULTIRANGE"] = settings["multirange"]
+    if settings.get("merge_consecutive_ranges") is not None:
+        options["GDAL_HTTP_MERGE_CONSECUTIVE_RANGES"] = (
+            "YES" if settings["merge_consecutive_ranges"] else "NO"
+        )
+    if settings.get("http2"):
+        # Falls back to HTTP/1.1 where the server does not offer HTTP/2
+        options["GDAL_HTTP_VERSION"] = "2TLS"
+        options["GDAL_HTTP_MULTIPLEX"] = "YES"
+    if settings.get("max_retry") is not None:
+        options["GDAL_HTTP_MAX_RETRY"] = int(settings["max_retry"])
+    if settings.get("retry_delay") is not None:
+        options["GDAL_HTTP_RETRY_DELAY"] = float(settings["retry_delay"])
+    if settings.get("block_size_kb") is not None:
+        options["CPL_VSIL_CURL_CHUNK_SIZE"] = int(settings["block_size_kb"] * 1024)
+    if settings.get("header_kb") is not None:
+        options["GDAL_INGESTED_BYTES_AT_OPEN"] = int(settings["header_kb"] * 1024)
+    return options
+
+
+def stack_gdal_env(settings=None):
+    """
+    stackstac gdal_env for a set of read settings.
+
+    stackstac disables the VSI cache while reading; it is re-enabled when
+    the settings size one, so tiles shared by neighbouring chunks are
+    fetched once.
+
+    Args:
+        settings: Settings dict (default: the default profile)
+
+    Returns:
+        stackstac LayeredEnv
+    """
+    options = gdal_options(resolve_read_settings() if settings is None else settings)
+    read = {"VSI_CACHE": True} if options.get("VSI_CACHE") else None
+    return stackstac.DEFAULT_GDAL_ENV.updated(always=options, read=read)
+
+
+class _CountingHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single byte-range support and counters."""
+
+    stats = None
+    latency = 0.0
+    error_rate = 0.0
+    random = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def translate_path(self, path):
+        # /<run>/<file>: the run prefix gives each benchmark run cold URLs
+        parts = path.split("?", 1)[0].strip("/").split("/", 1)
+        return str(Path(self.directory) / parts[-1])
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        header = self.headers.get("Range", "")
+        partial = header.startswith("bytes=") and "," not in header
+        if partial:
+            first, last = header[6:].split("-")
+            start = int(first) if first else max(0, size - int(last))
+            end = min(int(last), size - 1) if first and last else end
+
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", "image/tiff")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        self._range = (start, end)
+        return open(path, "rb")
+
+    def copyfile(self, source, outputfile):
+        start, end = self._range
+        source.seek(start)
+        data = source.read(end - start + 1)
+        outputfile.write(data)
+        with self.stats["lock"]:
+            self.stats["bytes"] += len(data)
+
+    def do_GET(self):
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+            failed = self.random.random() < self.error_rate
+        time.sleep(self.latency)
+        if failed:
+            self.send_error(503)
+            return
+        super().do_GET()
+
+    def do_HEAD(self):
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+        time.sleep(self.latency)
+        super().do_HEAD()
+
+
+def read_overview(href, bbox, size=256, resampling=Resampling.average):
+    """
+    Read a COG over an AOI at preview size.
+
+    The AOI is read with a reduced output shape, so GDAL picks the coarsest
+    overview that covers it. Parts of the AOI outside the raster are NaN.
+    Must run inside a rasterio.Env carrying the read settings.
+
+    Args:
+        href: Asset URL or path
+        bbox: AOI [west, south, east, north] in EPSG:4326
+        size: Output size of the longest side, in pixels
+        resampling: Resampling from the overview to the output
+
+    Returns:
+        float32 array (rows, cols) in the raster's units
+    """
+    with rasterio.open(href) as src:
+        bounds = transform_bounds("EPSG:4326", src.crs, *bbox)
+        window = from_bounds(*bounds, transform=src.transform)
+        scale = size / max(window.width, window.height)
+        height = max(1, round(window.height * scale))
+        width = max(1, round(window.width * scale))
+
+        values = np.full((height, width), np.nan, dtype=np.float32)
+        inside = window.intersection(Window(0, 0, src.width, src.height))
+
+        # Output pixels covered by the part of the AOI inside the raster
+        row0 = math.floor((inside.row_off - window.row_off) * scale)
+        col0 = math.floor((inside.col_off - window.col_off) * scale)
+        rows = max(1, min(height - row0, round(inside.height * scale)))
+        cols = max(1, min(width - col0, round(inside.width * scale)))
+
+        data = src.read(
+            1, window=inside, out_shape=(rows, cols), resampling=resampling
+        ).astype(np.float32)
+        if src.nodata is not None:
+            data[data == src.nodata] = np.nan
+        values[row0 : row0 + rows, col0 : col0 + cols] = data
+
+    return values
+
+
+def rescale_asset(item, asset, values):
+    """
+    Apply an asset's raster:bands scale/offset (e.g. to reflectance).
+
+    Direct reads return raw digital numbers; rescaling matches them to
+    stackstac's loads (e.g. earth-search's -0.1 offset since processing
+    baseline 04.00).
+
+    Args:
+        item: STAC item
+        asset: Asset key
+        values: Array read from the asset
+
+    Returns:
+        Rescaled array
+    """
+    bands = item.assets[asset].extra_fields.get("raster:bands") or [{}]
+    return values * bands[0].get("scale", 1) + bands[0].get("offset", 0)
+
+
+def serve_directory(directory, latency_ms=0, error_rate=0.0, seed=42):
+    """
+    Serve a directory over HTTP with byte ranges, counting traffic.
+
+    Args:
+        directory: Directory to serve
+        latency_ms: Delay added to every request, to mimic a remote store
+        error_rate: Fraction of GET requests answered with 503
+        seed: Random seed for injected errors
+
+    Returns:
+        Tuple (server, base_url, stats); stats holds "requests" and "bytes"
+    """
+    stats = {"requests": 0, "bytes": 0, "lock": threading.Lock()}
+
+    class Handler(_CountingHandler):
+        pass
+
+    Handler.stats = stats
+    Handler.latency = latency_ms / 1000
+    Handler.error_rate = error_rate
+    Handler.random = np.random.default_rng(seed)
+
+    def handler(*args, **kwargs):
+        return Handler(*args, directory=str(directory), **kwargs)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def write_test_cogs(directory, size=4096, epsg=32646):
+    """
+    Write synthetic red/green/nir COGs shaped like Sentinel-2 10 m bands.
+
+    Args:
+        directory: Output directory
+        size: Raster width and height in pixels
+        epsg: UTM zone EPSG code
+
+    Returns:
+        Dict with the grid (epsg, transform, shape) of the bands
+    """
+    transform = from_origin(200000, 1900000, 10, 10)
+    rng = np.random.default_rng(42)
+    profile = {
+        "driver": "COG",
+        "width": size,
+        "height": size,
+        "count": 1,
+        "dtype": "uint16",
+        "crs": f"EPSG:{epsg}",
+        "transform": transform,
+        "blocksize": 512,
+        "compress": "DEFLATE",
+    }
+    for band in ["red", "green", "nir"]:
+        data = rng.integers(0, 5000, (size, size), dtype=np.uint16)
+        with rasterio.open(Path(directory) / f"{band}.tif", "w", **profile) as dst:
+            dst.write(data, 1)
+    return {"epsg": epsg, "transform": transform, "shape": [size, size]}
+
+
+def _benchmark_item(base_url, grid):
+    """STAC item pointing at the served test bands."""
+    import pystac
+
+    item = pystac.Item(
+        id="benchmark",
+        geometry=None,
+        bbox=None,
+        datetime=pd.Timestamp("2024-01-01").to_pydatetime(),
+        properties={
+            "proj:epsg": grid["epsg"],
+            "proj:transform": list(grid["transform"])[:6],
+            "proj:shape": grid["shape"],
+        },
+    )
+    for band in ["red", "green", "nir"]:
+        item.add_asset(
+            band, pystac.Asset(f"{base_url}/{band}.tif", media_type="image/tiff")
+        )
+    return item
+
+
+def benchmark_profiles(
+    profiles=None, size=4096, bbox_pixels=1024, latency_ms=0, error_rate=0.0
+):
+    """
+    Load a bbox from local HTTP COGs with each read profile.
+
+    Each profile reads through a fresh URL prefix, so GDAL's process-wide
+    caches from earlier runs do not flatter later ones.
+
+    Args:
+        profiles: Profile names (default: all READ_PROFILES)
+        size: Test raster size in pixels
+        bbox_pixels: Edge of the loaded bbox in pixels
+        latency_ms: Simulated per-request latency
+        error_rate: Fraction of GET requests failing with 503
+
+    Returns:
+        pandas.DataFrame with requests, MB transferred, seconds and whether
+        the load completed, per profile
+    """
+    profiles = profiles or list(READ_PROFILES)
+    rows = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        grid = write_test_cogs(directory, size)
+        server, base_url, stats = serve_directory(directory, latency_ms, error_rate)
+        try:
+            transform = grid["transform"]
+            offset = (size - bbox_pixels) // 2
+            west, north = transform * (offset, offset)
+            east, south = transform * (offset + bbox_pixels, offset + bbox_pixels)
+            bbox = transform_bounds(
+                f"EPSG:{grid['epsg']}", "EPSG:4326", west, south, east, north
+            )
+
+            for profile in profiles:
+                item = _benchmark_item(f"{base_url}/{profile}", grid)
+                stack = stackstac.stack(
+                    [item],
+                    assets=["red", "green", "nir"],
+                    chunksize=(1, 1, 512, 512),
+                    gdal_env=stack_gdal_env(resolve_read_settings(profile)),
+                    **stack_grid_kwargs(item, list(bbox)),
+                )
+
+                with stats["lock"]:
+                    stats["requests"], stats["bytes"] = 0, 0
+                start = time.perf_counter()
+                try:
+                    stack.compute(scheduler="threads")
+                    completed = True
+                except Exception:
+                    completed = False
+                elapsed = time.perf_counter() - start
+
+                rows.append(
+                    {
+                        "profile": profile,
+                        "requests": stats["requests"],
+                        "mb_transferred": stats["bytes"] / 2**20,
+                        "seconds": elapsed,
+                        "completed": completed,
+                    }
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    return pd.DataFrame(rows)
+
+
+@click.command(
+    short_help="Benchmark remote read profiles",
+    help="""
+    Serves synthetic red/green/nir COGs from a local HTTP server and loads a
+    bbox with stackstac under each read profile, reporting the requests
+    issued and bytes transferred. Latency and 503 errors can be injected to
+    mimic a remote object store.
+
+    Example:
+
+        python mangrove_remote.py --bbox-pixels 1024 --latency-ms 40 --error-rate 0.2
+    """,
+)
+@click.option(
+    "--profile",
+    "profiles",
+    multiple=True,
+    type=click.Choice(list(READ_PROFILES)),
+    help="Profile to benchmark (repeatable) [default: all]",
+)
+@click.option(
+    "--size",
+    type=int,
+    default=4096,
+    help="Test raster size in pixels [default: 4096]",
+)
+@click.option(
+    "--bbox-pixels",
+    type=int,
+    default=1024,
+    help="Edge of the loaded bbox in pixels [default: 1024]",
+)
+@click.option(
+    "--latency-ms",
+    type=float,
+    default=0,
+    help="Simulated latency per request in ms [default: 0]",
+)
+@click.option(
+    "--error-rate",
+    type=float,
+    default=0.0,
+    help="Fraction of requests answered with 503 [default: 0]",
+)
+@click.option(
+    "--output",
+    type=str,
+    default=None,
+    help="Optional CSV path for the results",
+)
+def main(profiles, size, bbox_pixels, latency_ms, error_rate, output):
+    """Run the read profile benchmark."""
+    if bbox_pixels > size:
+        click.echo("❌ Error: --bbox-pixels must not exceed --size", err=True)
+        sys.exit(1)
+
+    click.echo(f"🌐 Benchmarking read profiles ({bbox_pixels}px bbox, 3 bands)...")
+    results = benchmark_profiles(
+        list(profiles) or None, size, bbox_pixels, latency_ms, error_rate
+    )
+
+    for row in results.itertuples():
+        status = "" if row.completed else "  ❌ failed"
+        click.echo(
+            f"   {row.profile:<18} {row.requests:>5} requests  "
+            f"{row.mb_transferred:7.2f} MB  {row.seconds:6.2f} s{status}"
+        )
+
+    if output:
+        results.to_csv(output, index=False)
+        click.echo(f"\n✅ Results: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,710 @@
+"""
+BBox Scatter/Gather with Mergeable Partial Results
+
+Splits a large study area into tiles that run as independent jobs (e.g. a
+CWL scatter across cluster nodes) and combines their partial results into
+the same summary a single run over the whole bbox produces.
+
+- split:    pick the scene once, compute the full-bbox pixel grid and cut it
+            into tiles on pixel boundaries, written as one JSON file per tile
+- run-tile: load one tile, detect mangroves and estimate biomass, and write
+            mergeable partial aggregates to an .npz file
+- gather:   merge every tile's partials and write the summary CSVs
+
+Tiles partition the single-run grid exactly (same scene, CRS, origin and
+resolution, no overlap), so every pixel is counted once. Partials are
+sums rather than statistics:
+
+- area, pixel counts and Σ(biomass·area) add directly
+- biomass count/mean/sum of squared deviations merge with the parallel
+  variance update, and min/max combine directly
+- the median comes from a 0.01 Mg/ha biomass histogram
+- Monte Carlo and threshold sweep results come from the joint index
+  histograms (see mangrove_histogram.py), which merge by addition because
+  every tile bins against the same edges
+"""
+
+import glob
+import json
+import os
+import sys
+
+import click
+import numpy as np
+import pystac
+import stackstac
+
+from mangrove_cloud import SEARCH_CLOUD_COVER, rank_items, score_items
+from mangrove_grid import data_grid, pixel_area_ha, stack_grid_kwargs
+from mangrove_histogram import IndexHistogram
+from mangrove_models import MODEL_TYPES, feature_layers, parse_features
+from mangrove_remote import DEFAULT_READ_PROFILE, READ_PROFILES, load_read_settings
+from mangrove_store import DEFAULT_STORE
+from mangrove_sweep import build_sweep_histogram, evaluate_sweep, sensitivity_summary
+from mangrove_uncertainty import (
+    DEFAULT_PARAMETERS,
+    build_histogram,
+    draw_parameters,
+    evaluate_draws,
+    format_interval,
+    summarize_draws,
+)
+from mangrove_workflow_cli import (
+    calculate_indices,
+    detect_mangroves,
+    download_imagery,
+    estimate_biomass,
+    search_sentinel2,
+    write_summaries,
+)
+
+DEFAULT_TILE_SIZE = 2048
+
+# Biomass histogram for the merged median (Mg/ha); values above the last
+# edge fall in a catch-all bin
+BIOMASS_BIN = 0.01
+BIOMASS_EDGES = np.concatenate(
+    [np.linspace(0, 1000, int(1000 / BIOMASS_BIN) + 1), [np.inf]]
+)
+
+CO2_PER_C = 3.67
+
+UNCERTAINTY_SEED = 42
+
+
+def split_grid(grid, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Cut a pixel grid into tiles on pixel boundaries.
+
+    Args:
+        grid: Grid dict of the full-bbox load (see mangrove_grid)
+        tile_size: Tile edge length in pixels
+
+    Returns:
+        List of dicts with the tile's row/col index, pixel window
+        (row_off, col_off, height, width) and bounds in the grid's CRS
+    """
+    transform = grid["transform"]
+    tiles = []
+    for row, row_off in enumerate(range(0, grid["height"], tile_size)):
+        for col, col_off in enumerate(range(0, grid["width"], tile_size)):
+            height = min(tile_size, grid["height"] - row_off)
+            width = min(tile_size, grid["width"] - col_off)
+            west, north = transform * (col_off, row_off)
+            east, south = transform * (col_off + width, row_off + height)
+            tiles.append(
+                {
+                    "tile": [row, col],
+                    "window": [row_off, col_off, height, width],
+                    "bounds": [west, south, east, north],
+                }
+            )
+    return tiles
+
+
+def tile_grid_kwargs(grid_kwargs, bounds):
+    """
+    stackstac grid arguments loading one tile of the full grid.
+
+    Bounds are used as given (no snapping), so the tile's pixels coincide
+    with the full grid's.
+
+    Args:
+        grid_kwargs: Full-bbox grid arguments (see stack_grid_kwargs)
+        bounds: Tile bounds in the grid's CRS
+
+    Returns:
+        Dictionary of stackstac grid arguments
+    """
+    kwargs = {k: v for k, v in grid_kwargs.items() if k != "bounds_latlon"}
+    return {**kwargs, "bounds": list(bounds), "snap_bounds": False}
+
+
+def biomass_partials(biomass, mask, area_ha=0.01):
+    """
+    Mergeable area and biomass aggregates for one tile.
+
+    Args:
+        biomass: Biomass array (Mg/ha), NaN outside the mask
+        mask: Mangrove detection mask
+        area_ha: Pixel area in hectares (scalar or per-row array)
+
+    Returns:
+        Dictionary of scalar aggregates and the biomass histogram
+    """
+    pixel_area = np.broadcast_to(area_ha, biomass.shape)
+    valid = ~np.isnan(biomass)
+    values = biomass[valid]
+    mean = float(np.mean(values)) if values.size else 0.0
+
+    return {
+        "pixels": int(mask.size),
+        "mangrove_pixels": int(np.sum(mask > 0)),
+        "mangrove_area_ha": float(np.sum(mask * pixel_area)),
+        "biomass_count": int(values.size),
+        "biomass_mean": mean,
+        "biomass_m2": float(np.sum((values - mean) ** 2)),
+        "biomass_min": float(np.min(values)) if values.size else np.inf,
+        "biomass_max": float(np.max(values)) if values.size else -np.inf,
+        "total_biomass": float(np.sum(values * pixel_area[valid])),
+        "biomass_histogram": np.histogram(values, BIOMASS_EDGES)[0],
+    }
+
+
+def merge_biomass_partials(partials):
+    """
+    Combine per-tile aggregates into whole-area totals.
+
+    Args:
+        partials: Dictionaries from biomass_partials()
+
+    Returns:
+        Dictionary with the same keys covering all tiles
+    """
+    merged = dict(partials[0])
+    for other in partials[1:]:
+        n_a, n_b = merged["biomass_count"], other["biomass_count"]
+        n = n_a + n_b
+        delta = other["biomass_mean"] - merged["biomass_mean"]
+        if n:
+            merged["biomass_m2"] += other["biomass_m2"] + delta**2 * n_a * n_b / n
+            merged["biomass_mean"] += delta * n_b / n
+        merged["biomass_count"] = n
+        merged["biomass_min"] = min(merged["biomass_min"], other["biomass_min"])
+        merged["biomass_max"] = max(merged["biomass_max"], other["biomass_max"])
+        merged["biomass_histogram"] = (
+            merged["biomass_histogram"] + other["biomass_histogram"]
+        )
+        for name in ["pixels", "mangrove_pixels", "mangrove_area_ha", "total_biomass"]:
+            merged[name] += other[name]
+    return merged
+
+
+def histogram_median(counts, edges):
+    """Median of binned values, interpolated within the middle bin."""
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+    cumulative = np.cumsum(counts)
+    rank = (total - 1) / 2
+    i = int(np.searchsorted(cumulative, rank, side="right"))
+    before = cumulative[i - 1] if i else 0
+    low = edges[i]
+    width = edges[i + 1] - low if np.isfinite(edges[i + 1]) else 0
+    return float(low + (rank - before + 0.5) / counts[i] * width)
+
+
+def biomass_summary(merged, carbon_fraction=0.47):
+    """
+    Biomass statistics and carbon metrics from merged aggregates.
+
+    Args:
+        merged: Output of merge_biomass_partials()
+        carbon_fraction: Carbon fraction of dry biomass
+
+    Returns:
+        Tuple (stats, carbon) shaped like estimate_biomass() and
+        calculate_carbon() output
+    """
+    n = merged["biomass_count"]
+    if n == 0:
+        stats = {"mean": 0, "median": 0, "max": 0, "min": 0, "std": 0}
+        carbon = {"total_biomass": 0, "carbon_stock": 0, "co2_equivalent": 0}
+        return stats, carbon
+
+    stats = {
+        "mean": merged["biomass_mean"],
+        "median": histogram_median(merged["biomass_histogram"], BIOMASS_EDGES),
+        "max": merged["biomass_max"],
+        "min": merged["biomass_min"],
+        "std": float(np.sqrt(merged["biomass_m2"] / n)),
+    }
+    carbon_stock = merged["total_biomass"] * carbon_fraction
+    carbon = {
+        "total_biomass": merged["total_biomass"],
+        "carbon_stock": carbon_stock,
+        "co2_equivalent": carbon_stock * CO2_PER_C,
+    }
+    return stats, carbon
+
+
+def linear_parameters(parameters):
+    """
+    Uncertainty draw parameters centred on a run's linear model.
+
+    Args:
+        parameters: Dict with slope, intercept and carbon_fraction
+
+    Returns:
+        Overrides for DEFAULT_PARAMETERS (see mangrove_uncertainty), keeping
+        their standard deviations
+    """
+    return {
+        name: (value, DEFAULT_PARAMETERS[name][1]) for name, value in parameters.items()
+    }
+
+
+def save_partials(path, metadata, partials, histograms=None):
+    """
+    Write one tile's partials to an .npz file.
+
+    Args:
+        path: Output path
+        metadata: JSON-serializable tile/run metadata
+        partials: Output of biomass_partials()
+        histograms: Optional dict of name → IndexHistogram
+    """
+    scalars = {k: v for k, v in partials.items() if k != "biomass_histogram"}
+    arrays = {"biomass_histogram": partials["biomass_histogram"]}
+    for name, histogram in (histograms or {}).items():
+        arrays.update(histogram.to_arrays(prefix=f"{name}_"))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path,
+        metadata=json.dumps({**metadata, "histograms": list(histograms or {})}),
+        scalars=json.dumps(scalars),
+        **arrays,
+    )
+
+
+def load_partials(path):
+    """
+    Read a tile's partials written by save_partials().
+
+    Returns:
+        Tuple (metadata, partials, histograms)
+    """
+    with np.load(path) as data:
+        metadata = json.loads(str(data["metadata"]))
+        partials = json.loads(str(data["scalars"]))
+        partials["biomass_histogram"] = data["biomass_histogram"]
+        histograms = {
+            name: IndexHistogram.from_arrays(data, prefix=f"{name}_")
+            for name in metadata["histograms"]
+        }
+    return metadata, partials, histograms
+
+
+def gather_partials(paths):
+    """
+    Merge tile partials, checking that they cover one consistent run.
+
+    Args:
+        paths: .npz files from run-tile
+
+    Returns:
+        Tuple (metadata of the first tile, merged partials, merged histograms)
+
+    Raises:
+        ValueError: If tiles are missing or duplicated, or come from
+            different runs
+    """
+    loaded = [load_partials(path) for path in paths]
+    metadata = loaded[0][0]
+
+    run_keys = [
+        "item_id",
+        "n_tiles",
+        "grid",
+        "model",
+        "parameters",
+        "uncertainty_draws",
+    ]
+    for other, _, _ in loaded[1:]:
+        if any(other.get(key) != metadata.get(key) for key in run_keys):
+            raise ValueError("Partials come from different split or run settings")
+
+    tiles = sorted(tuple(m["tile"]) for m, _, _ in loaded)
+    if len(set(tiles)) != len(tiles):
+        raise ValueError("Duplicate partials for a tile")
+    if len(tiles) != metadata["n_tiles"]:
+        raise ValueError(
+            f"Expected partials for {metadata['n_tiles']} tiles, got {len(tiles)}"
+        )
+
+    merged = merge_biomass_partials([partials for _, partials, _ in loaded])
+    histograms = loaded[0][2]
+    for _, _, other in loaded[1:]:
+        for name, histogram in histograms.items():
+            histogram.merge(other[name])
+
+    return metadata, merged, histograms
+
+
+@click.group(
+    help="""
+    Split a study area into tiles, process them independently and gather
+    the partial results into the single-run area, biomass and carbon
+    summary. Designed for CWL scatter (mangrove_workflow_scatter.cwl).
+
+    Example:
+
+        python mangrove_scatter.py split --west 95.15 --south 15.9 --east 95.35 --north 16.1
+
+        python mangrove_scatter.py run-tile tiles/tile_000_000.json
+
+        python mangrove_scatter.py gather partials/*.npz
+    """
+)
+def main():
+    """Scatter/gather entry points."""
+
+
+@main.command(short_help="Split a bbox into tiles")
+@click.option("--west", type=float, required=True, help="Western longitude bound")
+@click.option("--south", type=float, required=True, help="Southern latitude bound")
+@click.option("--east", type=float, required=True, help="Eastern longitude bound")
+@click.option("--north", type=float, required=True, help="Northern latitude bound")
+@click.option(
+    "--cloud-cover",
+    type=int,
+    default=20,
+    help="Maximum cloud cover percentage (0-100), over the AOI with --aoi-cloud "
+    "[default: 20]",
+)
+@click.option(
+    "--days-back",
+    type=int,
+    default=90,
+    help="Days to search backwards from today [default: 90]",
+)
+@click.option(
+    "--native-crs/--latlon-grid",
+    default=True,
+    help="Load on the scene's UTM grid or warp to EPSG:4326 [default: native-crs]",
+)
+@click.option(
+    "--tile-size",
+    type=int,
+    default=DEFAULT_TILE_SIZE,
+    help=f"Tile edge length in pixels [default: {DEFAULT_TILE_SIZE}]",
+)
+@click.option(
+    "--aoi-cloud/--tile-cloud",
+    default=True,
+    help="Rank scenes on cloud and no data over the AOI (SCL band) or on "
+    "tile-wide eo:cloud_cover, as the single run does [default: aoi-cloud]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile for scene scoring [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--read-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config with a sentinel2.read_settings section",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="tiles",
+    help="Directory for tile files [default: tiles]",
+)
+def split(
+    west,
+    south,
+    east,
+    north,
+    cloud_cover,
+    days_back,
+    native_crs,
+    tile_size,
+    aoi_cloud,
+    read_profile,
+    read_config,
+    output_dir,
+):
+    """Select the scene and write one JSON file per tile."""
+    try:
+        bbox = [west, south, east, north]
+        # Same scene choice as mangrove_workflow_cli.run_workflow
+        if aoi_cloud:
+            items = search_sentinel2(bbox, SEARCH_CLOUD_COVER, days_back)
+            scores = score_items(
+                items,
+                bbox,
+                read_settings=load_read_settings(read_config, read_profile),
+                log=click.echo,
+            )
+            items = rank_items(items, scores, cloud_cover)
+            if not items:
+                raise ValueError(
+                    f"No scenes with <{cloud_cover}% cloud and no data over the AOI"
+                )
+            item = items[0]
+        else:
+            items = search_sentinel2(bbox, cloud_cover, days_back)
+            item = min(items, key=lambda x: x.properties.get("eo:cloud_cover", 100))
+
+        grid_kwargs = stack_grid_kwargs(item, bbox, native_crs)
+        # Lazy: only the grid is computed, no pixels are read
+        grid = data_grid(stackstac.stack([item], assets=["red"], **grid_kwargs))
+        tiles = split_grid(grid, tile_size)
+
+        click.echo(f"🧩 Splitting {grid['width']}×{grid['height']} px grid")
+        click.echo(f"   Scene: {item.id}")
+        click.echo(f"   Tiles: {len(tiles)} of up to {tile_size}×{tile_size} px")
+
+        os.makedirs(output_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(output_dir, "tile_*.json")):
+            os.remove(old)
+        for tile in tiles:
+            spec = {
+                **tile,
+                "n_tiles": len(tiles),
+                "bbox": bbox,
+                "grid": tile_grid_kwargs(grid_kwargs, tile["bounds"]),
+                "item": item.to_dict(),
+            }
+            name = "tile_{:03d}_{:03d}.json".format(*tile["tile"])
+            with open(os.path.join(output_dir, name), "w") as f:
+                json.dump(spec, f)
+
+        click.echo(f"✅ Tiles: {output_dir}/")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@main.command("run-tile", short_help="Process one tile into partial results")
+@click.argument("tile_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--output-dir",
+    type=str,
+    default="partials",
+    help="Directory for the partials file [default: partials]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--read-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config with a sentinel2.read_settings section",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=str,
+    default=None,
+    help="Chunk store for resuming interrupted downloads [default: OUTPUT_DIR/.chunks]",
+)
+@click.option(
+    "--scene-store",
+    type=str,
+    default=DEFAULT_STORE,
+    help=f"Zarr scene store, '' to disable [default: {DEFAULT_STORE}]",
+)
+@click.option(
+    "--model",
+    type=click.Choice(list(MODEL_TYPES)),
+    default="ndvi_linear",
+    help="Biomass model [default: ndvi_linear]",
+)
+@click.option(
+    "--model-path",
+    type=str,
+    default=None,
+    help="Saved model file for random_forest (joblib) or neural_network (ONNX)",
+)
+@click.option(
+    "--features",
+    type=str,
+    default=None,
+    help="Comma-separated features of random_forest/neural_network in training "
+    "order, from red, green, nir, ndvi, ndwi, savi [default: all]",
+)
+@click.option(
+    "--slope",
+    type=float,
+    default=DEFAULT_PARAMETERS["slope"][0],
+    help="Allometric slope a of Biomass = a × NDVI + b "
+    f"[default: {DEFAULT_PARAMETERS['slope'][0]}]",
+)
+@click.option(
+    "--intercept",
+    type=float,
+    default=DEFAULT_PARAMETERS["intercept"][0],
+    help="Allometric intercept b (Mg/ha) "
+    f"[default: {DEFAULT_PARAMETERS['intercept'][0]}]",
+)
+@click.option(
+    "--carbon-fraction",
+    type=float,
+    default=DEFAULT_PARAMETERS["carbon_fraction"][0],
+    help="Carbon fraction of dry biomass "
+    f"[default: {DEFAULT_PARAMETERS['carbon_fraction'][0]}, IPCC]",
+)
+@click.option(
+    "--threshold-sweep",
+    is_flag=True,
+    default=False,
+    help="Also accumulate the threshold sweep histogram (ndvi_linear only)",
+)
+@click.option(
+    "--uncertainty-draws",
+    type=int,
+    default=1000,
+    help="Monte Carlo draws for confidence intervals, 0 to skip [default: 1000]",
+)
+def run_tile(
+    tile_file,
+    output_dir,
+    read_profile,
+    read_config,
+    checkpoint_dir,
+    scene_store,
+    model,
+    model_path,
+    features,
+    slope,
+    intercept,
+    carbon_fraction,
+    threshold_sweep,
+    uncertainty_draws,
+):
+    """Load one tile and write its partial aggregates."""
+    try:
+        with open(tile_file) as f:
+            spec = json.load(f)
+        item = pystac.Item.from_dict(spec["item"])
+        click.echo("🧩 Tile {}/{}: {} px".format(*spec["tile"], spec["window"][2:]))
+
+        data = download_imagery(
+            item,
+            spec["bbox"],
+            read_settings=load_read_settings(read_config, read_profile),
+            checkpoint_dir=checkpoint_dir or os.path.join(output_dir, ".chunks"),
+            scene_store=scene_store,
+            grid_kwargs=spec["grid"],
+        )
+        area_ha = pixel_area_ha(data_grid(data))
+
+        parameters = {
+            "slope": slope,
+            "intercept": intercept,
+            "carbon_fraction": carbon_fraction,
+        }
+        model_spec = {"name": model, "model_path": model_path}
+        if model == "ndvi_linear":
+            model_spec.update(a=slope, b=intercept)
+        elif features:
+            model_spec["features"] = parse_features(features)
+
+        indices = calculate_indices(data)
+        mask = detect_mangroves(indices, area_ha)
+        biomass, _ = estimate_biomass(
+            indices["ndvi"], mask, model_spec, feature_layers(data, indices)
+        )
+
+        # Uncertainty intervals and the sweep assume the linear NDVI model
+        histograms = {}
+        if uncertainty_draws > 0 and model == "ndvi_linear":
+            draws = draw_parameters(
+                uncertainty_draws, linear_parameters(parameters), UNCERTAINTY_SEED
+            )
+            histograms["uncertainty"] = build_histogram(indices, draws, area_ha)
+        if threshold_sweep and model != "ndvi_linear":
+            click.echo(
+                f"⚠️  Threshold sweep assumes the ndvi_linear model; skipped for {model}"
+            )
+        elif threshold_sweep:
+            histograms["sweep"] = build_sweep_histogram(None, slope, intercept)
+            histograms["sweep"].add(
+                indices["ndvi"], indices["ndwi"], indices["savi"], area_ha=area_ha
+            )
+
+        metadata = {
+            "tile": spec["tile"],
+            "n_tiles": spec["n_tiles"],
+            "item_id": item.id,
+            "item": spec["item"],
+            "grid": {k: v for k, v in spec["grid"].items() if k != "bounds"},
+            "model": model,
+            "parameters": parameters,
+            "uncertainty_draws": (
+                uncertainty_draws if "uncertainty" in histograms else 0
+            ),
+        }
+        name = os.path.splitext(os.path.basename(tile_file))[0] + ".npz"
+        path = os.path.join(output_dir, name)
+        save_partials(
+            path, metadata, biomass_partials(biomass, mask, area_ha), histograms
+        )
+        click.echo(f"✅ Partials: {path}")
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@main.command(short_help="Merge tile partials into the summary")
+@click.argument("partials", nargs=-1, required=True)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="outputs",
+    help="Output directory for results [default: outputs]",
+)
+def gather(partials, output_dir):
+    """Merge partials and write the area and biomass/carbon summaries."""
+    try:
+        metadata, merged, histograms = gather_partials(partials)
+        item = pystac.Item.from_dict(metadata["item"])
+        click.echo(f"🧩 Gathering {len(partials)} tiles")
+
+        parameters = metadata.get("parameters") or {
+            name: DEFAULT_PARAMETERS[name][0]
+            for name in ["slope", "intercept", "carbon_fraction"]
+        }
+        stats, carbon = biomass_summary(merged, parameters["carbon_fraction"])
+        coverage = merged["mangrove_pixels"] / merged["pixels"] * 100
+        click.echo(f"   Detected area: {merged['mangrove_area_ha']:.1f} hectares")
+        click.echo(f"   Coverage: {coverage:.1f}% of study area")
+        click.echo(f"   Mean: {stats['mean']:.1f} Mg/ha")
+        click.echo(f"   Carbon stock: {carbon['carbon_stock']:,.0f} Mg C")
+
+        uncertainty = None
+        if "uncertainty" in histograms:
+            draws = draw_parameters(
+                metadata["uncertainty_draws"],
+                linear_parameters(parameters),
+                UNCERTAINTY_SEED,
+            )
+            uncertainty = summarize_draws(
+                evaluate_draws(histograms["uncertainty"], draws)
+            )
+            click.echo(
+                f"   Carbon: {format_interval(uncertainty['carbon_stock'], 'Mg C')}"
+            )
+
+        if "sweep" in histograms:
+            os.makedirs(output_dir, exist_ok=True)
+            results = evaluate_sweep(
+                histograms["sweep"],
+                None,
+                parameters["slope"],
+                parameters["intercept"],
+                parameters["carbon_fraction"],
+            )
+            results.to_csv(os.path.join(output_dir, "threshold_sweep.csv"), index=False)
+            sensitivity_summary(results).to_csv(
+                os.path.join(output_dir, "threshold_sensitivity.csv"), index=False
+            )
+
+        write_summaries(
+            output_dir, merged["mangrove_area_ha"], stats, carbon, item, uncertainty
+        )
+    except Exception as e:
+        click.echo(f"\n❌ Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+#!/usr/bin/env python3
+"""
+Processing Service with Warm Workers
+
+Runs the workflow as a long-lived local service with an OGC API - Processes
+style interface, instead of one fresh container process per job. Worker
+processes are started once, import the geospatial stack and open the STAC
+client up front, and then serve jobs from a queue. GDAL/HTTP connections,
+the Zarr scene store and chunk checkpoints are reused across jobs, so
+repeated small-AOI requests cost close to the pure compute time.
+
+Endpoints:
+
+    GET    /                                   Landing page
+    GET    /conformance                        Conformance classes
+    GET    /processes                          Process list
+    GET    /processes/mangrove-biomass         Process description
+    POST   /processes/mangrove-biomass/execution
+                                               Run a job; with header
+                                               "Prefer: respond-async" returns
+                                               201 and a job URL, otherwise
+                                               waits and returns the results
+    GET    /jobs                               Job list
+    GET    /jobs/<id>                          Job status
+    GET    /jobs/<id>/results                  Job results
+    DELETE /jobs/<id>                          Dismiss a queued or finished job
+
+Example:
+
+    python mangrove_service.py --workers 2 --port 5000
+
+    curl -X POST localhost:5000/processes/mangrove-biomass/execution \\
+        -H "Content-Type: application/json" -H "Prefer: respond-async" \\
+        -d '{"inputs": {"west": 95.15, "south": 15.9, "east": 95.35, "north": 16.1}}'
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+from mangrove_models import MODEL_TYPES, parse_features
+from mangrove_remote import DEFAULT_READ_PROFILE, READ_PROFILES, load_read_settings
+from mangrove_store import DEFAULT_STORE
+
+PROCESS_ID = "mangrove-biomass"
+
+# Input name → (JSON schema, default); None marks a required input
+PROCESS_INPUTS = {
+    "west": ({"type": "number", "minimum": -180, "maximum": 180}, None),
+    "south": ({"type": "number", "minimum": -90, "maximum": 90}, None),
+    "east": ({"type": "number", "minimum": -180, "maximum": 180}, None),
+    "north": ({"type": "number", "minimum": -90, "maximum": 90}, None),
+    "cloud_cover": ({"type": "integer", "minimum": 0, "maximum": 100}, 20),
+    "days_back": ({"type": "integer", "minimum": 1}, 90),
+    "model": ({"type": "string", "enum": list(MODEL_TYPES)}, "ndvi_linear"),
+    "model_path": ({"type": "string"}, ""),
+    "features": ({"type": "string"}, ""),
+    "native_crs": ({"type": "boolean"}, True),
+    "threshold_sweep": ({"type": "boolean"}, False),
+    "polygons": ({"type": "boolean"}, False),
+    "aoi_cloud": ({"type": "boolean"}, True),
+    "open_radius": ({"type": "integer", "minimum": 0}, 0),
+    "close_radius": ({"type": "integer", "minimum": 0}, 0),
+    "min_patch": ({"type": "integer", "minimum": 0}, 0),
+    "min_hole": ({"type": "integer", "minimum": 0}, 0),
+    "connectivity": ({"type": "integer", "enum": [4, 8]}, 4),
+    "composite": ({"type": "boolean"}, False),
+    "percentile": ({"type": "number", "minimum": 0, "maximum": 100}, 50),
+    "composite_target": ({"type": "string", "enum": ["bands", "indices"]}, "bands"),
+    "uncertainty_draws": ({"type": "integer", "minimum": 0}, 1000),
+    "slope": ({"type": "number"}, 250.5),
+    "intercept": ({"type": "number"}, -75.2),
+    "carbon_fraction": ({"type": "number", "minimum": 0, "maximum": 1}, 0.47),
+}
+
+CONFORMANCE = [
+    "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/core",
+    "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/json",
+    "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/job-list",
+    "http://www.opengis.net/spec/ogcapi-processes-1/1.0/conf/dismiss",
+]
+
+RESULTS_REL = "http://www.opengis.net/def/rel/ogc/1.0/results"
+
+
+def parse_inputs(inputs):
+    """
+    Validate execution inputs and fill in defaults.
+
+    Args:
+        inputs: Dict of input name → value from the execute request
+
+    Returns:
+        Complete inputs dict
+
+    Raises:
+        ValueError: On unknown, missing or invalid inputs
+    """
+    unknown = sorted(set(inputs) - set(PROCESS_INPUTS))
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(unknown)}")
+
+    parsed = {}
+    for name, (schema, default) in PROCESS_INPUTS.items():
+        value = inputs.get(name, default)
+        if value is None:
+            raise ValueError(f"Missing required input: {name}")
+        if schema["type"] in ("number", "integer"):
+            # bool is an int subclass: true must not pass as 1
+            if isinstance(value, bool):
+                raise ValueError(f"Input {name} must be a number")
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Input {name} must be a number") from None
+            if not math.isfinite(value):
+                raise ValueError(f"Input {name} must be finite")
+            if schema["type"] == "integer":
+                if not value.is_integer():
+                    raise ValueError(f"Input {name} must be an integer")
+                value = int(value)
+            if (
+                not schema.get("minimum", value)
+                <= value
+                <= schema.get("maximum", value)
+            ):
+                raise ValueError(f"Input {name} out of range: {value}")
+        elif schema["type"] == "boolean" and not isinstance(value, bool):
+            raise ValueError(f"Input {name} must be true or false")
+        elif schema["type"] == "string" and not isinstance(value, str):
+            raise ValueError(f"Input {name} must be a string")
+        # After coercion, so enums of any type compare parsed values
+        if "enum" in schema and value not in schema["enum"]:
+            raise ValueError(f"Input {name} must be one of {schema['enum']}")
+        parsed[name] = value
+
+    if parsed["west"] >= parsed["east"] or parsed["south"] >= parsed["north"]:
+        raise ValueError("Bounding box must have west < east and south < north")
+    parse_features(parsed["features"])
+    return parsed
+
+
+def process_description():
+    """OGC API - Processes description of the workflow process."""
+    return {
+        "id": PROCESS_ID,
+        "title": "Mangrove biomass and carbon estimation",
+        "version": "1.0.0",
+        "jobControlOptions": ["sync-execute", "async-execute", "dismiss"],
+        "outputTransmission": ["value"],
+        "inputs": {
+            name: {
+                "title": name.replace("_", " ").capitalize(),
+                "schema": (
+                    schema if default is None else {**schema, "default": default}
+                ),
+                "minOccurs": 1 if default is None else 0,
+            }
+            for name, (schema, default) in PROCESS_INPUTS.items()
+        },
+        "outputs": {
+            "summary": {
+                "title": "Area, biomass and carbon summary",
+                "schema": {"type": "object"},
+            }
+        },
+    }
+
+
+# Per-process state of a warm worker (see _init_worker)
+_worker = {}
+
+
+def _init_worker(read_settings):
+    """Load the heavy imports and open pooled clients once per worker."""
+    from pystac_client import Client
+
+    import mangrove_workflow_cli
+
+    _worker["cli"] = mangrove_workflow_cli
+    _worker["read_settings"] = read_settings
+    try:
+        _worker["catalog"] = Client.open(mangrove_workflow_cli.STAC_URL)
+    except Exception:
+        # Catalog unreachable at start-up: jobs open their own client
+        _worker["catalog"] = None
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(inputs, output_dir, checkpoint_dir, scene_store):
+    """Run one job inside a warm worker process."""
+    start = time.perf_counter()
+    result = _worker["cli"].run_workflow(
+        [inputs["west"], inputs["south"], inputs["east"], inputs["north"]],
+        inputs["cloud_cover"],
+        inputs["days_back"],
+        output_dir,
+        native_crs=inputs["native_crs"],
+        read_settings=_worker["read_settings"],
+        checkpoint_dir=checkpoint_dir,
+        scene_store=scene_store,
+        model=inputs["model"],
+        model_path=inputs["model_path"] or None,
+        features=parse_features(inputs["features"]),
+        threshold_sweep=inputs["threshold_sweep"],
+        uncertainty_draws=inputs["uncertainty_draws"],
+        catalog=_worker["catalog"],
+        slope=inputs["slope"],
+        intercept=inputs["intercept"],
+        carbon_fraction=inputs["carbon_fraction"],
+        polygons=inputs["polygons"],
+        aoi_cloud=inputs["aoi_cloud"],
+        cleanup={
+            name: inputs[name]
+            for name in [
+                "open_radius",
+                "close_radius",
+                "min_patch",
+                "min_hole",
+                "connectivity",
+            ]
+        },
+        composite=inputs["composite"],
+        percentile=inputs["percentile"],
+        composite_target=inputs["composite_target"],
+    )
+    result["compute_seconds"] = time.perf_counter() - start
+    result["worker_pid"] = os.getpid()
+    return result
+
+
+def _now():
+    return datetime.now(UTC).isoformat()
+
+
+class JobQueue:
+    """
+    Queue of workflow jobs served by a pool of warm worker processes.
+
+    One dispatcher thread per worker takes jobs off the queue, so at most
+    ``workers`` jobs run at once and queued jobs can still be dismissed.
+
+    A worker that dies (e.g. killed for memory on a large bbox) breaks the
+    whole pool, and every job running on it with it. The pool is replaced by
+    a fresh, warmed one for later jobs. The job that killed the worker
+    cannot be told apart from the others, so each interrupted job is rerun
+    once, alone in a worker of its own: only the job that dies again fails.
+    """
+
+    def __init__(
+        self,
+        workers=2,
+        jobs_dir="outputs/jobs",
+        read_settings=None,
+        scene_store=DEFAULT_STORE,
+        runner=_run_job,
+    ):
+        self.workers = workers
+        self.jobs_dir = jobs_dir
+        self.read_settings = read_settings
+        self.scene_store = scene_store
+        self.runner = runner
+        self.jobs = {}
+        self._done = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pool_lock = threading.Lock()
+        self._rerun_lock = threading.Lock()
+        self._threads = []
+
+    def _start_pool(self, workers=None):
+        """Start worker processes and wait until they are warm."""
+        workers = workers or self.workers
+        # spawn: workers must not inherit the HTTP server's threads
+        executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.read_settings,),
+        )
+        # One task per worker forces every worker to spawn and initialize now
+        warmup = [executor.submit(_ping) for _ in range(workers)]
+        for future in warmup:
+            future.result()
+        return executor
+
+    def _replace_pool(self, broken):
+        """Replace a broken pool, unless another dispatcher already did."""
+        with self._pool_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._start_pool()
+            return self._executor
+
+    def start(self):
+        """Start the worker processes and wait until they are warm."""
+        if self._executor is not None:
+            return self
+
+        self._executor = self._start_pool()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def submit(self, inputs):
+        """
+        Queue a job.
+
+        Args:
+            inputs: Validated inputs from parse_inputs()
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = {
+                "jobID": job_id,
+                "processID": PROCESS_ID,
+                "status": "accepted",
+                "message": "Queued",
+                "created": _now(),
+                "started": None,
+                "finished": None,
+                "inputs": inputs,
+                "results": None,
+            }
+            self._done[job_id] = threading.Event()
+        self._queue.put(job_id)
+        return job_id
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job has finished; returns the job record."""
+        self._done[job_id].wait(timeout)
+        return self.jobs[job_id]
+
+    def dismiss(self, job_id):
+        """
+        Dismiss a queued job, or remove a finished job and its outputs.
+
+        Returns:
+            The job record
+
+        Raises:
+            KeyError: If the job does not exist
+            RuntimeError: If the job is running (worker processes cannot be
+                interrupted safely)
+        """
+        with self._lock:
+            job = self.jobs[job_id]
+            if job["status"] == "running":
+                raise RuntimeError("Running jobs cannot be dismissed")
+            if job["status"] != "accepted":
+                del self.jobs[job_id]
+                shutil.rmtree(os.path.join(self.jobs_dir, job_id), ignore_errors=True)
+            job["status"] = "dismissed"
+            job["message"] = "Dismissed"
+            job["finished"] = job["finished"] or _now()
+        self._done[job_id].set()
+        return job
+
+    def _dispatch(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job["status"] != "accepted":
+                    continue
+                job.update(status="running", message="Running", started=_now())
+
+            executor = self._executor
+            try:
+                update = self._run(executor, job)
+            except BrokenProcessPool:
+                update = self._rerun(executor, job)
+
+            with self._lock:
+                job.update(finished=_now(), **update)
+            self._done[job_id].set()
+
+    def _run(self, executor, job):
+        """Run a job on a pool; returns the job record update."""
+        try:
+            results = executor.submit(
+                self.runner,
+                job["inputs"],
+                os.path.join(self.jobs_dir, job["jobID"]),
+                os.path.join(self.jobs_dir, ".chunks"),
+                self.scene_store,
+            ).result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return {"status": "failed", "message": str(e)}
+        return {"status": "successful", "message": "Done", "results": results}
+
+    def _rerun(self, broken, job):
+        """Rerun a job interrupted by a dead worker, alone in a fresh worker."""
+        died = {
+            "status": "failed",
+            "message": "A worker process died while running the job",
+        }
+        try:
+            self._replace_pool(broken)
+            with self._rerun_lock:
+                isolated = self._start_pool(workers=1)
+                try:
+                    return self._run(isolated, job)
+                except BrokenProcessPool:
+                    return died
+                finally:
+                    isolated.shutdown(wait=False)
+        except Exception as e:
+            return {**died, "message": f"{died['message']}; restarting failed: {e}"}
+
+
+def status_info(job):
+    """OGC statusInfo document for a job."""
+    info = {
+        key: job[key] for key in ["jobID", "processID", "status", "message", "created"]
+    }
+    info["type"] = "process"
+    info.update(
+        {key: job[key] for key in ["started", "finished"] if job[key] is not None}
+    )
+    info["progress"] = 100 if job["finished"] else 0
+    info["links"] = [{"href": f"/jobs/{job['jobID']}", "rel": "self"}]
+    if job["status"] == "successful":
+        info["links"].append(
+            {"href": f"/jobs/{job['jobID']}/results", "rel": RESULTS_REL}
+        )
+    return info
+
+
+class ProcessingService:
+    """OGC API - Processes style HTTP front end for a JobQueue."""
+
+    def __init__(self, jobs, host="127.0.0.1", port=5000):
+        self.jobs = jobs
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        """Start serving in a background daemon thread (idempotent)."""
+        if self._httpd is not None:
+            return self
+
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                jobs = service.jobs
+
+                if parts == [""]:
+                    self._json(200, service.landing_page())
+                elif parts == ["conformance"]:
+                    self._json(200, {"conformsTo": CONFORMANCE})
+                elif parts == ["processes"]:
+                    self._json(200, {"processes": [process_description()]})
+                elif parts == ["processes", PROCESS_ID]:
+                    self._json(200, process_description())
+                elif parts == ["jobs"]:
+                    with jobs._lock:
+                        records = list(jobs.jobs.values())
+                    self._json(200, {"jobs": [status_info(job) for job in records]})
+                elif len(parts) in (2, 3) and parts[0] == "jobs":
+                    job = jobs.jobs.get(parts[1])
+                    if job is None:
+                        self._exception(404, "no-such-job", f"No job {parts[1]}")
+                    elif len(parts) == 2:
+                        self._json(200, status_info(job))
+                    elif parts[2] != "results":
+                        self._exception(404, "not-found", self.path)
+                    else:
+                        self._results(job)
+                else:
+                    self._exception(404, "not-found", self.path)
+
+            def do_POST(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts != ["processes", PROCESS_ID, "execution"]:
+                    self._exception(404, "no-such-process", self.path)
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    inputs = parse_inputs(body.get("inputs", {}))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._exception(400, "invalid-parameter", str(e))
+                    return
+
+                job_id = service.jobs.submit(inputs)
+                if "respond-async" in self.headers.get("Prefer", ""):
+                    self._json(
+                        201,
+                        status_info(service.jobs.jobs[job_id]),
+                        {
+                            "Location": f"/jobs/{job_id}",
+                            "Preference-Applied": "respond-async",
+                        },
+                    )
+                else:
+                    self._results(service.jobs.wait(job_id))
+
+            def do_DELETE(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) != 2 or parts[0] != "jobs":
+                    self._exception(404, "not-found", self.path)
+                    return
+                try:
+                    self._json(200, status_info(service.jobs.dismiss(parts[1])))
+                except KeyError:
+                    self._exception(404, "no-such-job", f"No job {parts[1]}")
+                except RuntimeError as e:
+                    self._exception(409, "job-running", str(e))
+
+            def _results(self, job):
+                if job["status"] == "successful":
+                    self._json(200, {"summary": job["results"]})
+                elif job["status"] == "failed":
+                    self._exception(500, "job-failed", job["message"])
+                else:
+                    self._exception(404, "result-not-ready", job["status"])
+
+            def _exception(self, code, kind, detail):
+                self._json(
+                    code,
+                    {
+                        "type": f"http://www.opengis.net/def/exceptions/ogcapi-processes-1/1.0/{kind}",
+                        "title": kind.replace("-", " "),
+                        "status": code,
+                        "detail": detail,
+                    },
+                )
+
+            def _json(self, code, document, headers=None):
+                body = json.dumps(document, default=str).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def landing_page(self):
+        return {
+            "title": "KindGrove mangrove processing service",
+            "links": [
+                {"href": "/conformance", "rel": "conformance"},
+                {"href": "/processes", "rel": "processes"},
+                {"href": "/jobs", "rel": "job-list"},
+            ],
+        }
+
+
+@click.command(
+    short_help="Run the processing service",
+    help="""
+    Serves the mangrove workflow as an OGC API - Processes style service
+    backed by a pool of warm worker processes. Jobs are queued and run at
+    most WORKERS at a time; results and outputs are kept per job under
+    JOBS_DIR.
+
+    Example:
+
+        python mangrove_service.py --workers 2 --port 5000
+    """,
+)
+@click.option("--host", default="127.0.0.1", help="Bind address [default: 127.0.0.1]")
+@click.option("--port", type=int, default=5000, help="Port [default: 5000]")
+@click.option(
+    "--workers",
+    type=int,
+    default=2,
+    help="Warm worker processes / concurrent jobs [default: 2]",
+)
+@click.option(
+    "--jobs-dir",
+    type=str,
+    default="outputs/jobs",
+    help="Directory for per-job outputs [default: outputs/jobs]",
+)
+@click.option(
+    "--scene-store",
+    type=str,
+    default=DEFAULT_STORE,
+    help=f"Zarr scene store shared across jobs [default: {DEFAULT_STORE}]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--read-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config with a sentinel2.read_settings section",
+)
+def main(host, port, workers, jobs_dir, scene_store, read_profile, read_config):
+    """Run the processing service in the foreground."""
+    jobs = JobQueue(
+        workers,
+        jobs_dir,
+        load_read_settings(read_config, read_profile),
+        scene_store,
+    )
+
+    click.echo(f"🔥 Starting {workers} warm workers...")
+    started = time.perf_counter()
+    jobs.start()
+    click.echo(f"   Ready in {time.perf_counter() - started:.1f} s")
+
+    service = ProcessingService(jobs, host, port).start()
+    click.echo(f"Serving processes on http://{host}:{service.port}/ (Ctrl+C to stop)")
+    try:
+        service._thread.join()
+    except KeyboardInterrupt:
+        service.stop()
+        jobs.stop()
+
+
+if __name__ == "__main__":
+    main()
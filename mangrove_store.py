@@ -0,0 +1,207 @@
+"""
+Chunked Zarr Scene Store
+
+One on-disk store shared by the CLI, the runner and the marimo notebook.
+Each scene is a Zarr group holding the red/green/nir bands plus any derived
+layers (indices, mangrove mask, biomass) on the scene's grid, chunked and
+compressed so that:
+
+- writes and reads run chunk-parallel through dask
+- a scene opens lazily, and a slice only touches the chunks under it
+- a scene downloaded by one entry point is reused by the others
+
+Scenes are keyed by item ID and load grid (see scene_key), so the same
+item loaded at a different resolution or bbox is a separate scene. The
+grid's CRS and transform are stored as group attributes, so data_grid()
+works on loaded bands as it does on stackstac output.
+
+Layout:
+
+    data_cache/scenes.zarr/
+        <item_id>_<epsg>_<resolution>_<bbox hash>/
+            red, green, nir          float32 (y, x)
+            ndvi, ndwi, savi         float32 (y, x)
+            mask                     uint8 (y, x)
+            biomass                  float32 (y, x)
+        <item_id>_..._<bbox hash>.lock   entry lock (see mangrove_lock)
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import xarray as xr
+import zarr
+from zarr.codecs import BloscCodec
+
+from mangrove_checkpoint import checkpoint_key
+from mangrove_lock import atomic_path, entry_lock
+
+DEFAULT_STORE = "data_cache/scenes.zarr"
+
+BANDS = ["red", "green", "nir"]
+
+CHUNK_SIZE = 512
+
+# Byte-shuffled zstd: fast to decode and compresses float32 reflectance well
+COMPRESSOR = BloscCodec(cname="zstd", clevel=3, shuffle="bitshuffle")
+
+
+def scene_key(item_id, grid_kwargs):
+    """
+    Store key for a scene loaded on a given grid.
+
+    Args:
+        item_id: STAC item ID
+        grid_kwargs: stackstac grid arguments (see stack_grid_kwargs)
+
+    Returns:
+        Group name within the store
+    """
+    digest = checkpoint_key(grid_kwargs)[:8]
+    return f"{item_id}_{grid_kwargs['epsg']}_{grid_kwargs['resolution']:g}_{digest}"
+
+
+def _scene_path(store, key):
+    return os.path.join(store, key)
+
+
+def has_scene(store, key, variables=None):
+    """
+    Check whether a scene (and optionally given layers) is in the store.
+
+    Args:
+        store: Store path
+        key: Scene key
+        variables: Required variables (default: the bands)
+
+    Returns:
+        True if every variable is present
+    """
+    try:
+        group = zarr.open_group(_scene_path(store, key), mode="r")
+    except FileNotFoundError:
+        return False
+    return all(name in group for name in (variables or BANDS))
+
+
+def _to_dataset(layers, y, x, attrs):
+    """Dataset of 2D layers on (y, x), without stackstac's extra coords."""
+    variables = {}
+    for name, values in layers.items():
+        if isinstance(values, xr.DataArray):
+            values = values.squeeze(drop=True).data
+        values = values if hasattr(values, "dtype") else np.asarray(values)
+        if values.dtype == bool:
+            values = values.astype(np.uint8)
+        elif np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float32)
+        variables[name] = (("y", "x"), values)
+    return xr.Dataset(variables, coords={"y": y, "x": x}, attrs=attrs)
+
+
+def _encoding(dataset):
+    return {
+        name: {"compressors": [COMPRESSOR], "chunks": (CHUNK_SIZE, CHUNK_SIZE)}
+        for name in dataset.data_vars
+    }
+
+
+def write_scene(store, key, data, attrs=None):
+    """
+    Write a scene's bands to the store.
+
+    The group is written under a temporary name and renamed when complete,
+    so an interrupted write never leaves a half-written scene behind, and
+    concurrent writers never share a temporary.
+
+    Args:
+        store: Store path
+        key: Scene key
+        data: xarray.DataArray with a band dimension (stackstac output)
+        attrs: Extra scene attributes (e.g. datetime, cloud cover)
+    """
+    if "time" in data.dims:
+        data = data.isel(time=0)
+
+    scene_attrs = {
+        "crs": str(data.attrs.get("crs") or data.rio.crs),
+        "transform": list(data.attrs.get("transform") or data.rio.transform())[:6],
+        **(attrs or {}),
+    }
+    dataset = _to_dataset(
+        {band: data.sel(band=band).astype("float32") for band in BANDS},
+        data.y.values,
+        data.x.values,
+        scene_attrs,
+    )
+    dataset = dataset.chunk({"y": CHUNK_SIZE, "x": CHUNK_SIZE})
+
+    with atomic_path(_scene_path(store, key)) as tmp_path:
+        dataset.to_zarr(
+            tmp_path, mode="w", encoding=_encoding(dataset), consolidated=False
+        )
+
+
+def write_layers(store, key, layers):
+    """
+    Add or replace derived layers (indices, mask, biomass) for a scene.
+
+    Layers are written to a temporary group and each one is moved into the
+    scene when complete, under the scene's lock, so an interrupted write
+    never leaves a partial layer that has_scene() would accept.
+
+    Args:
+        store: Store path
+        key: Scene key (the scene's bands must already be stored)
+        layers: Dictionary of layer name → 2D array on the scene grid
+    """
+    path = _scene_path(store, key)
+    scene = open_scene(store, key)
+    dataset = _to_dataset(layers, scene.y.values, scene.x.values, scene.attrs)
+    dataset = dataset.chunk({"y": CHUNK_SIZE, "x": CHUNK_SIZE})
+
+    with entry_lock(path):
+        tmp_path = tempfile.mkdtemp(dir=store, suffix=".tmp")
+        try:
+            dataset.drop_vars(["y", "x"]).to_zarr(
+                tmp_path, mode="w", encoding=_encoding(dataset), consolidated=False
+            )
+            for name in dataset.data_vars:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+                os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def open_scene(store, key):
+    """
+    Open a stored scene lazily.
+
+    Args:
+        store: Store path
+        key: Scene key
+
+    Returns:
+        dask-backed xarray.Dataset; nothing is read until values are used
+    """
+    return xr.open_zarr(_scene_path(store, key), consolidated=False)
+
+
+def scene_bands(scene, bands=None):
+    """
+    Stack band variables into a (band, y, x) DataArray like stackstac output.
+
+    Args:
+        scene: Dataset from open_scene()
+        bands: Band names (default: red, green, nir)
+
+    Returns:
+        Lazy xarray.DataArray carrying the scene's crs/transform attributes
+    """
+    bands = bands or BANDS
+    data = xr.concat([scene[band] for band in bands], dim="band")
+    data = data.assign_coords(band=bands)
+    data.attrs = {"crs": scene.attrs["crs"], "transform": scene.attrs["transform"]}
+    return data
@@ -0,0 +1,205 @@
+"""
+Threshold Sweep and Sensitivity Analysis
+
+Answers area, mean biomass and carbon for hundreds of detection threshold
+sets from one joint NDVI/NDWI/SAVI histogram (see mangrove_histogram.py)
+instead of rerunning detection and biomass over the raster per set.
+
+The bin edges are the swept threshold values themselves (plus the NDVI
+where biomass clips at zero), so every threshold falls exactly on an edge
+and results equal a full rerun, up to pixels lying exactly on a threshold.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from mangrove_histogram import IndexHistogram
+
+CO2_PER_C = 3.67
+
+# Covers the CLI/runner thresholds (NDVI 0.3-0.9 + NDWI/SAVI) and the
+# marimo NDVI-only thresholds (0.4-0.95); None disables a threshold
+DEFAULT_SWEEP = {
+    "ndvi_min": [0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5],
+    "ndvi_max": [0.85, 0.9, 0.95, 1.0],
+    "ndwi_min": [None, -0.5, -0.4, -0.3, -0.2, -0.1],
+    "savi_min": [None, 0.1, 0.15, 0.2, 0.25, 0.3],
+}
+
+NOMINAL_THRESHOLDS = {
+    "ndvi_min": 0.3,
+    "ndvi_max": 0.9,
+    "ndwi_min": -0.3,
+    "savi_min": 0.2,
+}
+
+
+def _edges(values):
+    """Edges at each finite threshold value plus catch-all bins."""
+    finite = [v for v in values if v is not None]
+    return np.unique(np.concatenate([[-np.inf], finite, [np.inf]]))
+
+
+def build_sweep_histogram(sweep=None, slope=250.5, intercept=-75.2):
+    """
+    Create an empty histogram whose edges resolve every swept threshold.
+
+    Args:
+        sweep: Dict of threshold name → list of values (default DEFAULT_SWEEP)
+        slope: Allometric slope a
+        intercept: Allometric intercept b
+
+    Returns:
+        IndexHistogram; fill it with .add() one chunk at a time
+    """
+    sweep = sweep or DEFAULT_SWEEP
+    clip_ndvi = -intercept / slope
+    return IndexHistogram(
+        _edges(sweep["ndvi_min"] + sweep["ndvi_max"] + [clip_ndvi]),
+        _edges(sweep["ndwi_min"]),
+        _edges(sweep["savi_min"]),
+    )
+
+
+def threshold_sets(sweep=None):
+    """
+    Expand a sweep into a table of threshold combinations.
+
+    Args:
+        sweep: Dict of threshold name → list of values (default DEFAULT_SWEEP)
+
+    Returns:
+        pandas.DataFrame with one row per combination (None → NaN)
+    """
+    sweep = sweep or DEFAULT_SWEEP
+    names = list(NOMINAL_THRESHOLDS)
+    rows = [
+        combo
+        for combo in itertools.product(*(sweep[name] for name in names))
+        if combo[0] < combo[1]
+    ]
+    return pd.DataFrame(rows, columns=names, dtype=float)
+
+
+def evaluate_sweep(
+    histogram, sweep=None, slope=250.5, intercept=-75.2, carbon_fraction=0.47
+):
+    """
+    Area, biomass and carbon for every threshold combination.
+
+    Args:
+        histogram: Filled histogram from build_sweep_histogram()
+        sweep: The sweep used to build the histogram
+        slope: Allometric slope a
+        intercept: Allometric intercept b
+        carbon_fraction: IPCC carbon fraction
+
+    Returns:
+        pandas.DataFrame of thresholds and results, one row per combination
+    """
+    results = threshold_sets(sweep)
+    ndwi_min = results["ndwi_min"].fillna(-np.inf).to_numpy()
+    savi_min = results["savi_min"].fillna(-np.inf).to_numpy()
+    ndvi_min = results["ndvi_min"].to_numpy()
+    ndvi_max = results["ndvi_max"].to_numpy()
+
+    area, _ = histogram.totals(ndvi_min, ndvi_max, ndwi_min, savi_min)
+
+    # Biomass clips at zero below NDVI = -b/a
+    positive_area, positive_ndvi_area = histogram.totals(
+        np.maximum(ndvi_min, -intercept / slope), ndvi_max, ndwi_min, savi_min
+    )
+    total_biomass = slope * positive_ndvi_area + intercept * positive_area
+
+    results["area_ha"] = area
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results["mean_biomass"] = np.where(area > 0, total_biomass / area, 0)
+    results["total_biomass"] = total_biomass
+    results["carbon_stock"] = total_biomass * carbon_fraction
+    results["co2_equivalent"] = results["carbon_stock"] * CO2_PER_C
+
+    return results
+
+
+def sweep_thresholds(
+    indices,
+    sweep=None,
+    area_ha=0.01,
+    slope=250.5,
+    intercept=-75.2,
+    carbon_fraction=0.47,
+    keep=None,
+):
+    """
+    Run a full threshold sweep over in-memory indices.
+
+    Args:
+        indices: Dictionary with ndvi, ndwi, savi arrays
+        sweep: Dict of threshold name → list of values (default DEFAULT_SWEEP)
+        area_ha: Pixel area in hectares (scalar or broadcastable array)
+        slope: Allometric slope a
+        intercept: Allometric intercept b
+        carbon_fraction: IPCC carbon fraction
+        keep: Optional mask restricting the pixels (e.g. the cleaned
+            mangrove mask)
+
+    Returns:
+        pandas.DataFrame of thresholds and results
+    """
+    histogram = build_sweep_histogram(sweep, slope, intercept)
+    histogram.add(
+        indices["ndvi"], indices["ndwi"], indices["savi"], area_ha=area_ha, keep=keep
+    )
+    return evaluate_sweep(histogram, sweep, slope, intercept, carbon_fraction)
+
+
+def sensitivity_summary(results, nominal=None):
+    """
+    One-at-a-time sensitivity of carbon stock to each threshold.
+
+    Each threshold is varied across its swept values while the others stay
+    at their nominal values.
+
+    Args:
+        results: DataFrame from evaluate_sweep()
+        nominal: Nominal thresholds (default NOMINAL_THRESHOLDS)
+
+    Returns:
+        pandas.DataFrame with the carbon range per threshold, relative to
+        the nominal run
+    """
+    nominal = nominal or NOMINAL_THRESHOLDS
+    names = list(NOMINAL_THRESHOLDS)
+
+    def matches(name, value):
+        column = results[name]
+        return column.isna() if value is None else np.isclose(column, value)
+
+    base = results[np.logical_and.reduce([matches(n, nominal[n]) for n in names])]
+    if base.empty:
+        raise ValueError("Nominal thresholds are not part of the sweep")
+    base_carbon = base["carbon_stock"].iloc[0]
+
+    rows = []
+    for name in names:
+        others = np.logical_and.reduce(
+            [matches(n, nominal[n]) for n in names if n != name]
+        )
+        varied = results[others]
+        low, high = varied["carbon_stock"].min(), varied["carbon_stock"].max()
+        rows.append(
+            {
+                "threshold": name,
+                "nominal": nominal[name],
+                "values": len(varied),
+                "carbon_min": low,
+                "carbon_max": high,
+                "carbon_range_pct": (
+                    (high - low) / base_carbon * 100 if base_carbon else 0
+                ),
+            }
+        )
+
+    return pd.DataFrame(rows)
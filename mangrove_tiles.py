@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Local XYZ Tile Server for Biomass and NDVI Rasters
+
+Serves Web Mercator tiles on demand from cached biomass/NDVI GeoTIFFs so the
+marimo app can pan full-resolution results through a lonboard tile layer
+instead of shipping whole rasters to the browser.
+
+Tiles are rendered as colorized PNG/WebP, or as raw float32 ``.npy`` arrays
+for clients that do their own styling. Rendered tiles are kept in an
+in-memory LRU cache keyed on the source file's modification time, so
+re-panning is free and a rewritten raster is never served stale.
+
+Example:
+
+    python mangrove_tiles.py biomass=data_cache/temporal/can_gio/<scene>/biomass.tif
+"""
+
+import io
+import math
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning, RasterioError
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+from rasterio.vrt import WarpedVRT
+
+TILE_SIZE = 256
+
+# Web Mercator half-extent (metres)
+WEB_MERCATOR_EXTENT = 20037508.342789244
+
+# Colormap anchors (value fraction 0-1 → RGB), matching the Plotly scales
+COLORMAPS = {
+    "YlGn": [
+        (0.0, (255, 255, 229)),
+        (0.25, (217, 240, 163)),
+        (0.5, (120, 198, 121)),
+        (0.75, (35, 132, 67)),
+        (1.0, (0, 69, 41)),
+    ],
+    "RdYlGn": [
+        (0.0, (165, 0, 38)),
+        (0.25, (244, 109, 67)),
+        (0.5, (255, 255, 191)),
+        (0.75, (102, 189, 99)),
+        (1.0, (0, 104, 55)),
+    ],
+}
+
+# Default styling per layer kind (range from config/demo_config.yaml)
+LAYER_STYLES = {
+    "biomass": {"colormap": "YlGn", "vmin": 0.0, "vmax": 300.0},
+    "ndvi": {"colormap": "RdYlGn", "vmin": -1.0, "vmax": 1.0},
+}
+
+TILE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+    "npy": (None, "application/octet-stream"),
+}
+
+
+def tile_bounds(z, x, y):
+    """
+    Calculate Web Mercator bounds of an XYZ tile.
+
+    Args:
+        z: Zoom level
+        x: Tile column
+        y: Tile row (XYZ / slippy-map convention, origin top-left)
+
+    Returns:
+        Tuple (west, south, east, north) in EPSG:3857 metres
+    """
+    tile_span = 2 * WEB_MERCATOR_EXTENT / (2**z)
+    west = -WEB_MERCATOR_EXTENT + x * tile_span
+    north = WEB_MERCATOR_EXTENT - y * tile_span
+    return west, north - tile_span, west + tile_span, north
+
+
+def read_tile(path, z, x, y, tile_size=TILE_SIZE):
+    """
+    Read one tile of a raster warped to Web Mercator.
+
+    Only the source pixels (or overview pixels) under the tile are read, so
+    the cost is independent of the full raster size.
+
+    Args:
+        path: Path to a georeferenced single-band GeoTIFF/COG
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+        tile_size: Tile width/height in pixels
+
+    Returns:
+        float32 array (tile_size, tile_size) with NaN outside the data
+    """
+    west, south, east, north = tile_bounds(z, x, y)
+
+    with rasterio.open(path) as src:
+        with WarpedVRT(
+            src,
+            crs="EPSG:3857",
+            transform=from_bounds(west, south, east, north, tile_size, tile_size),
+            width=tile_size,
+            height=tile_size,
+            resampling=Resampling.nearest,
+            src_nodata=src.nodata if src.nodata is not None else np.nan,
+            nodata=np.nan,
+            dtype="float32",
+        ) as vrt:
+            return vrt.read(1)
+
+
+def colorize(tile, colormap="YlGn", vmin=0.0, vmax=300.0):
+    """
+    Map a float tile to RGBA using a colormap, NaN as transparent.
+
+    Args:
+        tile: 2D float array
+        colormap: Name of a colormap in COLORMAPS
+        vmin: Value mapped to the start of the colormap
+        vmax: Value mapped to the end of the colormap
+
+    Returns:
+        uint8 array (4, height, width)
+    """
+    anchors = COLORMAPS[colormap]
+    stops = np.array([a[0] for a in anchors])
+    colors = np.array([a[1] for a in anchors], dtype=float)
+
+    valid = ~np.isnan(tile)
+    scaled = np.clip((np.nan_to_num(tile) - vmin) / (vmax - vmin), 0, 1)
+
+    rgba = np.zeros((4,) + tile.shape, dtype=np.uint8)
+    for channel in range(3):
+        rgba[channel] = np.interp(scaled, stops, colors[:, channel]).astype(np.uint8)
+    rgba[3] = np.where(valid, 255, 0)
+
+    return rgba
+
+
+def encode_tile(tile, fmt="png", style=None):
+    """
+    Encode a tile for transfer.
+
+    Args:
+        tile: 2D float array from read_tile()
+        fmt: One of "png", "webp" (colorized) or "npy" (raw float32)
+        style: Dict with colormap/vmin/vmax (defaults to biomass styling)
+
+    Returns:
+        Encoded tile bytes
+    """
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, tile.astype(np.float32))
+        return buffer.getvalue()
+
+    style = style or LAYER_STYLES["biomass"]
+    rgba = colorize(tile, **style)
+    driver = TILE_FORMATS[fmt][0]
+
+    # Tiles are plain images: no geotransform is expected
+    with warnings.catch_warnings(), MemoryFile() as memfile:
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with memfile.open(
+            driver=driver,
+            width=rgba.shape[2],
+            height=rgba.shape[1],
+            count=4,
+            dtype="uint8",
+        ) as dst:
+            dst.write(rgba)
+        return memfile.read()
+
+
+class TileCache:
+    """Thread-safe LRU cache of encoded tiles."""
+
+    def __init__(self, max_tiles=2048):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._tiles:
+                return None
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._tiles[key] = value
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+
+class TileServer:
+    """
+    Serve registered rasters as XYZ tiles over HTTP.
+
+    URLs have the form ``/tiles/<layer>/<z>/<x>/<y>.<png|webp|npy>``, where
+    ``<layer>`` is a name registered with add_layer().
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, max_tiles=2048):
+        self.host = host
+        self.port = port
+        self.layers = {}
+        self.cache = TileCache(max_tiles)
+        self._httpd = None
+        self._thread = None
+
+    def add_layer(self, name, path, kind="biomass"):
+        """
+        Register a raster under a layer name.
+
+        Args:
+            name: Layer name used in tile URLs (may contain "/")
+            path: Path to the cached GeoTIFF/COG
+            kind: Styling preset from LAYER_STYLES ("biomass" or "ndvi")
+
+        Returns:
+            XYZ URL template for the layer
+        """
+        self.layers[name] = {"path": str(path), "style": LAYER_STYLES[kind]}
+        return self.url_template(name)
+
+    def url_template(self, name, fmt="png"):
+        return f"http://{self.host}:{self.port}/tiles/{name}/{{z}}/{{x}}/{{y}}.{fmt}"
+
+    def render(self, name, z, x, y, fmt):
+        """Return encoded tile bytes, using the cache where possible."""
+        layer = self.layers[name]
+        key = (layer["path"], os.stat(layer["path"]).st_mtime_ns, z, x, y, fmt)
+
+        encoded = self.cache.get(key)
+        if encoded is None:
+            tile = read_tile(layer["path"], z, x, y)
+            encoded = encode_tile(tile, fmt, layer["style"])
+            self.cache.put(key, encoded)
+
+        return encoded
+
+    def start(self):
+        """Start serving in a background daemon thread (idempotent)."""
+        if self._httpd is not None:
+            return self
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    name, z, x, y, fmt = _parse_tile_path(self.path)
+                    if name not in server.layers or fmt not in TILE_FORMATS:
+                        raise KeyError(name)
+                    body = server.render(name, z, x, y, fmt)
+                except (KeyError, ValueError, FileNotFoundError):
+                    self.send_error(404)
+                    return
+                except (OSError, RasterioError):
+                    # Raster unreadable, e.g. being rewritten by a cache commit
+                    self.send_error(500)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", TILE_FORMATS[fmt][1])
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Cache-Control", "max-age=3600")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def _parse_tile_path(path):
+    """Split ``/tiles/<layer>/<z>/<x>/<y>.<fmt>`` into its parts."""
+    parts = path.split("?")[0].strip("/").split("/")
+    if len(parts) < 5 or parts[0] != "tiles":
+        raise ValueError(path)
+
+    y_str, fmt = parts[-1].rsplit(".", 1)
+    name = "/".join(parts[1:-3])
+    return name, int(parts[-3]), int(parts[-2]), int(y_str), fmt
+
+
+_shared_server = None
+_shared_lock = threading.Lock()
+
+
+def get_tile_server(host="127.0.0.1", port=8765):
+    """
+    Return the process-wide tile server, starting it on first use.
+
+    marimo re-runs cells reactively, so the server is shared rather than
+    rebound to the port on every run.
+    """
+    global _shared_server
+    with _shared_lock:
+        if _shared_server is None:
+            _shared_server = TileServer(host, port).start()
+    return _shared_server
+
+
+def raster_zoom_range(path):
+    """
+    Suggest min/max zoom levels for a raster.
+
+    Args:
+        path: Path to a georeferenced GeoTIFF
+
+    Returns:
+        Tuple (min_zoom, max_zoom); max_zoom matches native resolution
+    """
+    with rasterio.open(path) as src:
+        with WarpedVRT(src, crs="EPSG:3857") as vrt:
+            pixel_size = abs(vrt.transform.a)
+            width_m = pixel_size * vrt.width
+
+    max_zoom = math.ceil(math.log2(2 * WEB_MERCATOR_EXTENT / (TILE_SIZE * pixel_size)))
+    min_zoom = max(0, math.floor(math.log2(2 * WEB_MERCATOR_EXTENT / width_m)))
+    return min_zoom, max(min_zoom, max_zoom)
+
+
+@click.command(
+    short_help="Serve biomass/NDVI tiles",
+    help="""
+    Serve cached biomass/NDVI GeoTIFFs as XYZ tiles for lonboard or any
+    slippy-map client. Each LAYER is NAME=PATH; names starting with "ndvi"
+    use NDVI styling, all others biomass styling.
+
+    Example:
+
+        python mangrove_tiles.py biomass=data_cache/biomass.tif --port 8765
+    """,
+)
+@click.argument("layers", nargs=-1, required=True)
+@click.option("--host", default="127.0.0.1", help="Bind address [default: 127.0.0.1]")
+@click.option("--port", type=int, default=8765, help="Port [default: 8765]")
+def main(layers, host, port):
+    """Run the tile server in the foreground."""
+    # Started first so the templates carry the bound port (e.g. --port 0)
+    server = TileServer(host, port).start()
+    for spec in layers:
+        name, path = spec.split("=", 1)
+        kind = "ndvi" if name.startswith("ndvi") else "biomass"
+        click.echo(f"🗺️  {name}: {server.add_layer(name, path, kind)}")
+
+    click.echo(f"Serving tiles on http://{host}:{server.port}/tiles/ (Ctrl+C to stop)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
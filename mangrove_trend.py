@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Per-Pixel Temporal Biomass Trends
+
+Fits an ordinary least-squares line through every pixel's time series of a
+(time, y, x) biomass cube and returns slope, intercept, R², p-value and
+observation count per pixel. The fit is closed-form and vectorized over
+the whole block, so 10^7-10^8 pixels cost a few array passes rather than
+one scipy.stats.linregress call each. NaN gaps are handled per pixel: each
+pixel is fitted on its own valid dates only.
+
+On a dask-backed cube each spatial chunk is fitted independently, so the
+cube never has to fit in memory.
+
+Example:
+
+    python mangrove_trend.py 2017-03-01=a/biomass.tif 2020-05-10=b/biomass.tif \\
+        2024-02-01=c/biomass.tif --output-dir outputs/trend
+"""
+
+import os
+import sys
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import rasterio
+import rioxarray
+import xarray as xr
+from scipy import special
+
+from mangrove_grid import common_grid, open_on_grid, pixel_area_ha
+
+warnings.filterwarnings("ignore")
+
+TREND_STATS = ["slope", "intercept", "r2", "p_value", "n_obs"]
+
+
+def fit_trend_block(values, t):
+    """
+    Fit per-pixel least-squares trends over the last axis of a block.
+
+    Args:
+        values: Array (..., time) of observations, NaN for gaps
+        t: Array (time,) of observation times (e.g. decimal years)
+
+    Returns:
+        Array (..., 5) with slope, intercept, r2, p_value, n_obs; NaN where
+        a pixel has fewer than 3 valid observations
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=-1)
+    t = np.broadcast_to(np.asarray(t, dtype=np.float64), values.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Per-pixel means over valid dates, then centred sums (numerically
+        # stable, unlike the raw sum-of-squares formulas)
+        t_mean = np.where(valid, t, 0).sum(axis=-1) / n
+        y_mean = np.where(valid, values, 0).sum(axis=-1) / n
+
+        dt = np.where(valid, t - t_mean[..., np.newaxis], 0)
+        dy = np.where(valid, values - y_mean[..., np.newaxis], 0)
+
+        s_tt = (dt * dt).sum(axis=-1)
+        s_ty = (dt * dy).sum(axis=-1)
+        s_yy = (dy * dy).sum(axis=-1)
+
+        slope = s_ty / s_tt
+        intercept = y_mean - slope * t_mean
+        r2 = np.clip(s_ty**2 / (s_tt * s_yy), 0, 1)
+
+        # Two-sided p-value for slope != 0 (Student's t with n - 2 dof)
+        df = n - 2
+        t_stat = np.sqrt(r2 * df / (1 - r2))
+        p_value = 2 * special.stdtr(df, -t_stat)
+        p_value = np.where(r2 >= 1, 0.0, p_value)
+
+    result = np.stack([slope, intercept, r2, p_value, n.astype(np.float64)], axis=-1)
+    result[n < 3, :4] = np.nan
+    return result
+
+
+def fit_trend(cube, dates):
+    """
+    Fit per-pixel trends over a (time, y, x) cube.
+
+    Works on numpy- and dask-backed cubes; with dask the fit runs lazily
+    per spatial chunk (the time axis is gathered into one chunk).
+
+    Args:
+        cube: xarray.DataArray with dims (time, y, x)
+        dates: Sequence of datetimes, one per time step
+
+    Returns:
+        xarray.Dataset with slope (units/year), intercept, r2, p_value and
+        n_obs on the cube's (y, x) grid
+    """
+    dates = pd.to_datetime(list(dates))
+    t = np.asarray((dates - dates[0]).days, dtype=np.float64) / 365.25
+
+    if cube.chunks is not None:
+        cube = cube.chunk({"time": -1})
+
+    stats = xr.apply_ufunc(
+        fit_trend_block,
+        cube,
+        kwargs={"t": t},
+        input_core_dims=[["time"]],
+        output_core_dims=[["stat"]],
+        dask="parallelized",
+        output_dtypes=[np.float64],
+        dask_gufunc_kwargs={"output_sizes": {"stat": len(TREND_STATS)}},
+    )
+    stats = stats.assign_coords(stat=TREND_STATS)
+
+    return stats.to_dataset(dim="stat")
+
+
+def load_biomass_cube(paths, chunks=1024):
+    """
+    Stack biomass rasters from several dates onto a common grid, lazily.
+
+    Where an ndvi.tif sits next to a biomass.tif, observed non-mangrove
+    pixels are set to 0 so extent loss shows as a decline rather than a gap.
+
+    Args:
+        paths: Biomass GeoTIFF paths ordered by date
+        chunks: Spatial chunk size in pixels
+
+    Returns:
+        Tuple (cube, sources); cube is a dask-backed DataArray (time, y, x)
+        and sources are open datasets/VRTs to close after computing
+    """
+    grid = common_grid(paths)
+    layers, sources = [], []
+
+    for path in paths:
+        arrays = {}
+        for name in ["biomass", "ndvi"]:
+            layer_path = Path(path).with_name(f"{name}.tif") if name == "ndvi" else path
+            if not Path(layer_path).exists():
+                continue
+            src = rasterio.open(layer_path)
+            vrt = open_on_grid(src, grid)
+            sources.extend([vrt, src])
+            arrays[name] = rioxarray.open_rasterio(
+                vrt, chunks={"x": chunks, "y": chunks}
+            ).squeeze("band", drop=True)
+
+        biomass = arrays["biomass"]
+        if "ndvi" in arrays:
+            biomass = xr.where(biomass.isnull() & arrays["ndvi"].notnull(), 0, biomass)
+        layers.append(biomass)
+
+    return xr.concat(layers, dim="time"), sources
+
+
+def summarize_trend(trend, grid=None, alpha=0.05):
+    """
+    Summarize significant degrading and recovering areas.
+
+    Args:
+        trend: Dataset from fit_trend()
+        grid: Optional grid dict for true pixel areas (default 10 m pixels)
+        alpha: Significance level for the slope
+
+    Returns:
+        Dictionary with areas (ha) and mean slope
+    """
+    significant = trend["p_value"] < alpha
+    degrading = (significant & (trend["slope"] < 0)).values
+    recovering = (significant & (trend["slope"] > 0)).values
+    fitted = trend["slope"].notnull().values
+
+    if grid is not None:
+        area = np.broadcast_to(pixel_area_ha(grid), degrading.shape)
+    else:
+        area = np.full(degrading.shape, (10 * 10) / 10000)
+
+    return {
+        "fitted_ha": float(area[fitted].sum()),
+        "degrading_ha": float(area[degrading].sum()),
+        "recovering_ha": float(area[recovering].sum()),
+        "mean_slope": float(np.nanmean(trend["slope"].values)) if fitted.any() else 0,
+    }
+
+
+def export_trend(trend, output_dir):
+    """
+    Write slope, R² and p-value rasters as GeoTIFFs.
+
+    Args:
+        trend: Dataset from fit_trend() with spatial coordinates and CRS
+        output_dir: Output directory
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name in ["slope", "r2", "p_value", "n_obs"]:
+        layer = trend[name].astype("float32")
+        layer.rio.to_raster(
+            os.path.join(output_dir, f"trend_{name}.tif"), compress="lzw"
+        )
+
+
+@click.command(
+    short_help="Per-pixel biomass trends",
+    help="""
+    Fits a least-squares trend through every pixel of a stack of biomass
+    rasters and writes slope (Mg/ha per year), R², p-value and observation
+    count rasters plus a CSV summary of significantly degrading area.
+
+    Each RASTER is DATE=PATH with DATE as YYYY-MM-DD.
+
+    Example:
+
+        python mangrove_trend.py 2017-03-01=a/biomass.tif 2020-05-10=b/biomass.tif 2024-02-01=c/biomass.tif
+    """,
+)
+@click.argument("rasters", nargs=-1, required=True)
+@click.option(
+    "--alpha",
+    type=float,
+    default=0.05,
+    help="Significance level for degrading/recovering pixels [default: 0.05]",
+)
+@click.option(
+    "--output-dir",
+    type=str,
+    default="outputs/trend",
+    help="Output directory for results [default: outputs/trend]",
+)
+def main(rasters, alpha, output_dir):
+    """Run per-pixel trend analysis."""
+    specs = sorted(spec.split("=", 1) for spec in rasters)
+    if len(specs) < 3:
+        click.echo("❌ Error: need at least three dated rasters for a trend", err=True)
+        sys.exit(1)
+
+    dates = [datetime.fromisoformat(date) for date, _ in specs]
+    paths = [path for _, path in specs]
+
+    click.echo(f"📈 Fitting per-pixel trends over {len(paths)} dates...")
+    cube, sources = load_biomass_cube(paths)
+    try:
+        trend = fit_trend(cube, dates)
+        trend = trend.rio.write_crs(cube.rio.crs).compute()
+    finally:
+        for src in sources:
+            src.close()
+
+    export_trend(trend, output_dir)
+    summary = summarize_trend(trend, common_grid(paths), alpha)
+
+    pd.DataFrame(
+        [
+            {"Metric": "Dates", "Value": len(paths)},
+            {"Metric": "Fitted Area (ha)", "Value": f"{summary['fitted_ha']:.1f}"},
+            {
+                "Metric": "Degrading Area (ha)",
+                "Value": f"{summary['degrading_ha']:.1f}",
+            },
+            {
+                "Metric": "Recovering Area (ha)",
+                "Value": f"{summary['recovering_ha']:.1f}",
+            },
+            {
+                "Metric": "Mean Slope (Mg/ha per year)",
+                "Value": f"{summary['mean_slope']:+.2f}",
+            },
+        ]
+    ).to_csv(os.path.join(output_dir, "trend_summary.csv"), index=False)
+
+    click.echo(f"   Degrading: {summary['degrading_ha']:.1f} ha (p < {alpha})")
+    click.echo(f"   Recovering: {summary['recovering_ha']:.1f} ha")
+    click.echo(f"\n✅ Outputs: {output_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,26 +8,82 @@ using Sentinel-2 satellite imagery. Follows OGC Application Package best practic
 Based on validated allometric model from Myanmar field studies (R² = 0.72).
 """
 
+import contextlib
 import os
 import sys
 
 # Suppress warnings for cleaner output
 import warnings
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import click
 import numpy as np
 import pandas as pd
+import pystac
 import stackstac
 from pystac_client import Client
 
+from mangrove_checkpoint import (
+    checkpoint_key,
+    clear_checkpoint,
+    compute_with_checkpoint,
+)
+from mangrove_cleanup import DEFAULT_CLEANUP, clean_mask, cleanup_enabled
+from mangrove_cloud import (
+    DEFAULT_SCORE_SIZE,
+    SEARCH_CLOUD_COVER,
+    rank_items,
+    score_items,
+)
+from mangrove_coarse import DEFAULT_SCREEN, candidate_blocks, prune_blocks, screened_key
+from mangrove_composite import (
+    COMPOSITE_TARGETS,
+    DEFAULT_MAX_ITEMS,
+    INDICES,
+    band_composite,
+    composite_item,
+    index_composite,
+    select_items,
+)
+from mangrove_footprint import data_blocks
+from mangrove_grid import data_grid, pixel_area_ha, stack_grid_kwargs
+from mangrove_lock import entry_lock
+from mangrove_memo import DEFAULT_STAGE_DIR, StageCache
+from mangrove_models import MODEL_TYPES, feature_layers, parse_features, predict_biomass
+from mangrove_polygons import polygonize_mask
+from mangrove_progress import compute_with_progress
+from mangrove_raw import DEFAULT_RAW_DIR, has_raw, open_raw, write_raw
+from mangrove_remote import (
+    DEFAULT_READ_PROFILE,
+    READ_PROFILES,
+    load_read_settings,
+    stack_gdal_env,
+)
+from mangrove_store import (
+    DEFAULT_STORE,
+    has_scene,
+    open_scene,
+    scene_bands,
+    scene_key,
+    write_layers,
+    write_scene,
+)
+from mangrove_sweep import sensitivity_summary, sweep_thresholds
+from mangrove_uncertainty import (
+    DEFAULT_PARAMETERS,
+    format_interval,
+    propagate_uncertainty,
+)
+
 warnings.filterwarnings("ignore")
 
+STAC_URL = "https://earth-search.aws.element84.com/v1"
+
 # Configure numpy error handling
 np.seterr(divide="ignore", invalid="ignore")
 
 
-def search_sentinel2(bbox, cloud_cover_max, days_back):
+def search_sentinel2(bbox, cloud_cover_max, days_back, catalog=None):
     """
     Search AWS STAC catalog for Sentinel-2 L2A scenes.
 
@@ -35,13 +91,14 @@ def search_sentinel2(bbox, cloud_cover_max, days_back):
         bbox: Bounding box [west, south, east, north]
         cloud_cover_max: Maximum cloud cover percentage
         days_back: Days to search backwards from today
+        catalog: Open STAC client to reuse (default: open a new one)
 
     Returns:
         List of STAC items
     """
     click.echo("🔍 Searching AWS STAC catalog...")
 
-    catalog = Client.open("https://earth-search.aws.element84.com/v1")
+    catalog = catalog or Client.open(STAC_URL)
 
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
@@ -62,13 +119,45 @@ def search_sentinel2(bbox, cloud_cover_max, days_back):
     return items
 
 
-def download_imagery(item, bbox):
+def download_imagery(
+    item,
+    bbox,
+    native_crs=True,
+    read_settings=None,
+    checkpoint_dir=None,
+    scene_store=None,
+    grid_kwargs=None,
+    lazy=False,
+    raw_cache=None,
+    progress_json=None,
+    blocks=None,
+):
     """
     Download and crop Sentinel-2 bands to study area.
 
     Args:
         item: STAC item
         bbox: Bounding box [west, south, east, north]
+        native_crs: Load on the scene's own UTM grid at 10 m (no warping);
+            False warps to EPSG:4326 at 0.0001°
+        read_settings: Remote read settings (see mangrove_remote); None uses
+            the default profile
+        checkpoint_dir: Directory for resumable chunk stores; fetched chunks
+            are kept there until the scene is complete, so an interrupted
+            download resumes where it stopped (None disables)
+        scene_store: Zarr scene store (see mangrove_store); a scene already
+            there is read back instead of downloaded (None disables)
+        grid_kwargs: Explicit stackstac grid (e.g. one tile of a split bbox,
+            see mangrove_scatter); overrides bbox and native_crs
+        lazy: Return a stored scene without reading it; bands are only
+            read when their values are used
+        raw_cache: Memory-mapped raw band cache (see mangrove_raw); a scene
+            there is mapped without decompression or copy, and a scene read
+            or downloaded otherwise is added to it (None disables)
+        progress_json: File to append JSON download progress lines to, "-"
+            for stderr (see mangrove_progress; None disables)
+        blocks: Candidate blocks from a coarse screen (see mangrove_coarse);
+            only these are fetched, the rest are NaN (None fetches all)
 
     Returns:
         xarray.DataArray with red, green, nir bands
@@ -77,21 +166,232 @@ def download_imagery(item, bbox):
     click.echo(f"   Cloud cover: {item.properties.get('eo:cloud_cover', 'N/A'):.1f}%")
 
     # Load imagery with bounds_latlon to clip during load (fixes NaN issue)
-    sentinel2_lazy = stackstac.stack(
-        [item],
-        assets=["red", "green", "nir"],
-        epsg=4326,
-        resolution=0.0001,  # ~10m at equator
-        bounds_latlon=bbox,  # Clip to study area during load
-        chunksize=(1, 1, 512, 512),
+    grid_kwargs = grid_kwargs or stack_grid_kwargs(item, bbox, native_crs)
+    click.echo(f"   Grid: EPSG:{grid_kwargs['epsg']} @ {grid_kwargs['resolution']}")
+
+    key = scene_key(item.id, grid_kwargs)
+    if blocks is not None:
+        key = screened_key(key, blocks)
+    # Concurrent runs wait for an in-flight download of the same scene,
+    # then find it stored
+    with _scene_lock(key, scene_store, raw_cache, checkpoint_dir):
+        if raw_cache and has_raw(raw_cache, key):
+            click.echo(f"   Memory-mapping raw cache: {raw_cache}/{key}")
+            return open_raw(raw_cache, key)
+
+        if scene_store and has_scene(scene_store, key):
+            click.echo(f"   Reading from scene store: {scene_store}/{key}")
+            sentinel2_data = scene_bands(open_scene(scene_store, key))
+            click.echo(f"   Data shape: {sentinel2_data.shape}")
+            if raw_cache:
+                write_raw(raw_cache, key, sentinel2_data, _scene_attrs(item))
+                return open_raw(raw_cache, key)
+            return sentinel2_data if lazy else sentinel2_data.compute()
+
+        sentinel2_lazy = stackstac.stack(
+            [item],
+            assets=["red", "green", "nir"],
+            chunksize=(1, 1, 512, 512),
+            gdal_env=stack_gdal_env(read_settings),
+            **grid_kwargs,
+        )
+        # Chunks outside the item footprint hold no data and are never read
+        fetch = data_blocks([item], sentinel2_lazy, log=click.echo)
+        if blocks is not None:
+            fetch &= blocks
+        if not fetch.all():
+            sentinel2_lazy = prune_blocks(sentinel2_lazy, fetch)
+
+        # Compute data (already clipped by bounds_latlon)
+        if checkpoint_dir:
+            parts = [item.id, ["red", "green", "nir"], grid_kwargs]
+            if blocks is not None:
+                parts.append(key)
+            store = os.path.join(checkpoint_dir, checkpoint_key(*parts))
+            sentinel2_data = compute_with_checkpoint(
+                sentinel2_lazy,
+                store,
+                log=click.echo,
+                progress_json=progress_json,
+                blocks=fetch,
+            )
+            # Scene is complete in memory; the chunks are no longer needed
+            clear_checkpoint(store)
+        else:
+            sentinel2_data = compute_with_progress(
+                sentinel2_lazy, log=click.echo, json_path=progress_json, blocks=fetch
+            )
+
+        click.echo(f"   Data shape: {sentinel2_data.shape}")
+
+        if scene_store:
+            write_scene(scene_store, key, sentinel2_data, _scene_attrs(item))
+            click.echo(f"   Stored scene: {scene_store}/{key}")
+
+        if raw_cache:
+            # Continue on the mapped float32 copy, as a rerun would
+            write_raw(raw_cache, key, sentinel2_data, _scene_attrs(item))
+            click.echo(f"   Raw cache: {raw_cache}/{key}")
+            return open_raw(raw_cache, key)
+
+        return sentinel2_data
+
+
+def download_composite(
+    items,
+    scene_item,
+    grid_kwargs,
+    percentile=50,
+    target="bands",
+    read_settings=None,
+    checkpoint_dir=None,
+    scene_store=None,
+    lazy=False,
+    progress_json=None,
+):
+    """
+    Composite Sentinel-2 bands over several scenes (see mangrove_composite).
+
+    Args:
+        items: STAC items to composite
+        scene_item: Item standing in for the composite (composite_item())
+        grid_kwargs: stackstac grid arguments
+        percentile: Percentile over time (50 = median)
+        target: "bands" composites the bands here; "indices" composites
+            per-date indices later, so the band composite is returned lazy
+            and unread (it only feeds non-linear models)
+        read_settings: Remote read settings (see mangrove_remote)
+        checkpoint_dir: Directory for resumable chunk stores (None disables)
+        scene_store: Zarr scene store (None disables)
+        lazy: Return a stored composite without reading it
+        progress_json: File to append JSON progress lines to (None disables)
+
+    Returns:
+        xarray.DataArray with red, green, nir bands
+    """
+    start = scene_item.properties["composite:start"][:10]
+    end = scene_item.properties["composite:end"][:10]
+    click.echo(f"📥 Compositing {len(items)} scenes: {start} to {end}")
+    click.echo(f"   Per-pixel p{percentile:g} of {target}")
+    click.echo(f"   Grid: EPSG:{grid_kwargs['epsg']} @ {grid_kwargs['resolution']}")
+
+    key = scene_key(scene_item.id, grid_kwargs)
+    # Concurrent runs wait for an in-flight composite of the same scenes
+    with _scene_lock(key, scene_store, checkpoint_dir):
+        if scene_store and has_scene(scene_store, key):
+            click.echo(f"   Reading from scene store: {scene_store}/{key}")
+            composite = scene_bands(open_scene(scene_store, key))
+            return composite if lazy else composite.compute()
+
+        composite_lazy = band_composite(
+            items, grid_kwargs, percentile, read_settings=read_settings
+        )
+        fetch = data_blocks(items, composite_lazy, log=click.echo)
+        if not fetch.all():
+            composite_lazy = prune_blocks(composite_lazy, fetch)
+        if target == "indices":
+            return composite_lazy
+
+        if checkpoint_dir:
+            store = os.path.join(
+                checkpoint_dir, checkpoint_key(scene_item.id, grid_kwargs)
+            )
+            composite = compute_with_checkpoint(
+                composite_lazy,
+                store,
+                log=click.echo,
+                stage="composite",
+                progress_json=progress_json,
+                blocks=fetch,
+            )
+            clear_checkpoint(store)
+        else:
+            composite = compute_with_progress(
+                composite_lazy, "composite", click.echo, progress_json, blocks=fetch
+            )
+
+        click.echo(f"   Data shape: {composite.shape}")
+
+        if scene_store:
+            write_scene(scene_store, key, composite, _scene_attrs(scene_item))
+            click.echo(f"   Stored composite: {scene_store}/{key}")
+
+        return composite
+
+
+def composite_indices(
+    items,
+    scene_item,
+    grid_kwargs,
+    read_settings=None,
+    checkpoint_dir=None,
+    progress_json=None,
+):
+    """
+    Composite NDVI/NDWI/SAVI computed per date (the "indices" target).
+
+    Args:
+        items: STAC items to composite
+        scene_item: Item standing in for the composite (composite_item())
+        grid_kwargs: stackstac grid arguments
+        read_settings: Remote read settings (see mangrove_remote)
+        checkpoint_dir: Directory for resumable chunk stores (None disables)
+        progress_json: File to append JSON progress lines to (None disables)
+
+    Returns:
+        Dictionary with ndvi, ndwi, savi arrays
+    """
+    click.echo("🔬 Compositing vegetation indices...")
+
+    percentile = scene_item.properties["composite:percentile"]
+    composite_lazy = index_composite(
+        items, grid_kwargs, percentile, read_settings=read_settings
+    )
+    fetch = data_blocks(items, composite_lazy, log=click.echo)
+    if not fetch.all():
+        composite_lazy = prune_blocks(composite_lazy, fetch)
+    if checkpoint_dir:
+        store = os.path.join(
+            checkpoint_dir, checkpoint_key(scene_item.id, "indices", grid_kwargs)
+        )
+        with entry_lock(store, log=click.echo):
+            composite = compute_with_checkpoint(
+                composite_lazy,
+                store,
+                log=click.echo,
+                stage="composite",
+                progress_json=progress_json,
+                blocks=fetch,
+            )
+            clear_checkpoint(store)
+    else:
+        composite = compute_with_progress(
+            composite_lazy, "composite", click.echo, progress_json, blocks=fetch
+        )
+
+    indices = {name: composite.sel(index=name).values for name in INDICES}
+    click.echo(
+        f"   NDVI range: {np.nanmin(indices['ndvi']):.3f} to "
+        f"{np.nanmax(indices['ndvi']):.3f}"
     )
+    return indices
 
-    # Compute data (already clipped by bounds_latlon)
-    sentinel2_data = sentinel2_lazy.compute()
 
-    click.echo(f"   Data shape: {sentinel2_data.shape}")
+def _scene_lock(key, *cache_dirs):
+    """Lock of a scene in the first configured cache (none without a cache)."""
+    for directory in cache_dirs:
+        if directory:
+            return entry_lock(os.path.join(directory, key), log=click.echo)
+    return contextlib.nullcontext()
 
-    return sentinel2_data
+
+def _scene_attrs(item):
+    """Scene metadata kept alongside the bands in the scene store."""
+    return {
+        "item_id": item.id,
+        "datetime": item.datetime.isoformat(),
+        "cloud_cover": item.properties.get("eo:cloud_cover"),
+    }
 
 
 def calculate_indices(data):
@@ -126,15 +426,16 @@ def calculate_indices(data):
     return {"ndvi": ndvi, "ndwi": ndwi, "savi": savi}
 
 
-def detect_mangroves(indices):
+def detect_mangroves(indices, area_ha=0.01):
     """
     Detect mangrove pixels using threshold classification.
 
     Args:
         indices: Dictionary with ndvi, ndwi, savi
+        area_ha: Pixel area in hectares (scalar or per-row array)
 
     Returns:
-        Binary mask (1 = mangrove, 0 = non-mangrove)
+        Binary uint8 mask (1 = mangrove, 0 = non-mangrove)
     """
     click.echo("🌿 Detecting mangroves...")
 
@@ -148,11 +449,10 @@ def detect_mangroves(indices):
         & (ndvi < 0.9)  # Vegetated
         & (ndwi > -0.3)  # Not upland forest
         & (savi > 0.2)  # Near water  # Soil-adjusted vegetation
-    ).astype(float)
+    ).astype(np.uint8)
 
-    pixel_area_m2 = 10 * 10
     mangrove_pixels = np.sum(mask)
-    mangrove_area_ha = (mangrove_pixels * pixel_area_m2) / 10000
+    mangrove_area_ha = np.sum(mask * area_ha)
 
     click.echo(f"   Detected area: {mangrove_area_ha:.1f} hectares")
     click.echo(f"   Coverage: {(mangrove_pixels / mask.size * 100):.1f}% of study area")
@@ -160,23 +460,32 @@ def detect_mangroves(indices):
     return mask
 
 
-def estimate_biomass(ndvi, mask):
+def estimate_biomass(ndvi, mask, model_spec=None, layers=None):
     """
     Estimate above-ground biomass using allometric equation.
 
     Args:
         ndvi: NDVI array
         mask: Mangrove detection mask
+        model_spec: Model spec (see mangrove_models); the linear model takes
+            coefficients "a"/"b" (default 250.5/-75.2)
+        layers: Feature layers for the alternative model
 
     Returns:
         Biomass array (Mg/ha), statistics dictionary
     """
     click.echo("📊 Estimating biomass...")
 
-    # Allometric model from Myanmar field studies
-    # Biomass = 250.5 × NDVI - 75.2 (R² = 0.72)
-    biomass = 250.5 * ndvi - 75.2
-    biomass_masked = np.where(mask > 0, biomass, np.nan)
+    if model_spec is not None and model_spec["name"] != "ndvi_linear":
+        # Batched inference on masked pixels only
+        click.echo(f"   Model: {model_spec['name']} ({model_spec['model_path']})")
+        biomass_masked = predict_biomass(model_spec, layers, mask)
+    else:
+        # Allometric model from Myanmar field studies
+        # Biomass = 250.5 × NDVI - 75.2 (R² = 0.72)
+        model_spec = model_spec or {}
+        biomass = model_spec.get("a", 250.5) * ndvi + model_spec.get("b", -75.2)
+        biomass_masked = np.where(mask > 0, biomass, np.nan)
     biomass_masked = np.maximum(biomass_masked, 0)
 
     valid_biomass = biomass_masked[~np.isnan(biomass_masked)]
@@ -199,24 +508,26 @@ def estimate_biomass(ndvi, mask):
     return biomass_masked, stats
 
 
-def calculate_carbon(biomass_masked):
+def calculate_carbon(biomass_masked, area_ha=0.01, carbon_fraction=0.47):
     """
     Calculate carbon stocks using IPCC guidelines.
 
     Args:
         biomass_masked: Biomass array (Mg/ha)
+        area_ha: Pixel area in hectares (scalar or per-row array)
+        carbon_fraction: Carbon fraction of dry biomass (IPCC: 0.47)
 
     Returns:
         Dictionary with carbon metrics
     """
     click.echo("🌍 Calculating carbon stocks...")
 
-    valid_biomass = biomass_masked[~np.isnan(biomass_masked)]
+    valid = ~np.isnan(biomass_masked)
 
-    if len(valid_biomass) > 0:
-        pixel_area_ha = (10 * 10) / 10000
-        total_biomass_mg = np.sum(valid_biomass) * pixel_area_ha
-        carbon_stock_mg = total_biomass_mg * 0.47  # IPCC carbon fraction
+    if np.any(valid):
+        pixel_area = np.broadcast_to(area_ha, biomass_masked.shape)
+        total_biomass_mg = np.sum(biomass_masked[valid] * pixel_area[valid])
+        carbon_stock_mg = total_biomass_mg * carbon_fraction
         co2_equivalent_mg = carbon_stock_mg * 3.67  # CO2 to C ratio
 
         carbon = {
@@ -234,7 +545,94 @@ def calculate_carbon(biomass_masked):
     return carbon
 
 
-def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
+def estimate_uncertainty(indices, n_draws, area_ha=0.01, parameters=None, keep=None):
+    """
+    Propagate parameter uncertainty to area, biomass and carbon totals.
+
+    Args:
+        indices: Dictionary with ndvi, ndwi, savi
+        n_draws: Number of Monte Carlo parameter draws
+        area_ha: Pixel area in hectares (scalar or per-row array)
+        parameters: Overrides for DEFAULT_PARAMETERS (see mangrove_uncertainty)
+        keep: Optional mask restricting the pixels (the cleaned mask)
+
+    Returns:
+        Dictionary of confidence intervals per metric
+    """
+    click.echo(f"🎲 Propagating uncertainty ({n_draws:,} draws)...")
+
+    uncertainty = propagate_uncertainty(
+        indices, n_draws=n_draws, parameters=parameters, area_ha=area_ha, keep=keep
+    )
+
+    click.echo(f"   Biomass: {format_interval(uncertainty['total_biomass'], 'Mg')}")
+    click.echo(f"   Carbon: {format_interval(uncertainty['carbon_stock'], 'Mg C')}")
+    click.echo(f"   CO₂: {format_interval(uncertainty['co2_equivalent'], 'Mg CO₂')}")
+
+    return uncertainty
+
+
+def run_threshold_sweep(
+    indices,
+    output_dir,
+    area_ha=0.01,
+    slope=250.5,
+    intercept=-75.2,
+    carbon_fraction=0.47,
+    keep=None,
+):
+    """
+    Evaluate area, biomass and carbon across detection threshold sets.
+
+    All threshold sets are answered from one histogram pass over the
+    indices, then written with a one-at-a-time sensitivity table.
+
+    Args:
+        indices: Dictionary with ndvi, ndwi, savi arrays
+        output_dir: Output directory path
+        area_ha: Pixel area in hectares (scalar or per-row array)
+        slope: Allometric slope a of the linear model
+        intercept: Allometric intercept b of the linear model
+        carbon_fraction: Carbon fraction of dry biomass
+        keep: Optional mask restricting the pixels (the cleaned mask)
+    """
+    click.echo("🎚️  Sweeping detection thresholds...")
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = sweep_thresholds(
+        indices,
+        area_ha=area_ha,
+        slope=slope,
+        intercept=intercept,
+        carbon_fraction=carbon_fraction,
+        keep=keep,
+    )
+    sensitivity = sensitivity_summary(results)
+
+    results.to_csv(os.path.join(output_dir, "threshold_sweep.csv"), index=False)
+    sensitivity.to_csv(
+        os.path.join(output_dir, "threshold_sensitivity.csv"), index=False
+    )
+
+    click.echo(f"   Threshold sets: {len(results)}")
+    for row in sensitivity.itertuples():
+        click.echo(
+            f"   {row.threshold}: carbon spans {row.carbon_range_pct:.1f}% of nominal"
+        )
+
+
+def export_results(
+    output_dir,
+    mask,
+    biomass,
+    ndvi,
+    stats,
+    carbon,
+    item,
+    bbox,
+    uncertainty=None,
+    area_ha=0.01,
+):
     """
     Export results as CSV summaries and GeoTIFF rasters.
 
@@ -247,16 +645,33 @@ def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
         carbon: Carbon metrics
         item: STAC item (for metadata)
         bbox: Bounding box
+        uncertainty: Monte Carlo intervals (None for the default ±30%)
+        area_ha: Pixel area in hectares (scalar or per-row array)
+    """
+    # Calculate area
+    mangrove_area_ha = np.sum(mask * area_ha)
+
+    write_summaries(output_dir, mangrove_area_ha, stats, carbon, item, uncertainty)
+
+
+def write_summaries(
+    output_dir, mangrove_area_ha, stats, carbon, item, uncertainty=None
+):
+    """
+    Write the area and biomass/carbon summary CSVs.
+
+    Args:
+        output_dir: Output directory path
+        mangrove_area_ha: Detected mangrove area in hectares
+        stats: Biomass statistics
+        carbon: Carbon metrics
+        item: STAC item (for metadata)
+        uncertainty: Monte Carlo intervals (None for the default ±30%)
     """
     click.echo(f"💾 Exporting results to {output_dir}/...")
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Calculate area
-    pixel_area_m2 = 10 * 10
-    mangrove_pixels = np.sum(mask)
-    mangrove_area_ha = (mangrove_pixels * pixel_area_m2) / 10000
-
     # 1. Biomass summary CSV
     biomass_df = pd.DataFrame(
         [
@@ -288,13 +703,33 @@ def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
             },
             {"Metric": "Analysis Date", "Value": datetime.now().strftime("%Y-%m-%d")},
             {"Metric": "Scene Date", "Value": item.datetime.strftime("%Y-%m-%d")},
+            *_composite_rows(item),
             {
                 "Metric": "Cloud Cover (%)",
                 "Value": f"{item.properties.get('eo:cloud_cover', 0):.1f}",
             },
-            {"Metric": "Uncertainty", "Value": "±30%"},
         ]
     )
+    if uncertainty is not None:
+        confidence = uncertainty["confidence"]
+        uncertainty_rows = [
+            {
+                "Metric": f"Total Biomass {confidence}% CI (Mg)",
+                "Value": _format_bounds(uncertainty["total_biomass"]),
+            },
+            {
+                "Metric": f"Carbon Stock {confidence}% CI (Mg C)",
+                "Value": _format_bounds(uncertainty["carbon_stock"]),
+            },
+            {
+                "Metric": f"CO2 Equivalent {confidence}% CI (Mg CO2)",
+                "Value": _format_bounds(uncertainty["co2_equivalent"]),
+            },
+            {"Metric": "Uncertainty Draws", "Value": f"{uncertainty['n_draws']}"},
+        ]
+    else:
+        uncertainty_rows = [{"Metric": "Uncertainty", "Value": "±30%"}]
+    carbon_df = pd.concat([carbon_df, pd.DataFrame(uncertainty_rows)])
     carbon_df.to_csv(
         os.path.join(output_dir, "biomass_carbon_summary.csv"), index=False
     )
@@ -304,6 +739,357 @@ def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
     click.echo(f"   Outputs: {output_dir}/")
 
 
+def export_patches(output_dir, mask, biomass, grid):
+    """
+    Polygonize the mask into patches with area and biomass, as GeoParquet.
+
+    Args:
+        output_dir: Output directory path
+        mask: Mangrove detection mask
+        biomass: Biomass array
+        grid: Grid dict of the mask
+    """
+    click.echo("🔷 Polygonizing mangrove patches...")
+    path = os.path.join(output_dir, "mangrove_patches.parquet")
+    polygonize_mask(mask, grid, path, biomass, log=click.echo)
+    click.echo(f"   ✓ Patches saved: {path}")
+
+
+def _composite_rows(item):
+    """Report rows describing a composite (none for a single scene)."""
+    if "composite:items" not in item.properties:
+        return []
+    props = item.properties
+    return [
+        {
+            "Metric": "Composite",
+            "Value": f"p{props['composite:percentile']:g} of "
+            f"{len(props['composite:items'])} scenes ({props['composite:target']})",
+        },
+        {
+            "Metric": "Composite Dates",
+            "Value": f"{props['composite:start'][:10]} to {props['composite:end'][:10]}",
+        },
+    ]
+
+
+def _format_bounds(interval):
+    return f"{interval['lower']:,.0f} - {interval['upper']:,.0f}"
+
+
+def run_workflow(
+    bbox,
+    cloud_cover=20,
+    days_back=90,
+    output_dir="outputs",
+    native_crs=True,
+    read_settings=None,
+    checkpoint_dir=None,
+    scene_store=DEFAULT_STORE,
+    model="ndvi_linear",
+    model_path=None,
+    features=None,
+    threshold_sweep=False,
+    uncertainty_draws=1000,
+    catalog=None,
+    slope=250.5,
+    intercept=-75.2,
+    carbon_fraction=0.47,
+    stage_cache=DEFAULT_STAGE_DIR,
+    polygons=False,
+    composite=False,
+    percentile=50,
+    composite_target="bands",
+    scene=None,
+    aoi_cloud=True,
+    cleanup=None,
+    raw_cache=None,
+    progress_json=None,
+    coarse_to_fine=None,
+):
+    """
+    Run the full workflow for one bbox and export its results.
+
+    Shared by the command line and the processing service (see
+    mangrove_service), which passes a warm STAC client as catalog.
+
+    Search results, indices, mask and biomass are memoized in stage_cache
+    (see mangrove_memo), so a rerun only recomputes the stages downstream
+    of a changed parameter.
+
+    Args:
+        bbox: Bounding box [west, south, east, north]
+        cloud_cover: Maximum cloud cover percentage (over the AOI, cloud and
+            no data, when aoi_cloud is set)
+        days_back: Days to search backwards from today
+        output_dir: Output directory
+        native_crs: Load on the scene's UTM grid (False: EPSG:4326)
+        read_settings: Remote read settings (see mangrove_remote)
+        checkpoint_dir: Chunk store directory for resumable downloads
+        scene_store: Zarr scene store ('' or None disables)
+        model: Biomass model name (MODEL_TYPES key)
+        model_path: Saved model file for non-linear models
+        features: Feature names of non-linear models, in training order
+            (None: AVAILABLE_FEATURES, see mangrove_models)
+        threshold_sweep: Also write threshold sweep results (ndvi_linear only)
+        uncertainty_draws: Monte Carlo draws, 0 to skip
+        catalog: Open STAC client to reuse
+        slope: Allometric slope a of the linear model
+        intercept: Allometric intercept b of the linear model
+        carbon_fraction: Carbon fraction of dry biomass
+        stage_cache: Stage product directory ('' or None disables)
+        polygons: Also write mangrove patches with zonal stats as GeoParquet
+        composite: Composite the least-cloudy scenes found (up to
+            DEFAULT_MAX_ITEMS) instead of using the single best scene
+        percentile: Per-pixel percentile over time for the composite
+        composite_target: Composite "bands" or per-date "indices"
+        scene: (item, data) already loaded on this bbox's grid, skipping the
+            search and download (see mangrove_multi)
+        aoi_cloud: Rank scenes on cloud and no data over the AOI from their
+            SCL band (see mangrove_cloud) instead of tile-wide eo:cloud_cover
+        cleanup: Mask cleanup parameters (see mangrove_cleanup); None keeps
+            the mask as detected
+        raw_cache: Memory-mapped raw band cache directory (see mangrove_raw;
+            '' or None disables)
+        progress_json: File to append JSON download progress lines to, "-"
+            for stderr (see mangrove_progress; None disables)
+        coarse_to_fine: Coarse screen parameters (see mangrove_coarse); the
+            scene is screened at coarse resolution and only candidate
+            mangrove blocks are fetched at full resolution (None fetches the
+            whole bbox; single-scene runs only)
+
+    Returns:
+        Dictionary summarizing the scene, area, biomass and carbon results
+    """
+    cache = StageCache(stage_cache, log=click.echo)
+    if coarse_to_fine is not None and composite:
+        raise ValueError("Coarse-to-fine loading applies to single-scene runs")
+
+    blocks = None
+    if scene is not None:
+        # 1-2. Scene already searched and loaded (multi-AOI runs)
+        scene_item, sentinel2_data = scene
+        grid_kwargs = stack_grid_kwargs(scene_item, bbox, native_crs)
+    else:
+        # 1. Search STAC catalog (reused for the rest of the day); when
+        # scenes are scored over the AOI, only near-overcast tiles are
+        # left out here
+        search_cloud = SEARCH_CLOUD_COVER if aoi_cloud else cloud_cover
+        search_key = cache.key(
+            "search", STAC_URL, bbox, search_cloud, days_back, date.today().isoformat()
+        )
+        found = cache.cached(
+            "search",
+            search_key,
+            lambda: {
+                "items": [
+                    item.to_dict()
+                    for item in search_sentinel2(bbox, search_cloud, days_back, catalog)
+                ]
+            },
+        )
+        items = [pystac.Item.from_dict(item) for item in found["items"]]
+
+        # 1b. Rank scenes on cloud and no data over the AOI (SCL)
+        if aoi_cloud:
+            scores = cache.cached(
+                "scores",
+                cache.key("scores", search_key, DEFAULT_SCORE_SIZE),
+                lambda: {
+                    "scores": score_items(
+                        items, bbox, read_settings=read_settings, log=click.echo
+                    )
+                },
+            )["scores"]
+            items = rank_items(items, scores, cloud_cover)
+            if not items:
+                raise ValueError(
+                    f"No scenes with <{cloud_cover}% cloud and no data over the AOI"
+                )
+
+        # 2. Download best scene, or composite the scenes found
+        # (lazy when stored: read only if indices are needed)
+        if aoi_cloud:
+            best_item = items[0]
+            click.echo(f"   Best scene over the AOI: {best_item.id}")
+        else:
+            best_item = min(
+                items, key=lambda x: x.properties.get("eo:cloud_cover", 100)
+            )
+        grid_kwargs = stack_grid_kwargs(best_item, bbox, native_crs)
+        if composite:
+            composite_items = select_items(
+                items[:DEFAULT_MAX_ITEMS] if aoi_cloud else items
+            )
+            scene_item = composite_item(composite_items, percentile, composite_target)
+            sentinel2_data = download_composite(
+                composite_items,
+                scene_item,
+                grid_kwargs,
+                percentile,
+                composite_target,
+                read_settings,
+                checkpoint_dir,
+                scene_store,
+                lazy=bool(stage_cache),
+                progress_json=progress_json,
+            )
+        else:
+            scene_item = best_item
+            if coarse_to_fine is not None:
+                # 2a. Screen at coarse resolution for candidate blocks
+                screen = {**DEFAULT_SCREEN, **coarse_to_fine}
+                blocks = cache.cached(
+                    "screen",
+                    cache.key("screen", best_item.id, grid_kwargs, screen),
+                    lambda: {
+                        "blocks": candidate_blocks(
+                            best_item, grid_kwargs, screen, read_settings, click.echo
+                        )
+                    },
+                )["blocks"]
+            sentinel2_data = download_imagery(
+                best_item,
+                bbox,
+                native_crs,
+                read_settings,
+                checkpoint_dir,
+                scene_store,
+                lazy=bool(stage_cache),
+                raw_cache=raw_cache,
+                progress_json=progress_json,
+                blocks=blocks,
+            )
+    area_ha = pixel_area_ha(data_grid(sentinel2_data))
+    key = scene_key(scene_item.id, grid_kwargs)
+    if blocks is not None:
+        key = screened_key(key, blocks)
+
+    # 3. Calculate vegetation indices
+    def compute_indices():
+        if composite and composite_target == "indices":
+            return composite_indices(
+                composite_items,
+                scene_item,
+                grid_kwargs,
+                read_settings,
+                checkpoint_dir,
+                progress_json,
+            )
+        return calculate_indices(sentinel2_data)
+
+    indices_key = cache.key("indices", key)
+    indices = cache.cached("indices", indices_key, compute_indices)
+
+    # 4. Detect mangroves
+    mask_key = cache.key("mask", indices_key)
+    mask = cache.cached(
+        "mask", mask_key, lambda: {"mask": detect_mangroves(indices, area_ha)}
+    )["mask"]
+
+    # 4b. Clean up the mask (speckle, small patches and holes)
+    if cleanup_enabled(cleanup):
+        cleanup_params = {**DEFAULT_CLEANUP, **cleanup}
+        detected = mask
+        mask_key = cache.key("cleanup", mask_key, cleanup_params)
+        mask = cache.cached(
+            "cleanup",
+            mask_key,
+            lambda: {"mask": clean_mask(detected, cleanup_params, log=click.echo)},
+        )["mask"]
+
+    # 5. Estimate biomass
+    model_spec = {"name": model, "model_path": model_path}
+    if model == "ndvi_linear":
+        model_spec.update(a=slope, b=intercept)
+    elif features:
+        model_spec["features"] = list(features)
+    model_version = os.path.getmtime(model_path) if model_path else None
+
+    def compute_biomass():
+        biomass, stats = estimate_biomass(
+            indices["ndvi"],
+            mask,
+            model_spec,
+            # The linear model only needs NDVI; skip reading the bands
+            feature_layers(sentinel2_data, indices) if model != "ndvi_linear" else None,
+        )
+        return {"biomass": biomass, "stats": stats}
+
+    biomass_key = cache.key("biomass", mask_key, model_spec, model_version)
+    estimated = cache.cached("biomass", biomass_key, compute_biomass)
+    biomass, stats = estimated["biomass"], estimated["stats"]
+
+    # (an index composite has no stored bands to attach layers to)
+    if scene_store and "biomass" not in cache.reused and has_scene(scene_store, key):
+        write_layers(
+            scene_store, key, {**indices, "mask": mask > 0, "biomass": biomass}
+        )
+
+    # 6. Calculate carbon
+    carbon = calculate_carbon(biomass, area_ha, carbon_fraction)
+
+    # Thresholds drawn by the sweep and the uncertainty pass only vary
+    # detection within the cleaned mask: pixels cleanup removed stay out
+    keep = mask if cleanup_enabled(cleanup) else None
+
+    # 6b. Threshold sensitivity
+    # (sweep biomass assumes the linear NDVI model)
+    if threshold_sweep and model != "ndvi_linear":
+        click.echo(
+            f"⚠️  Threshold sweep assumes the ndvi_linear model; skipped for {model}"
+        )
+    elif threshold_sweep:
+        run_threshold_sweep(
+            indices, output_dir, area_ha, slope, intercept, carbon_fraction, keep
+        )
+
+    # 7. Propagate parameter uncertainty
+    # (intervals assume the linear NDVI model)
+    uncertainty = None
+    if uncertainty_draws > 0 and model == "ndvi_linear":
+        parameters = {
+            name: (value, DEFAULT_PARAMETERS[name][1])
+            for name, value in [
+                ("slope", slope),
+                ("intercept", intercept),
+                ("carbon_fraction", carbon_fraction),
+            ]
+        }
+        uncertainty = estimate_uncertainty(
+            indices, uncertainty_draws, area_ha, parameters, keep
+        )
+
+    # 8. Export results
+    export_results(
+        output_dir,
+        mask,
+        biomass,
+        indices["ndvi"],
+        stats,
+        carbon,
+        scene_item,
+        bbox,
+        uncertainty,
+        area_ha,
+    )
+
+    # 9. Vector patches
+    if polygons:
+        export_patches(output_dir, mask, biomass, data_grid(sentinel2_data))
+
+    return {
+        "scene_id": scene_item.id,
+        "scene_date": scene_item.datetime.isoformat(),
+        "cloud_cover": scene_item.properties.get("eo:cloud_cover"),
+        "mangrove_area_ha": float(np.sum(mask * area_ha)),
+        "biomass": {name: float(value) for name, value in stats.items()},
+        "carbon": {name: float(value) for name, value in carbon.items()},
+        "uncertainty": uncertainty,
+        "output_dir": output_dir,
+    }
+
+
 @click.command(
     short_help="Mangrove biomass estimation",
     help="""
@@ -346,7 +1132,8 @@ def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
     "--cloud-cover",
     type=int,
     default=20,
-    help="Maximum cloud cover percentage (0-100) [default: 20]",
+    help="Maximum cloud cover percentage (0-100), over the AOI with --aoi-cloud "
+    "[default: 20]",
 )
 @click.option(
     "--days-back",
@@ -360,43 +1147,275 @@ def export_results(output_dir, mask, biomass, ndvi, stats, carbon, item, bbox):
     default="outputs",
     help="Output directory for results [default: outputs]",
 )
-def main(west, south, east, north, cloud_cover, days_back, output_dir):
+@click.option(
+    "--native-crs/--latlon-grid",
+    default=True,
+    help="Load on the scene's UTM grid (exact 10 m pixels) or warp to EPSG:4326 "
+    "[default: native-crs]",
+)
+@click.option(
+    "--read-profile",
+    type=click.Choice(list(READ_PROFILES)),
+    default=None,
+    help=f"GDAL remote read profile for COG range requests [default: {DEFAULT_READ_PROFILE}]",
+)
+@click.option(
+    "--read-config",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML config with a sentinel2.read_settings section (e.g. config/demo_config.yaml)",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=str,
+    default=None,
+    help="Chunk store for resuming interrupted downloads [default: OUTPUT_DIR/.chunks]",
+)
+@click.option(
+    "--scene-store",
+    type=str,
+    default=DEFAULT_STORE,
+    help=f"Zarr scene store shared with the runner and notebook, '' to disable [default: {DEFAULT_STORE}]",
+)
+@click.option(
+    "--raw-cache",
+    type=str,
+    default="",
+    help=f"Uncompressed memory-mapped band cache for fast reloads, e.g. {DEFAULT_RAW_DIR} "
+    "[default: off]",
+)
+@click.option(
+    "--model",
+    type=click.Choice(list(MODEL_TYPES)),
+    default="ndvi_linear",
+    help="Biomass model [default: ndvi_linear]",
+)
+@click.option(
+    "--model-path",
+    type=str,
+    default=None,
+    help="Saved model file for random_forest (joblib) or neural_network (ONNX)",
+)
+@click.option(
+    "--features",
+    type=str,
+    default=None,
+    help="Comma-separated features of random_forest/neural_network in training "
+    "order, from red, green, nir, ndvi, ndwi, savi [default: all]",
+)
+@click.option(
+    "--slope",
+    type=float,
+    default=250.5,
+    help="Allometric slope a of Biomass = a × NDVI + b [default: 250.5]",
+)
+@click.option(
+    "--intercept",
+    type=float,
+    default=-75.2,
+    help="Allometric intercept b (Mg/ha) [default: -75.2]",
+)
+@click.option(
+    "--carbon-fraction",
+    type=float,
+    default=0.47,
+    help="Carbon fraction of dry biomass [default: 0.47, IPCC]",
+)
+@click.option(
+    "--stage-cache",
+    type=str,
+    default=DEFAULT_STAGE_DIR,
+    help=f"Memoized stage products (search, indices, mask, biomass), '' to disable [default: {DEFAULT_STAGE_DIR}]",
+)
+@click.option(
+    "--aoi-cloud/--tile-cloud",
+    default=True,
+    help="Rank scenes on cloud and no data over the AOI (SCL band) or on "
+    "tile-wide eo:cloud_cover [default: aoi-cloud]",
+)
+@click.option(
+    "--open-radius",
+    type=int,
+    default=0,
+    help="Mask opening radius in pixels, removes speckle [default: 0, off]",
+)
+@click.option(
+    "--close-radius",
+    type=int,
+    default=0,
+    help="Mask closing radius in pixels, bridges gaps [default: 0, off]",
+)
+@click.option(
+    "--min-patch",
+    type=int,
+    default=0,
+    help="Drop mangrove patches under this many pixels [default: 0, off]",
+)
+@click.option(
+    "--min-hole",
+    type=int,
+    default=0,
+    help="Fill non-mangrove holes under this many pixels [default: 0, off]",
+)
+@click.option(
+    "--connectivity",
+    type=click.Choice(["4", "8"]),
+    default="4",
+    help="Pixel connectivity of mangrove patches [default: 4]",
+)
+@click.option(
+    "--composite/--best-scene",
+    default=False,
+    help=f"Per-pixel composite of up to {DEFAULT_MAX_ITEMS} least-cloudy scenes "
+    "instead of the single least-cloudy scene [default: best-scene]",
+)
+@click.option(
+    "--percentile",
+    type=click.FloatRange(0, 100),
+    default=50,
+    help="Percentile over time for --composite [default: 50, median]",
+)
+@click.option(
+    "--composite-target",
+    type=click.Choice(COMPOSITE_TARGETS),
+    default="bands",
+    help="Composite the bands, or NDVI/NDWI/SAVI computed per date [default: bands]",
+)
+@click.option(
+    "--polygons",
+    is_flag=True,
+    default=False,
+    help="Also write mangrove patches with area and biomass as GeoParquet",
+)
+@click.option(
+    "--threshold-sweep",
+    is_flag=True,
+    default=False,
+    help="Also report results across detection threshold sets (ndvi_linear only)",
+)
+@click.option(
+    "--uncertainty-draws",
+    type=int,
+    default=1000,
+    help="Monte Carlo draws for confidence intervals, 0 to skip [default: 1000]",
+)
+@click.option(
+    "--progress-json",
+    type=str,
+    default=None,
+    help="Append machine-readable download progress lines (JSON) to this file, "
+    "or '-' for stderr",
+)
+@click.option(
+    "--coarse-to-fine/--full-res",
+    default=False,
+    help="Screen the bbox at coarse resolution and fetch only blocks that could "
+    "hold mangrove (vegetated near water) at 10 m [default: full-res]",
+)
+@click.option(
+    "--coarse-factor",
+    type=click.Choice(["4", "8", "16", "32"]),
+    default=str(DEFAULT_SCREEN["factor"]),
+    help="Coarse pixel size in 10 m pixels for --coarse-to-fine "
+    f"[default: {DEFAULT_SCREEN['factor']}]",
+)
+@click.option(
+    "--water-distance",
+    type=float,
+    default=DEFAULT_SCREEN["water_distance"],
+    help="Metres from open water within which vegetation is screened in "
+    f"for --coarse-to-fine [default: {DEFAULT_SCREEN['water_distance']}]",
+)
+def main(
+    west,
+    south,
+    east,
+    north,
+    cloud_cover,
+    days_back,
+    output_dir,
+    native_crs,
+    read_profile,
+    read_config,
+    checkpoint_dir,
+    scene_store,
+    raw_cache,
+    model,
+    model_path,
+    features,
+    slope,
+    intercept,
+    carbon_fraction,
+    stage_cache,
+    aoi_cloud,
+    open_radius,
+    close_radius,
+    min_patch,
+    min_hole,
+    connectivity,
+    composite,
+    percentile,
+    composite_target,
+    polygons,
+    threshold_sweep,
+    uncertainty_draws,
+    progress_json,
+    coarse_to_fine,
+    coarse_factor,
+    water_distance,
+):
     """Main workflow execution."""
 
     click.echo("=" * 60)
     click.echo("🌿 Mangrove Biomass Estimation Workflow")
     click.echo("=" * 60)
     click.echo(f"Study area: ({west}, {south}) to ({east}, {north})")
-    click.echo(f"Max cloud cover: {cloud_cover}%")
+    click.echo(
+        f"Max cloud cover: {cloud_cover}%" + (" over the AOI" if aoi_cloud else "")
+    )
     click.echo(f"Search window: {days_back} days")
     click.echo("")
 
     try:
-        # 1. Search STAC catalog
         bbox = [west, south, east, north]
-        items = search_sentinel2(bbox, cloud_cover, days_back)
-
-        # 2. Download best scene
-        best_item = min(items, key=lambda x: x.properties.get("eo:cloud_cover", 100))
-        sentinel2_data = download_imagery(best_item, bbox)
-
-        # 3. Calculate vegetation indices
-        indices = calculate_indices(sentinel2_data)
-
-        # 4. Detect mangroves
-        mask = detect_mangroves(indices)
-
-        # 5. Estimate biomass
-        biomass, stats = estimate_biomass(indices["ndvi"], mask)
-
-        # 6. Calculate carbon
-        carbon = calculate_carbon(biomass)
-
-        # 7. Export results
-        export_results(
-            output_dir, mask, biomass, indices["ndvi"], stats, carbon, best_item, bbox
+        run_workflow(
+            bbox,
+            cloud_cover,
+            days_back,
+            output_dir,
+            native_crs=native_crs,
+            read_settings=load_read_settings(read_config, read_profile),
+            checkpoint_dir=checkpoint_dir or os.path.join(output_dir, ".chunks"),
+            scene_store=scene_store,
+            raw_cache=raw_cache,
+            model=model,
+            model_path=model_path,
+            features=parse_features(features),
+            threshold_sweep=threshold_sweep,
+            uncertainty_draws=uncertainty_draws,
+            slope=slope,
+            intercept=intercept,
+            carbon_fraction=carbon_fraction,
+            stage_cache=stage_cache,
+            polygons=polygons,
+            aoi_cloud=aoi_cloud,
+            cleanup={
+                "open_radius": open_radius,
+                "close_radius": close_radius,
+                "min_patch": min_patch,
+                "min_hole": min_hole,
+                "connectivity": int(connectivity),
+            },
+            composite=composite,
+            percentile=percentile,
+            composite_target=composite_target,
+            progress_json=progress_json,
+            coarse_to_fine=(
+                {"factor": int(coarse_factor), "water_distance": water_distance}
+                if coarse_to_fine
+                else None
+            ),
         )
-
     except Exception as e:
         click.echo(f"\n❌ Error: {str(e)}", err=True)
         sys.exit(1)
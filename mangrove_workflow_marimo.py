@@ -18,12 +18,45 @@ with app.setup(hide_code=True):
     import rioxarray
     import stackstac
     import xarray as xr
-    from lonboard import Map, PolygonLayer
+    from lonboard import BitmapTileLayer, Map, PolygonLayer
     from plotly.subplots import make_subplots
     from pystac_client import Client
     from scipy import stats
     from shapely.geometry import box
 
+    from mangrove_change import detect_cube_change
+    from mangrove_cloud import SEARCH_CLOUD_COVER, rank_items, score_items
+    from mangrove_coarse import prune_blocks
+    from mangrove_cube import (
+        DEFAULT_CUBE,
+        append_rasters,
+        append_scene,
+        cube_grid,
+        cube_grid_kwargs,
+        cube_scene_ids,
+        has_cube,
+        observed_biomass,
+        open_cube,
+        select_scenes,
+    )
+    from mangrove_footprint import data_blocks
+    from mangrove_grid import data_grid, pixel_area_ha, stack_grid_kwargs
+    from mangrove_lock import atomic_path, entry_lock
+    from mangrove_quicklook import build_quicklooks
+    from mangrove_remote import stack_gdal_env
+    from mangrove_store import (
+        DEFAULT_STORE,
+        has_scene,
+        open_scene,
+        scene_bands,
+        scene_key,
+        write_layers,
+        write_scene,
+    )
+    from mangrove_tiles import get_tile_server, raster_zoom_range
+    from mangrove_trend import fit_trend, summarize_trend
+    from mangrove_uncertainty import propagate_uncertainty
+
     warnings.filterwarnings("ignore")
 
 
@@ -215,7 +248,12 @@ def _():
 @app.cell(hide_code=True)
 def _():
     max_cloud_cover = mo.ui.slider(
-        10, 50, value=30, step=5, label="Max Cloud Cover (%):", show_value=True
+        10,
+        90,
+        value=30,
+        step=5,
+        label="Max Cloud + No Data over AOI (%):",
+        show_value=True,
     )
     max_cloud_cover  # noqa: B018
     return (max_cloud_cover,)
@@ -272,7 +310,11 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
     _cache_dir = Path("data_cache") / "temporal" / _site_slug
     _cache_dir.mkdir(parents=True, exist_ok=True)
 
+    # Per-site (time, y, x) biomass/NDVI cube on the first scene's grid
+    _cube_path = _cache_dir / DEFAULT_CUBE
+
     _temporal_samples = []
+    _candidates = []
 
     for _i, (_label, _start_str, _end_str) in enumerate(_time_windows):
         print(f"  [{_i+1}/4] {_label}: Searching...", end=" ")
@@ -281,7 +323,9 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
             collections=["sentinel-2-l2a"],
             bbox=_bbox,
             datetime=f"{_start_str}/{_end_str}",
-            query={"eo:cloud_cover": {"lt": max_cloud_cover.value}},
+            # Scenes are ranked on cloud over the AOI below; only
+            # near-overcast tiles are left out here
+            query={"eo:cloud_cover": {"lt": SEARCH_CLOUD_COVER}},
             limit=10,
         )
 
@@ -290,8 +334,26 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
             print("no scenes")
             continue
 
-        # Select items with lowest cloud cover (sort client-side)
-        _items.sort(key=lambda x: x.properties.get("eo:cloud_cover", 100))
+        # Rank on cloud and no data over the AOI, from the SCL band
+        _scores = score_items(_items, _bbox, log=lambda _message: None)
+        _aoi_score = {_s["item_id"]: _s["score"] for _s in _scores}
+        _items = rank_items(_items, _scores, max_cloud_cover.value)
+        if not _items:
+            print("no clear scenes over the AOI")
+            continue
+
+        # Overview quicklooks of every candidate; skip scenes with no data
+        # over the AOI before downloading them
+        _previews = [
+            {**_q, "aoi_score": _aoi_score[_q["item_id"]]}
+            for _q in build_quicklooks(_items, _bbox, log=lambda _message: None)
+        ]
+        _candidates.append((_label, _previews))
+        _items = [
+            _it
+            for _it, _q in zip(_items, _previews, strict=True)
+            if _q.get("valid_pct", 100) >= 1
+        ]
 
         # Try items until we find one with valid data
         for _item in _items[:5]:  # Try up to 5 scenes per time window
@@ -303,125 +365,190 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
             _scene_cache_dir = _cache_dir / _scene_id
             _stats_file = _scene_cache_dir / "stats.json"
 
-            if _stats_file.exists():
-                # Load from cache
-                with open(_stats_file) as _f:
-                    _sample = json.load(_f)
+            # Concurrent sessions wait for each other on the same scene
+            with entry_lock(_scene_cache_dir):
+                # Load from cache; an unreadable stats file counts as a miss
+                try:
+                    with open(_stats_file) as _f:
+                        _sample = json.load(_f)
                     _sample["date"] = datetime.fromisoformat(_sample["date"])
-                _temporal_samples.append(_sample)
-                print(
-                    f"found {_scene_date.strftime('%Y-%m-%d')} ({_cloud:.1f}% cloud) [cached]"
-                )
-                break  # Found valid cached scene
-
-            # Download and process
-            print(f"trying {_scene_date.strftime('%Y-%m-%d')}...", end=" ")
-            _scene_cache_dir.mkdir(parents=True, exist_ok=True)
-
-            _cache_files = {
-                "red": _scene_cache_dir / "red.tif",
-                "green": _scene_cache_dir / "green.tif",
-                "nir": _scene_cache_dir / "nir.tif",
-            }
-
-            if all(_f.exists() for _f in _cache_files.values()):
-                _bands_data = {}
-                for _band_name, _filepath in _cache_files.items():
-                    with rioxarray.open_rasterio(_filepath) as _src:
-                        _bands_data[_band_name] = _src.values[0]
-            else:
-                _sentinel2_lazy = stackstac.stack(
-                    [_item],
-                    assets=["red", "green", "nir"],
-                    epsg=4326,
-                    resolution=0.0005,  # Lower res for speed (50m)
-                    bounds_latlon=_bbox,
-                    chunksize=(1, 1, 512, 512),
-                )
-                _data = _sentinel2_lazy.compute()
-
+                except (OSError, ValueError, KeyError):
+                    _sample = None
+
+                if _sample is not None:
+                    # Import scenes cached before the cube existed
+                    _biomass_path = _scene_cache_dir / "biomass.tif"
+                    if (
+                        _scene_id not in cube_scene_ids(_cube_path)
+                        and _biomass_path.exists()
+                    ):
+                        append_rasters(
+                            _cube_path, _scene_id, _scene_date, _biomass_path
+                        )
+                    _temporal_samples.append(_sample)
+                    print(
+                        f"found {_scene_date.strftime('%Y-%m-%d')} ({_cloud:.1f}% cloud) [cached]"
+                    )
+                    break  # Found valid cached scene
+
+                # Download and process
+                print(f"trying {_scene_date.strftime('%Y-%m-%d')}...", end=" ")
+
+                # Cube grid once it exists, else native UTM; lower res for speed (50m)
+                if has_cube(_cube_path):
+                    _grid_kwargs = cube_grid_kwargs(_cube_path)
+                else:
+                    _grid_kwargs = stack_grid_kwargs(_item, _bbox, resolution=50)
+                _key = scene_key(_item.id, _grid_kwargs)
+
+                if has_scene(DEFAULT_STORE, _key):
+                    _data = scene_bands(open_scene(DEFAULT_STORE, _key)).compute()
+                else:
+                    _sentinel2_lazy = stackstac.stack(
+                        [_item],
+                        assets=["red", "green", "nir"],
+                        **_grid_kwargs,
+                        chunksize=(1, 1, 512, 512),
+                        gdal_env=stack_gdal_env(),
+                    )
+                    # Chunks outside the scene footprint are never read
+                    _fetch = data_blocks(
+                        [_item], _sentinel2_lazy, log=lambda _message: None
+                    )
+                    if not _fetch.any():
+                        print("skipped (no data over the AOI)")
+                        continue  # Try next scene in this time window
+                    if not _fetch.all():
+                        _sentinel2_lazy = prune_blocks(_sentinel2_lazy, _fetch)
+                    _data = _sentinel2_lazy.compute()
+                    write_scene(
+                        DEFAULT_STORE,
+                        _key,
+                        _data,
+                        {
+                            "item_id": _scene_id,
+                            "datetime": _scene_date.isoformat(),
+                            "cloud_cover": _cloud,
+                        },
+                    )
+
+                _grid = data_grid(_data)
+                _grid_coords = {"y": _data.y.values, "x": _data.x.values}
                 _bands_data = {}
                 for _band_name in ["red", "green", "nir"]:
                     _band = _data.sel(band=_band_name)
                     if "time" in _band.dims:
                         _band = _band.isel(time=0)
                     _bands_data[_band_name] = _band.values
-                    _band_xr = _band.rio.write_crs("EPSG:4326")
-                    _band_xr.rio.to_raster(_cache_files[_band_name], compress="lzw")
-
-            # Validate scene has enough valid data (>1% non-NaN)
-            # Lower threshold allows multi-tile sites to find scenes
-            _valid_pct = np.sum(~np.isnan(_bands_data["nir"])) / _bands_data["nir"].size
-            if _valid_pct < 0.01:
-                print(f"skipped ({_valid_pct*100:.1f}% valid)")
-                import shutil
-
-                shutil.rmtree(_scene_cache_dir, ignore_errors=True)
-                continue  # Try next scene in this time window
-
-            # Calculate biomass stats
-            _red = _bands_data["red"]
-            _nir = _bands_data["nir"]
-            _ndvi = (_nir - _red) / (_nir + _red + 1e-8)
-
-            # Standard NDVI threshold for mangrove detection (literature-backed)
-            _mangrove_mask = (_ndvi > 0.4) & (_ndvi < 0.95)
-            _biomass = 250.5 * _ndvi - 75.2
-            _biomass = np.where(_mangrove_mask, _biomass, np.nan)
-            _biomass = np.maximum(_biomass, 0)
-
-            _valid_biomass = _biomass[~np.isnan(_biomass)]
-
-            _pixel_area_ha = (50 * 50) / 10000  # 50m resolution
-
-            # Coverage-aware metrics (scale-independent, comparable across scenes)
-            _valid_pixels = np.sum(~np.isnan(_bands_data["nir"]))
-            _valid_coverage_ha = _valid_pixels * _pixel_area_ha
-            _mangrove_pixels = np.sum(_mangrove_mask)
-            _mangrove_area_ha = _mangrove_pixels * _pixel_area_ha
-
-            # Mangrove fraction: % of valid observed area that is mangrove
-            # This metric IS comparable across scenes with different coverage
-            _mangrove_fraction = (
-                (_mangrove_pixels / _valid_pixels * 100) if _valid_pixels > 0 else 0
-            )
 
-            _sample = {
-                "date": _scene_date,
-                "scene_id": _scene_id,
-                "cloud_cover": _cloud,
-                "valid_coverage_ha": float(_valid_coverage_ha),
-                "valid_coverage_pct": float(_valid_pct * 100),
-                "biomass_mean": float(np.mean(_valid_biomass))
-                if len(_valid_biomass) > 0
-                else 0,
-                "biomass_std": float(np.std(_valid_biomass))
-                if len(_valid_biomass) > 0
-                else 0,
-                "mangrove_area_ha": float(_mangrove_area_ha),
-                "mangrove_fraction": float(_mangrove_fraction),
-                "carbon_stock": float(np.sum(_valid_biomass) * _pixel_area_ha * 0.47)
-                if len(_valid_biomass) > 0
-                else 0,
-                "carbon_density": float(np.mean(_valid_biomass) * 0.47)
-                if len(_valid_biomass) > 0
-                else 0,
-            }
+                # Validate scene has enough valid data (>1% non-NaN)
+                # Lower threshold allows multi-tile sites to find scenes
+                _valid_pct = (
+                    np.sum(~np.isnan(_bands_data["nir"])) / _bands_data["nir"].size
+                )
+                if _valid_pct < 0.01:
+                    print(f"skipped ({_valid_pct*100:.1f}% valid)")
+                    continue  # Try next scene in this time window
+
+                # Calculate biomass stats
+                _red = _bands_data["red"]
+                _nir = _bands_data["nir"]
+                _ndvi = (_nir - _red) / (_nir + _red + 1e-8)
+
+                # Standard NDVI threshold for mangrove detection (literature-backed)
+                _mangrove_mask = (_ndvi > 0.4) & (_ndvi < 0.95)
+                _biomass = 250.5 * _ndvi - 75.2
+                _biomass = np.where(_mangrove_mask, _biomass, np.nan)
+                _biomass = np.maximum(_biomass, 0)
+
+                _valid_biomass = _biomass[~np.isnan(_biomass)]
+
+                write_layers(
+                    DEFAULT_STORE,
+                    _key,
+                    {"ndvi": _ndvi, "mask": _mangrove_mask, "biomass": _biomass},
+                )
+                append_scene(
+                    _cube_path,
+                    _scene_id,
+                    _scene_date,
+                    {"biomass": _biomass, "ndvi": _ndvi},
+                    _grid,
+                )
+
+                # True pixel areas (exact on UTM, per-row on a lat/lon fallback grid)
+                _area = np.broadcast_to(pixel_area_ha(_grid), _ndvi.shape)
+
+                # Coverage-aware metrics (scale-independent, comparable across scenes)
+                _valid_pixels = np.sum(~np.isnan(_bands_data["nir"]))
+                _valid_coverage_ha = np.sum(_area[~np.isnan(_bands_data["nir"])])
+                _mangrove_pixels = np.sum(_mangrove_mask)
+                _mangrove_area_ha = np.sum(_area[_mangrove_mask])
 
-            # Save to cache
-            _cache_sample = _sample.copy()
-            _cache_sample["date"] = _sample["date"].isoformat()
-            with open(_stats_file, "w") as _f:
-                json.dump(_cache_sample, _f)
+                # Mangrove fraction: % of valid observed area that is mangrove
+                # This metric IS comparable across scenes with different coverage
+                _mangrove_fraction = (
+                    (_mangrove_pixels / _valid_pixels * 100) if _valid_pixels > 0 else 0
+                )
+
+                # Monte Carlo intervals for this scene's NDVI-only model
+                _uncertainty = propagate_uncertainty(
+                    {"ndvi": _ndvi},
+                    n_draws=2000,
+                    parameters={
+                        "ndvi_min": (0.4, 0.02),
+                        "ndvi_max": (0.95, 0.02),
+                        "ndwi_min": None,
+                        "savi_min": None,
+                    },
+                    area_ha=_area,
+                )
 
-            # Save biomass raster for visualization
-            _biomass_xr = xr.DataArray(_biomass, dims=["y", "x"])
-            _biomass_xr = _biomass_xr.rio.write_crs("EPSG:4326")
-            _biomass_xr.rio.to_raster(_scene_cache_dir / "biomass.tif", compress="lzw")
+                _sample = {
+                    "date": _scene_date,
+                    "scene_id": _scene_id,
+                    "cloud_cover": _cloud,
+                    "valid_coverage_ha": float(_valid_coverage_ha),
+                    "valid_coverage_pct": float(_valid_pct * 100),
+                    "biomass_mean": float(np.mean(_valid_biomass))
+                    if len(_valid_biomass) > 0
+                    else 0,
+                    "biomass_std": float(np.std(_valid_biomass))
+                    if len(_valid_biomass) > 0
+                    else 0,
+                    "mangrove_area_ha": float(_mangrove_area_ha),
+                    "mangrove_fraction": float(_mangrove_fraction),
+                    "carbon_stock": float(np.nansum(_biomass * _area) * 0.47)
+                    if len(_valid_biomass) > 0
+                    else 0,
+                    "carbon_density": float(np.mean(_valid_biomass) * 0.47)
+                    if len(_valid_biomass) > 0
+                    else 0,
+                    "carbon_stock_lower": _uncertainty["carbon_stock"]["lower"],
+                    "carbon_stock_upper": _uncertainty["carbon_stock"]["upper"],
+                }
+
+                # Save biomass and NDVI as georeferenced COGs for the tile server
+                for _name, _raster in [("biomass", _biomass), ("ndvi", _ndvi)]:
+                    _raster_xr = xr.DataArray(
+                        _raster.astype("float32"), dims=["y", "x"], coords=_grid_coords
+                    )
+                    _raster_xr = _raster_xr.rio.write_crs(_grid["crs"])
+                    with atomic_path(_scene_cache_dir / f"{_name}.tif") as _tmp_path:
+                        _raster_xr.rio.to_raster(
+                            _tmp_path, driver="COG", compress="lzw"
+                        )
+
+                # Save to cache; the stats file goes last as it marks a cache hit
+                _cache_sample = _sample.copy()
+                _cache_sample["date"] = _sample["date"].isoformat()
+                with atomic_path(_stats_file) as _tmp_path:
+                    with open(_tmp_path, "w") as _f:
+                        json.dump(_cache_sample, _f)
 
-            _temporal_samples.append(_sample)
-            print("done")
-            break  # Found valid scene, move to next time window
+                _temporal_samples.append(_sample)
+                print("done")
+                break  # Found valid scene, move to next time window
 
     # Sort by date
     _temporal_samples.sort(key=lambda x: x["date"])
@@ -464,6 +591,7 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
                 ),
             },
             "samples": _temporal_samples,
+            "candidates": _candidates,
             "summary": {
                 "initial": _initial,
                 "current": _current,
@@ -478,6 +606,41 @@ def _(load_temporal_button, max_cloud_cover, selected_site, site_info):
     return (temporal_data,)
 
 
+@app.cell(hide_code=True)
+def _(temporal_data):
+    mo.stop(temporal_data is None, mo.md("*Load temporal data first*"))
+
+    # Quicklooks of every search result, from COG overviews (no download)
+    _chosen = {s["scene_id"] for s in temporal_data["samples"]}
+    _rows = [
+        mo.md(
+            "### Candidate Scenes\n\nAOI previews of all search results; ✅ marks the scene used."
+        )
+    ]
+    for _label, _previews in temporal_data["candidates"]:
+        _cards = []
+        for _q in _previews:
+            if "error" in _q:
+                continue
+            _mark = "✅ " if _q["item_id"] in _chosen else ""
+            _cards.append(
+                mo.vstack(
+                    [
+                        mo.image(src=f"{_q['path']}/rgb.png", width=140),
+                        mo.md(
+                            f"{_mark}{_q['datetime']:%Y-%m-%d}<br>"
+                            f"☁️ {_q['aoi_score']:.0f}% over AOI "
+                            f"({_q['cloud_cover']:.0f}% tile)"
+                        ),
+                    ]
+                )
+            )
+        _rows.append(mo.md(f"**{_label}**"))
+        _rows.append(mo.hstack(_cards, justify="start", wrap=True))
+    mo.vstack(_rows)
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -509,19 +672,13 @@ def _(selected_site, temporal_data, time_slider):
     _sample = temporal_data["samples"][_idx]
     _date_str = _sample["date"].strftime("%Y-%m-%d")
 
-    # Load biomass raster for this sample
+    # Read this sample's date from the site cube (only its chunks)
     _site_slug = selected_site.lower().replace(" ", "_")
-    _biomass_path = (
-        Path("data_cache")
-        / "temporal"
-        / _site_slug
-        / _sample["scene_id"]
-        / "biomass.tif"
-    )
+    _cube_path = Path("data_cache") / "temporal" / _site_slug / DEFAULT_CUBE
 
-    if _biomass_path.exists():
-        with rioxarray.open_rasterio(_biomass_path) as _src:
-            _biomass_raster = _src.values[0]
+    if _sample["scene_id"] in cube_scene_ids(_cube_path):
+        _cube = select_scenes(open_cube(_cube_path), [_sample["scene_id"]])
+        _biomass_raster = _cube["biomass"].values[0]
 
         # Downsample for display (max 400x400 to stay under marimo limit)
         _max_dim = 400
@@ -558,6 +715,84 @@ def _(selected_site, temporal_data, time_slider):
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Full-Resolution Map
+
+    Pan and zoom the selected date at full resolution. Tiles are rendered on demand
+    by a local tile server from the cached biomass/NDVI COGs, so only the visible
+    area is sent to the browser.
+    """
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _():
+    map_layer_dropdown = mo.ui.dropdown(
+        options=["biomass", "ndvi"], value="biomass", label="Map Layer:"
+    )
+    map_layer_dropdown  # noqa: B018
+    return (map_layer_dropdown,)
+
+
+@app.cell(hide_code=True)
+def _(map_layer_dropdown, selected_site, site_info, temporal_data, time_slider):
+    mo.stop(temporal_data is None, mo.md("*Load temporal data first*"))
+
+    _sample = temporal_data["samples"][time_slider.value]
+    _kind = map_layer_dropdown.value
+    _site_slug = selected_site.lower().replace(" ", "_")
+    _raster_path = (
+        Path("data_cache")
+        / "temporal"
+        / _site_slug
+        / _sample["scene_id"]
+        / f"{_kind}.tif"
+    )
+
+    _georeferenced = False
+    if _raster_path.exists():
+        with rioxarray.open_rasterio(_raster_path) as _src:
+            _georeferenced = _src.rio.crs is not None
+
+    mo.stop(
+        not _georeferenced,
+        mo.md(
+            f"*No georeferenced {_kind} raster cached for this date - "
+            "clear its cache directory and reload to enable the tile map*"
+        ),
+    )
+
+    _tile_server = get_tile_server()
+    _tile_url = _tile_server.add_layer(
+        f"{_site_slug}/{_sample['scene_id']}/{_kind}", _raster_path, kind=_kind
+    )
+    _min_zoom, _max_zoom = raster_zoom_range(_raster_path)
+
+    _tile_layer = BitmapTileLayer(
+        data=_tile_url,
+        tile_size=256,
+        min_zoom=_min_zoom,
+        max_zoom=_max_zoom,
+        opacity=0.85,
+    )
+
+    _center = site_info["center"]
+    _tile_map = Map(
+        _tile_layer,
+        view_state={
+            "longitude": _center[0],
+            "latitude": _center[1],
+            "zoom": _min_zoom + 1,
+        },
+    )
+    _tile_map  # noqa: B018
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -642,6 +877,53 @@ def _(temporal_data):
     return
 
 
+@app.cell(hide_code=True)
+def _(selected_site, temporal_data):
+    mo.stop(temporal_data is None, mo.md("*Load temporal data first*"))
+    mo.stop(
+        len(temporal_data["samples"]) < 3,
+        mo.md("*Per-pixel trends need at least 3 temporal samples*"),
+    )
+
+    # Per-pixel least-squares trend over all samples (vectorized, chunked)
+    _cube_path = (
+        Path("data_cache")
+        / "temporal"
+        / selected_site.lower().replace(" ", "_")
+        / DEFAULT_CUBE
+    )
+
+    try:
+        _cube = select_scenes(
+            open_cube(_cube_path), [s["scene_id"] for s in temporal_data["samples"]]
+        )
+        _trend = fit_trend(observed_biomass(_cube), _cube["time"].values).compute()
+    except Exception as _e:
+        mo.stop(True, mo.md(f"*Per-pixel trend unavailable: {_e}*"))
+
+    _trend_summary = summarize_trend(_trend, cube_grid(_cube_path))
+
+    # Downsample for display (max 400x400 to stay under marimo limit)
+    _slope = _trend["slope"].values
+    _step = max(1, int(np.ceil(max(_slope.shape) / 400)))
+    _fig = px.imshow(
+        _slope[::_step, ::_step],
+        color_continuous_scale="RdYlGn",
+        color_continuous_midpoint=0,
+        labels={"color": "Mg/ha per year"},
+        title=(
+            f"Per-Pixel Biomass Trend | Degrading (p<0.05): "
+            f"{_trend_summary['degrading_ha']:.1f} ha | "
+            f"Recovering: {_trend_summary['recovering_ha']:.1f} ha"
+        ),
+    )
+    _fig.update_layout(height=500)
+    _fig.update_xaxes(showticklabels=False)
+    _fig.update_yaxes(showticklabels=False)
+    mo.ui.plotly(_fig)
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -725,6 +1007,63 @@ def _(selected_site, temporal_data):
     return
 
 
+@app.cell(hide_code=True)
+def _(selected_site, temporal_data):
+    mo.stop(temporal_data is None, mo.md("*Load temporal data first*"))
+
+    # Pixel-level change on a common grid (block-wise, bounded memory)
+    _initial = temporal_data["summary"]["initial"]
+    _current = temporal_data["summary"]["current"]
+    _site_dir = (
+        Path("data_cache") / "temporal" / selected_site.lower().replace(" ", "_")
+    )
+    _change_dir = (
+        _site_dir / "change" / f"{_initial['scene_id']}__{_current['scene_id']}"
+    )
+
+    try:
+        _change = detect_cube_change(
+            _site_dir / DEFAULT_CUBE,
+            _initial["scene_id"],
+            _current["scene_id"],
+            _change_dir,
+        )
+    except Exception as _e:
+        mo.stop(True, mo.md(f"*Pixel-level change unavailable: {_e}*"))
+
+    _change_df = pd.DataFrame(
+        [
+            {
+                "Metric": "Observed in Both Dates (ha)",
+                "Value": f"{_change['observed_ha']:.1f}",
+            },
+            {"Metric": "Biomass Loss Area (ha)", "Value": f"{_change['loss_ha']:.1f}"},
+            {"Metric": "Biomass Gain Area (ha)", "Value": f"{_change['gain_ha']:.1f}"},
+            {"Metric": "Stable Area (ha)", "Value": f"{_change['stable_ha']:.1f}"},
+            {
+                "Metric": "Net Biomass Change (Mg)",
+                "Value": f"{_change['net_change_mg']:,.0f}",
+            },
+            {
+                "Metric": "Mean Change (Mg/ha)",
+                "Value": f"{_change['mean_change_mg_ha']:+.1f}",
+            },
+        ]
+    )
+
+    mo.vstack(
+        [
+            mo.md("### Pixel-Level Change (±20 Mg/ha threshold)"),
+            mo.md(
+                "Both dates read from the site cube's fixed grid; only pixels observed in both are compared. "
+                f"Rasters saved to `{_change_dir}/`"
+            ),
+            mo.ui.table(_change_df, selection=None),
+        ]
+    )
+    return
+
+
 @app.cell
 def _():
     return
@@ -751,7 +1090,9 @@ def _():
     | Carbon fraction | 47% | IPCC 2006 Guidelines |
     | Resolution | 50m | Optimized for temporal analysis |
 
-    ⚠️ **Uncertainty:** ±30% (IPCC Tier 2)
+    ⚠️ **Uncertainty:** 95% intervals on carbon stock come from 2,000 Monte Carlo draws of
+    slope (±25.0), intercept (±7.5), carbon fraction (±0.015) and NDVI thresholds (±0.02).
+    These spreads are working assumptions (≈±30% overall, IPCC Tier 2) pending calibration data.
 
     ---
     ## Data Coverage Tradeoffs
@@ -801,6 +1142,8 @@ def _(selected_site, temporal_data):
                 "carbon_density_mg_c_ha": _sample.get("carbon_density", 0),
                 "mangrove_area_ha": _sample["mangrove_area_ha"],
                 "carbon_stock_mg_c": _sample["carbon_stock"],
+                "carbon_stock_lower_95_mg_c": _sample.get("carbon_stock_lower"),
+                "carbon_stock_upper_95_mg_c": _sample.get("carbon_stock_upper"),
             }
         )
 
@@ -10,11 +10,30 @@ from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
-import rioxarray
 import stackstac
-import xarray as xr
 from pystac_client import Client
 
+from mangrove_checkpoint import (
+    checkpoint_key,
+    clear_checkpoint,
+    compute_with_checkpoint,
+)
+from mangrove_cloud import SEARCH_CLOUD_COVER, rank_items, score_items
+from mangrove_grid import data_grid, pixel_area_ha, stack_grid_kwargs
+from mangrove_lock import entry_lock
+from mangrove_raw import has_raw, open_raw, write_raw
+from mangrove_remote import load_read_settings, stack_gdal_env
+from mangrove_store import (
+    DEFAULT_STORE,
+    has_scene,
+    open_scene,
+    scene_bands,
+    scene_key,
+    write_layers,
+    write_scene,
+)
+from mangrove_uncertainty import propagate_uncertainty
+
 warnings.filterwarnings("ignore")
 
 # Study site configuration
@@ -27,9 +46,25 @@ STUDY_SITES = {
     }
 }
 
+# Zarr scene store shared with the CLI and marimo notebook
+SCENE_STORE = DEFAULT_STORE
+
+# Uncompressed memory-mapped copy of the bands for instant reloads. Off by
+# default, as in the CLI and service, since it duplicates the scene store
+# uncompressed; set to a directory (e.g. "data_cache/raw") to enable
+RAW_CACHE = None
+
+# Remote read settings (sentinel2.read_settings); default profile if absent
+READ_CONFIG = "config/demo_config.yaml"
+
+
+def _read_settings():
+    """Remote read settings from READ_CONFIG (default profile if absent)"""
+    return load_read_settings(READ_CONFIG if os.path.exists(READ_CONFIG) else None)
+
 
 def search_sentinel2(bounds, max_cloud=20, days_back=90):
-    """Search for Sentinel-2 imagery"""
+    """Search for Sentinel-2 imagery, ranked on cloud and no data over the AOI"""
     print("🔍 Searching AWS STAC catalog...")
     catalog = Client.open("https://earth-search.aws.element84.com/v1")
     bbox = [bounds["west"], bounds["south"], bounds["east"], bounds["north"]]
@@ -41,79 +76,92 @@ def search_sentinel2(bounds, max_cloud=20, days_back=90):
         collections=["sentinel-2-l2a"],
         bbox=bbox,
         datetime=f"{start_date.isoformat()}/{end_date.isoformat()}",
-        query={"eo:cloud_cover": {"lt": max_cloud}},
+        # Tile-wide cover says little about the AOI; scenes are ranked below
+        query={"eo:cloud_cover": {"lt": SEARCH_CLOUD_COVER}},
     )
 
     items = list(search.items())
     if len(items) == 0:
-        print(f"❌ No scenes found with <{max_cloud}% cloud cover")
+        print(f"❌ No scenes found with <{SEARCH_CLOUD_COVER}% cloud cover")
         return None, None
-
     print(f"✅ Found {len(items)} Sentinel-2 scenes")
-    best_item = min(items, key=lambda x: x.properties.get("eo:cloud_cover", 100))
+
+    scores = score_items(items, bbox, read_settings=_read_settings())
+    ranked = rank_items(items, scores, max_cloud)
+    if len(ranked) == 0:
+        print(f"❌ No scenes found with <{max_cloud}% cloud and no data over the AOI")
+        return None, None
+
+    best_item = ranked[0]
+    best_score = scores[items.index(best_item)]
     print(f"📥 Using scene: {best_item.datetime.strftime('%Y-%m-%d')}")
     print(f"   Cloud cover: {best_item.properties.get('eo:cloud_cover', 'N/A'):.1f}%")
+    print(f"   Unusable over the AOI: {best_score['score']:.1f}%")
 
     return items, best_item
 
 
 def load_sentinel2_data(best_item, bbox):
-    """Load Sentinel-2 bands with caching"""
-    cache_dir = "data_cache"
-    os.makedirs(cache_dir, exist_ok=True)
-
-    cache_files = {
-        "red": f"{cache_dir}/red.tif",
-        "green": f"{cache_dir}/green.tif",
-        "nir": f"{cache_dir}/nir.tif",
+    """Load Sentinel-2 bands, reusing the shared Zarr scene store"""
+    grid_kwargs = stack_grid_kwargs(best_item, bbox)
+    key = scene_key(best_item.id, grid_kwargs)
+    scene_attrs = {
+        "item_id": best_item.id,
+        "datetime": best_item.datetime.isoformat(),
+        "cloud_cover": best_item.properties.get("eo:cloud_cover"),
     }
 
-    cache_exists = all(os.path.exists(f) for f in cache_files.values())
-
-    if cache_exists:
-        print(f"\n💾 Found cached GeoTIFF data in {cache_dir}/")
-        bands_data = {}
-        for band_name, filepath in cache_files.items():
-            with rioxarray.open_rasterio(filepath) as src:
-                bands_data[band_name] = src.values[0]
-
-        sentinel2_data = xr.DataArray(
-            np.stack([bands_data["red"], bands_data["green"], bands_data["nir"]]),
-            dims=["band", "y", "x"],
-            coords={"band": ["red", "green", "nir"]},
-        )
-        print("✅ Loaded from cache (instant)")
-    else:
-        print("\n⏳ Downloading from AWS (30-60 seconds)")
-        print("   Resolution: 10m | Bands: red, green, nir")
-
-        sentinel2_lazy = stackstac.stack(
-            [best_item],
-            assets=["red", "green", "nir"],
-            epsg=4326,
-            resolution=0.0001,
-            bounds_latlon=bbox,
-            chunksize=(1, 1, 512, 512),
-        )
-
-        import time
-
-        start_time = time.time()
-        sentinel2_data = sentinel2_lazy.compute()
-        elapsed = time.time() - start_time
-
-        print(f"\n✅ Downloaded in {elapsed:.1f} seconds")
-        print("💾 Caching as GeoTIFF...")
-
-        for band_name in ["red", "green", "nir"]:
-            band_data = sentinel2_data.sel(band=band_name)
-            if "time" in band_data.dims:
-                band_data = band_data.isel(time=0)
-
-            band_xr = band_data.rio.write_crs("EPSG:4326")
-            band_xr.rio.to_raster(cache_files[band_name], compress="lzw")
-
-        print(f"✅ Cached to {cache_dir}/")
+    # Another run downloading the same scene is waited for, then reused
+    with entry_lock(os.path.join(SCENE_STORE, key)):
+        if RAW_CACHE and has_raw(RAW_CACHE, key):
+            print(f"\n💾 Found scene in {RAW_CACHE}/")
+            sentinel2_data = open_raw(RAW_CACHE, key)
+            print("✅ Memory-mapped from raw cache (no decompression or copy)")
+        elif has_scene(SCENE_STORE, key):
+            print(f"\n💾 Found scene in {SCENE_STORE}/")
+            sentinel2_data = scene_bands(open_scene(SCENE_STORE, key))
+            if RAW_CACHE:
+                write_raw(RAW_CACHE, key, sentinel2_data, scene_attrs)
+                sentinel2_data = open_raw(RAW_CACHE, key)
+            else:
+                sentinel2_data = sentinel2_data.compute()
+            print("✅ Loaded from scene store (parallel chunk reads)")
+        else:
+            print("\n⏳ Downloading from AWS (30-60 seconds)")
+            print(
+                f"   Resolution: 10m native (EPSG:{grid_kwargs['epsg']}) | Bands: red, green, nir"
+            )
+
+            sentinel2_lazy = stackstac.stack(
+                [best_item],
+                assets=["red", "green", "nir"],
+                chunksize=(1, 1, 512, 512),
+                gdal_env=stack_gdal_env(_read_settings()),
+                **grid_kwargs,
+            )
+
+            import time
+
+            # Chunks persist as they arrive, so an interrupted run resumes
+            chunk_store = os.path.join(
+                "data_cache",
+                "chunks",
+                checkpoint_key(best_item.id, ["red", "green", "nir"], grid_kwargs),
+            )
+
+            start_time = time.time()
+            sentinel2_data = compute_with_checkpoint(sentinel2_lazy, chunk_store)
+            elapsed = time.time() - start_time
+
+            print(f"\n✅ Downloaded in {elapsed:.1f} seconds")
+            print("💾 Writing to scene store...")
+
+            write_scene(SCENE_STORE, key, sentinel2_data, scene_attrs)
+            clear_checkpoint(chunk_store)
+            print(f"✅ Stored in {SCENE_STORE}/{key}")
+            if RAW_CACHE:
+                write_raw(RAW_CACHE, key, sentinel2_data, scene_attrs)
+                sentinel2_data = open_raw(RAW_CACHE, key)
 
     return sentinel2_data
 
@@ -172,14 +220,15 @@ def estimate_biomass(ndvi, mask):
     return biomass_masked
 
 
-def generate_summary(site_name, biomass_data):
+def generate_summary(site_name, biomass_data, uncertainty=None, area_ha=0.01):
     """Generate summary report matching notebook format"""
-    valid_biomass = biomass_data[~np.isnan(biomass_data)]
+    valid = ~np.isnan(biomass_data)
+    valid_biomass = biomass_data[valid]
+    valid_area = np.broadcast_to(area_ha, biomass_data.shape)[valid]
 
     # Calculate comprehensive statistics
-    pixel_area_ha = (10 * 10) / 10000
-    total_area_ha = len(valid_biomass) * pixel_area_ha
-    total_biomass = np.sum(valid_biomass) * pixel_area_ha
+    total_area_ha = np.sum(valid_area)
+    total_biomass = np.sum(valid_biomass * valid_area)
     carbon = total_biomass * 0.47
     co2 = carbon * 3.67
 
@@ -200,14 +249,37 @@ def generate_summary(site_name, biomass_data):
             ["Carbon Stock (Mg C)", f"{carbon:,.0f}"],
             ["CO₂ Equivalent (Mg)", f"{co2:,.0f}"],
             ["", ""],
-            ["Uncertainty", "±30%"],
-        ],
+        ]
+        + _uncertainty_rows(uncertainty),
         columns=["Metric", "Value"],
     )
 
     return summary_df
 
 
+def _uncertainty_rows(uncertainty):
+    """Summary rows for Monte Carlo intervals (or the default ±30%)"""
+    if uncertainty is None:
+        return [["Uncertainty", "±30%"]]
+
+    confidence = uncertainty["confidence"]
+    rows = []
+    for label, key in [
+        ("Total Biomass (Mg)", "total_biomass"),
+        ("Carbon Stock (Mg C)", "carbon_stock"),
+        ("CO₂ Equivalent (Mg)", "co2_equivalent"),
+    ]:
+        interval = uncertainty[key]
+        rows.append(
+            [
+                f"{label} {confidence}% CI",
+                f"{interval['lower']:,.0f} - {interval['upper']:,.0f}",
+            ]
+        )
+    rows.append(["Uncertainty Draws", f"{uncertainty['n_draws']}"])
+    return rows
+
+
 def main():
     """Run complete workflow"""
     print("=" * 60)
@@ -233,6 +305,7 @@ def main():
     sentinel2_data = load_sentinel2_data(best_item, bbox)
 
     print(f"\n📊 Data shape: {sentinel2_data.shape}")
+    area_ha = pixel_area_ha(data_grid(sentinel2_data))
 
     # Step 3: Detect mangroves
     print("\n🔬 Calculating vegetation indices...")
@@ -241,9 +314,7 @@ def main():
     print("🌿 Detecting mangroves...")
     mangrove_mask = detect_mangroves(indices)
 
-    pixel_area_m2 = 10 * 10
-    mangrove_pixels = np.sum(mangrove_mask)
-    total_area_ha = (mangrove_pixels * pixel_area_m2) / 10000
+    total_area_ha = np.sum(mangrove_mask * area_ha)
 
     print("✅ Detection complete!")
     print(f"   Mangrove area: {total_area_ha:.1f} hectares")
@@ -252,14 +323,31 @@ def main():
     print("\n🔬 Estimating biomass...")
     biomass_data = estimate_biomass(indices["ndvi"], mangrove_mask)
 
+    # (a scene mapped from the raw cache may not be in the store)
+    key = scene_key(best_item.id, stack_grid_kwargs(best_item, bbox))
+    if has_scene(SCENE_STORE, key):
+        write_layers(
+            SCENE_STORE,
+            key,
+            {**indices, "mask": mangrove_mask, "biomass": biomass_data},
+        )
+
     valid_biomass = biomass_data[~np.isnan(biomass_data)]
     print("✅ Biomass estimation complete!")
     print(f"   Mean: {np.mean(valid_biomass):.1f} Mg/ha")
     print(f"   Max: {np.max(valid_biomass):.1f} Mg/ha")
 
-    # Step 5: Generate summary and export
+    # Step 5: Propagate parameter uncertainty
+    print("\n🎲 Propagating uncertainty (10,000 draws)...")
+    uncertainty = propagate_uncertainty(indices, n_draws=10000, area_ha=area_ha)
+    carbon_ci = uncertainty["carbon_stock"]
+    print(
+        f"   Carbon 95% CI: {carbon_ci['lower']:,.0f} - {carbon_ci['upper']:,.0f} Mg C"
+    )
+
+    # Step 6: Generate summary and export
     print("\n📋 Generating summary report...")
-    summary_df = generate_summary(site_name, biomass_data)
+    summary_df = generate_summary(site_name, biomass_data, uncertainty, area_ha)
 
     # Save outputs
     csv_filename = f"{site_name.replace(' ', '_')}_summary.csv"
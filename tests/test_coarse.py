@@ -0,0 +1,65 @@
+"""Coarse screen of candidate mangrove blocks."""
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+from mangrove_coarse import candidate_blocks
+from mangrove_grid import stack_grid_kwargs
+from mangrove_remote import _benchmark_item
+
+SIZE = 1024
+EPSG = 32646
+
+
+def _write_bands(directory):
+    """
+    Bands in digital numbers: a water channel down the middle, vegetation in
+    the north-east block only once the -0.1 offset is applied.
+    """
+    transform = from_origin(200000, 1900000, 10, 10)
+    red = np.full((SIZE, SIZE), 1500, dtype=np.uint16)
+    green = np.full((SIZE, SIZE), 1500, dtype=np.uint16)
+    nir = np.full((SIZE, SIZE), 1500, dtype=np.uint16)
+
+    # Water: NDWI > 0 with or without the offset
+    nir[:, 480:512] = 1100
+    # North-east: NDVI 0.71 in reflectance, 0.19 in digital numbers
+    red[:480, 512:] = 1100
+    nir[:480, 512:] = 1600
+
+    profile = {
+        "driver": "COG",
+        "width": SIZE,
+        "height": SIZE,
+        "count": 1,
+        "dtype": "uint16",
+        "crs": f"EPSG:{EPSG}",
+        "transform": transform,
+        "blocksize": 512,
+    }
+    for band, data in [("red", red), ("green", green), ("nir", nir)]:
+        with rasterio.open(directory / f"{band}.tif", "w", **profile) as dst:
+            dst.write(data, 1)
+    return {"epsg": EPSG, "transform": transform, "shape": [SIZE, SIZE]}
+
+
+def test_screen_applies_band_offset(tmp_path):
+    grid = _write_bands(tmp_path)
+    item = _benchmark_item(str(tmp_path), grid)
+    for asset in item.assets.values():
+        asset.extra_fields["raster:bands"] = [{"scale": 0.0001, "offset": -0.1}]
+
+    bounds = (200000, 1900000 - SIZE * 10, 200000 + SIZE * 10, 1900000)
+    bbox = list(transform_bounds(f"EPSG:{EPSG}", "EPSG:4326", *bounds))
+    grid_kwargs = stack_grid_kwargs(item, bbox)
+
+    blocks = candidate_blocks(item, grid_kwargs, log=lambda *_: None)
+    assert blocks.any() and not blocks.all()
+
+    # The same screen on digital numbers finds no vegetation
+    for asset in item.assets.values():
+        asset.extra_fields.pop("raster:bands")
+    blocks = candidate_blocks(item, grid_kwargs, log=lambda *_: None)
+    assert not blocks.any()
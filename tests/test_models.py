@@ -0,0 +1,36 @@
+"""Biomass model specs and feature selection."""
+
+import numpy as np
+import pytest
+
+from mangrove_models import AVAILABLE_FEATURES, parse_features, predict_biomass
+
+
+def test_parse_features():
+    assert parse_features(None) is None
+    assert parse_features("") is None
+    assert parse_features("nir, red,ndvi") == ["nir", "red", "ndvi"]
+    with pytest.raises(ValueError, match="blue"):
+        parse_features("nir,blue")
+
+
+def test_model_uses_spec_features(tmp_path):
+    joblib = pytest.importorskip("joblib")
+    linear_model = pytest.importorskip("sklearn.linear_model")
+
+    # Biomass = 100 × nir - 50 × ndvi, fitted on the (nir, ndvi) order
+    rng = np.random.default_rng(0)
+    train = rng.random((200, 2))
+    model = linear_model.LinearRegression().fit(train, train @ [100, -50])
+    joblib.dump(model, tmp_path / "model.joblib")
+
+    layers = {name: rng.random((8, 8)) for name in AVAILABLE_FEATURES}
+    mask = np.ones((8, 8), dtype=np.uint8)
+    spec = {
+        "name": "random_forest",
+        "model_path": str(tmp_path / "model.joblib"),
+        "features": parse_features("nir,ndvi"),
+    }
+
+    biomass = predict_biomass(spec, layers, mask, workers=1)
+    np.testing.assert_allclose(biomass, 100 * layers["nir"] - 50 * layers["ndvi"])
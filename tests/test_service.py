@@ -0,0 +1,37 @@
+"""Validation of execution inputs."""
+
+import pytest
+
+from mangrove_service import parse_inputs
+
+BBOX = {"west": 94.0, "south": 16.0, "east": 94.1, "north": 16.1}
+
+
+def test_defaults_and_coercion():
+    parsed = parse_inputs({**BBOX, "days_back": 30.0, "cloud_cover": "10"})
+    assert parsed["days_back"] == 30 and isinstance(parsed["days_back"], int)
+    assert parsed["cloud_cover"] == 10
+    assert parsed["connectivity"] == 4
+
+
+@pytest.mark.parametrize(
+    "inputs",
+    [
+        {"connectivity": 5},
+        {"connectivity": "6"},
+        {"days_back": 2.9},
+        {"days_back": True},
+        {"slope": False},
+        {"slope": "nan"},
+        {"cloud_cover": 101},
+        {"model": "forest"},
+        {"native_crs": "yes"},
+    ],
+)
+def test_rejects_invalid(inputs):
+    with pytest.raises(ValueError):
+        parse_inputs({**BBOX, **inputs})
+
+
+def test_accepts_enum_after_coercion():
+    assert parse_inputs({**BBOX, "connectivity": 8.0})["connectivity"] == 8
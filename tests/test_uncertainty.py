@@ -0,0 +1,48 @@
+"""Monte Carlo intervals against the point estimate."""
+
+import numpy as np
+
+from mangrove_cleanup import clean_mask
+from mangrove_workflow_cli import (
+    calculate_carbon,
+    detect_mangroves,
+    estimate_biomass,
+    estimate_uncertainty,
+)
+
+
+def _speckled_indices(size=200, seed=0):
+    """A mangrove stand surrounded by scattered vegetated pixels."""
+    rng = np.random.default_rng(seed)
+    ndvi = rng.uniform(0.0, 0.25, (size, size))
+    stand = np.zeros((size, size), dtype=bool)
+    stand[40:160, 40:160] = True
+    speckle = ~stand & (rng.random((size, size)) < 0.2)
+    ndvi[stand] = rng.uniform(0.45, 0.85, stand.sum())
+    ndvi[speckle] = rng.uniform(0.75, 0.85, speckle.sum())
+    ndwi = np.full((size, size), 0.0)
+    savi = ndvi * 0.8
+    return {
+        "ndvi": ndvi.astype(np.float32),
+        "ndwi": ndwi.astype(np.float32),
+        "savi": savi.astype(np.float32),
+    }
+
+
+def test_interval_brackets_cleaned_estimate():
+    indices = _speckled_indices()
+    detected = detect_mangroves(indices)
+    mask = clean_mask(detected, {"min_patch": 50}, log=lambda *_: None)
+    assert mask.sum() < detected.sum()
+
+    biomass, _ = estimate_biomass(indices["ndvi"], mask)
+    carbon = calculate_carbon(biomass)
+
+    uncertainty = estimate_uncertainty(indices, 500, keep=mask)
+    for metric in ("total_biomass", "carbon_stock"):
+        interval = uncertainty[metric]
+        assert interval["lower"] <= carbon[metric] <= interval["upper"]
+
+    # Without the cleaned mask the removed speckle inflates the draws
+    unrestricted = estimate_uncertainty(indices, 500)
+    assert unrestricted["total_biomass"]["mean"] > uncertainty["total_biomass"]["mean"]